@@ -1,21 +1,33 @@
-from fastapi import APIRouter, HTTPException, Body
+from fastapi import APIRouter, HTTPException, Body, Request, Response
 from pydantic import BaseModel
+from fastapi.responses import JSONResponse
 from starlette.concurrency import run_in_threadpool
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
+import asyncio
 import os
 import subprocess
 import sys
 from pathlib import Path
-from .config import load_config, save_config, AppConfig
+from .config import config_store, load_config, save_config, scenario_roots, AppConfig
 from .file_service import FileService
-from .page_object_scanner import scan_page_objects
+from .json_patch import JsonPatchError, apply_patch
+from .scenario_cache import scenario_cache
+from .scenario_index import scenario_index
+from .sse import KEEP_ALIVE_SECONDS, sse_comment, sse_event, sse_response
+from .watch_service import watch_service
+from .page_object_scanner import find_file_by_target, get_scan_cache, resolve_targets, scan_page_objects
+from .target_index import SEARCH_MODES, get_target_index
 from .templates_service import TemplatesService
+from .duration_store import duration_store
 from .debug_session_service import (
     DebugSessionCloseRequest,
     DebugSessionCreateRequest,
     DebugSessionRunRequest,
     debug_session_service,
 )
+from .execution_service import ExecutionRequest, execution_service
+from .log_stream import LogStream
+from .suite_service import SuiteRequest, suite_service
 
 router = APIRouter(prefix="/api")
 
@@ -23,11 +35,16 @@ router = APIRouter(prefix="/api")
 
 @router.get("/config", response_model=AppConfig)
 async def get_config():
-    return load_config()
+    # config.json が外部で変わっていれば読み直しと購読者への通知が走るのでスレッドで行う
+    return await run_in_threadpool(load_config)
 
 @router.post("/config", response_model=AppConfig)
 async def update_config(config_data: Dict[str, Any] = Body(...)):
-    current_config = load_config()
+    if set(config_data) == {"ui_settings"} and isinstance(config_data["ui_settings"], dict):
+        # ペイン幅などの UI 設定だけの更新はメモリ上でマージし、書き込みはまとめて後で行う
+        return await run_in_threadpool(config_store.update_ui_settings, config_data["ui_settings"])
+
+    current_config = await run_in_threadpool(load_config)
     current_config_dict = current_config.model_dump()
     
     # Deep merge logic for ui_settings
@@ -42,7 +59,8 @@ async def update_config(config_data: Dict[str, Any] = Body(...)):
         current_config_dict[key] = value
     
     new_config = AppConfig(**current_config_dict)
-    save_config(new_config)
+    # 購読者 (インデックスの書き直し・デバッグサーバーの起動など) が同期的に動くのでスレッドで行う
+    await run_in_threadpool(save_config, new_config)
     return new_config
 
 # --- Utility API ---
@@ -102,13 +120,70 @@ async def open_path(req: OpenPathRequest):
 async def get_page_objects():
     config = load_config()
     if not config.page_object_folder:
-        return []
-        
+        return {"targets": [], "errors": []}
+
+    settings = config.page_object_settings
     try:
-        return scan_page_objects(config.page_object_folder)
+        return await run_in_threadpool(
+            scan_page_objects,
+            config.page_object_folder,
+            settings.scan_workers,
+            settings.scan_chunk_size,
+            settings.parallel_scan_threshold,
+        )
     except Exception as e:
          raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/page-objects/search")
+async def search_page_objects(
+    q: str = "",
+    mode: str = "auto",
+    limit: int = 50,
+    offset: int = 0,
+    include_doc: bool = False,
+    refresh: bool = False,
+):
+    """
+    ターゲットをサーバー側で検索し、ページ単位で返す。
+    refresh=true、または未スキャンの場合のみファイルの変更を確認する。
+    """
+    if mode not in SEARCH_MODES:
+        raise HTTPException(status_code=400, detail=f"Invalid mode: {mode}")
+    config = load_config()
+    if not config.page_object_folder:
+        return {"total": 0, "offset": offset, "limit": limit, "items": []}
+
+    limit = max(1, min(limit, 500))
+    offset = max(0, offset)
+    settings = config.page_object_settings
+    folder = config.page_object_folder
+
+    def search():
+        if refresh or not get_scan_cache(folder).scanned:
+            scan_page_objects(
+                folder,
+                settings.scan_workers,
+                settings.scan_chunk_size,
+                settings.parallel_scan_threshold,
+            )
+        return get_target_index(folder).search(q, mode, limit, offset, include_doc)
+
+    try:
+        return await run_in_threadpool(search)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/page-objects/doc")
+async def get_page_object_doc(target: str):
+    config = load_config()
+    if not config.page_object_folder:
+        raise HTTPException(status_code=404, detail="Target not found")
+
+    doc = get_target_index(config.page_object_folder).get_doc(target)
+    if doc is None:
+        raise HTTPException(status_code=404, detail="Target not found")
+    return {"target": target, "doc": doc}
+
 @router.get("/page-objects/scan")
 async def scan_target(target: str):
     """
@@ -118,50 +193,74 @@ async def scan_target(target: str):
     config = load_config()
     if not config.page_object_folder:
         return []
-    
+
+    folder = config.page_object_folder
+
+    def scan():
+        file_path = find_file_by_target(target, folder)
+        if not file_path:
+            # If file not found, return empty creates no harm (client keeps current state)
+            return []
+        cache = get_scan_cache(folder)
+        rel = file_path.relative_to(cache.root_path).as_posix()
+        cache.rescan_file(rel)
+        return cache.file_targets(rel)
+
     try:
-        from .page_object_scanner import find_file_by_target, scan_file
-        from pathlib import Path
-        
-        file_path = find_file_by_target(target, config.page_object_folder)
-        
-        if file_path:
-             root_path = Path(config.page_object_folder)
-             return scan_file(file_path, root_path)
-             
-        # If file not found efficiently, maybe fallback or return empty
-        # For now, return empty creates no harm (client keeps current state)
-        return []
-        
+        return await run_in_threadpool(scan)
     except Exception as e:
          raise HTTPException(status_code=500, detail=str(e))
 
+class ResolveTargetsRequest(BaseModel):
+    targets: List[str]
+
+@router.post("/page-objects/resolve")
+async def resolve_page_object_targets(request: ResolveTargetsRequest):
+    """複数ターゲットの存在確認をまとめて行う。{"results": [{target, valid, file}]}"""
+    config = load_config()
+    if not config.page_object_folder:
+        return {"results": [{"target": target, "valid": False, "file": None} for target in request.targets]}
+
+    try:
+        results = await run_in_threadpool(resolve_targets, config.page_object_folder, request.targets)
+        return {"results": results}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 # --- Debug Session API ---
 
 @router.get("/debug-sessions/framework/validate")
 async def validate_debug_framework():
-    return debug_session_service.validate_framework()
+    return await run_in_threadpool(debug_session_service.validate_framework)
 
 @router.post("/debug-sessions")
 async def create_debug_session(req: DebugSessionCreateRequest):
     try:
-        return debug_session_service.create_session(req)
+        return await run_in_threadpool(debug_session_service.create_session, req)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/debug-sessions")
+async def list_debug_sessions():
+    return debug_session_service.list_sessions()
+
 @router.get("/debug-sessions/active")
 async def get_active_debug_session():
     try:
-        return debug_session_service.get_active_session()
+        return await run_in_threadpool(debug_session_service.get_active_session)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/debug-sessions/pool")
+async def get_debug_server_pool():
+    return await run_in_threadpool(debug_session_service.pool_stats)
+
 @router.get("/debug-sessions/{session_id}")
 async def get_debug_session(session_id: str):
     try:
-        return debug_session_service.get_session(session_id)
+        return await run_in_threadpool(debug_session_service.get_session, session_id)
     except KeyError:
         raise HTTPException(status_code=404, detail="Debug session not found")
     except Exception as e:
@@ -170,16 +269,96 @@ async def get_debug_session(session_id: str):
 @router.get("/debug-sessions/{session_id}/logs")
 async def get_debug_session_logs(session_id: str, offset: int = 0):
     try:
-        return debug_session_service.get_logs(session_id, offset=offset)
+        return await run_in_threadpool(debug_session_service.get_logs, session_id, offset)
     except KeyError:
         raise HTTPException(status_code=404, detail="Debug session not found")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.post("/debug-sessions/{session_id}/run")
+def _resume_offset(request: Request, offset: int) -> int:
+    # 再接続時は Last-Event-ID (最後に受け取ったログの next_offset) を優先する
+    last_event_id = request.headers.get("last-event-id")
+    if last_event_id and last_event_id.isdigit():
+        return int(last_event_id)
+    return offset
+
+def _log_stream_response(request: Request, stream: LogStream, queue: asyncio.Queue, offset: int, end_payload: Dict[str, Any], fetch_missing=None):
+    """
+    LogStream の内容を SSE (log / state / end) で配信する。
+    fetch_missing(offset) を渡した場合、リングバッファから溢れた行はそこから取得する。
+    """
+    async def backlog(since: int):
+        # 戻り値の最後は、リングバッファの内容まで読み終えたかどうか
+        lines, next_offset, complete = stream.read_since(since)
+        if not complete and fetch_missing is not None:
+            missing, missing_offset = await fetch_missing(since)
+            if missing and missing_offset > since:
+                return missing, missing_offset, False
+            # 取得元からも進めない場合は、リングバッファに残っている分で追いついたことにする
+        return lines, next_offset, True
+
+    async def event_stream():
+        nonlocal offset
+        try:
+            # 購読後にバックログを読むので、その間に届いた行は後段で重複を除く
+            event = {"type": "resync"}
+            while True:
+                if event is None:
+                    yield sse_event(end_payload, event="end")
+                    break
+                if event["type"] == "resync":
+                    # 取得元が分割して返す場合は、追いつくまで繰り返す
+                    caught_up = False
+                    while not caught_up:
+                        lines, next_offset, caught_up = await backlog(offset)
+                        if lines:
+                            yield sse_event({"lines": lines, "next_offset": next_offset}, event="log", event_id=next_offset)
+                        offset = max(offset, next_offset)
+                    event = {"type": "state", "state": stream.state}
+                if event["type"] == "log":
+                    lines = event["lines"][max(0, offset - event["offset"]):]
+                    if lines:
+                        yield sse_event({"lines": lines, "next_offset": event["next_offset"]}, event="log", event_id=event["next_offset"])
+                    offset = max(offset, event["next_offset"])
+                elif event["type"] == "state" and event["state"] is not None:
+                    yield sse_event(event["state"], event="state")
+
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=KEEP_ALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield sse_comment()
+                    event = {"type": "keep-alive"}
+        finally:
+            stream.unsubscribe(queue)
+
+    return sse_response(event_stream())
+
+@router.get("/debug-sessions/{session_id}/stream")
+async def stream_debug_session(session_id: str, request: Request, offset: int = 0):
+    """
+    ログ行 (log) と状態遷移 (state) を SSE で配信する。
+    再接続時は Last-Event-ID から再開する。
+    """
+    try:
+        stream, queue = debug_session_service.subscribe_logs(session_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Debug session not found")
+
+    async def fetch_missing(since: int):
+        logs = await run_in_threadpool(debug_session_service.get_logs, session_id, since)
+        return logs.get("logs") or [], logs.get("next_offset", since)
+
+    return _log_stream_response(
+        request, stream, queue, _resume_offset(request, offset), {"session_id": session_id}, fetch_missing
+    )
+
+@router.post("/debug-sessions/{session_id}/run", status_code=202)
 async def run_debug_session(session_id: str, req: DebugSessionRunRequest):
+    """ステップ実行をジョブとして開始する。結果は /jobs/{job_id} で取得する"""
     try:
-        return await run_in_threadpool(debug_session_service.run, session_id, req)
+        return await run_in_threadpool(debug_session_service.start_run, session_id, req)
     except KeyError:
         raise HTTPException(status_code=404, detail="Debug session not found")
     except ValueError as e:
@@ -187,10 +366,24 @@ async def run_debug_session(session_id: str, req: DebugSessionRunRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/debug-sessions/{session_id}/timeline")
+async def get_debug_session_timeline(session_id: str):
+    try:
+        return debug_session_service.get_timeline(session_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Debug session not found")
+
+@router.get("/debug-sessions/{session_id}/jobs/{job_id}")
+async def get_debug_session_job(session_id: str, job_id: str):
+    try:
+        return debug_session_service.get_job(session_id, job_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Debug job not found")
+
 @router.post("/debug-sessions/{session_id}/next")
 async def next_debug_session(session_id: str):
     try:
-        return debug_session_service.next(session_id)
+        return await run_in_threadpool(debug_session_service.next, session_id)
     except KeyError:
         raise HTTPException(status_code=404, detail="Debug session not found")
     except Exception as e:
@@ -199,7 +392,7 @@ async def next_debug_session(session_id: str):
 @router.post("/debug-sessions/{session_id}/cancel")
 async def cancel_debug_session(session_id: str):
     try:
-        return debug_session_service.cancel(session_id)
+        return await run_in_threadpool(debug_session_service.cancel, session_id)
     except KeyError:
         raise HTTPException(status_code=404, detail="Debug session not found")
     except Exception as e:
@@ -208,7 +401,7 @@ async def cancel_debug_session(session_id: str):
 @router.delete("/debug-sessions/{session_id}")
 async def close_debug_session(session_id: str, req: DebugSessionCloseRequest = Body(default={})):
     try:
-        return debug_session_service.close(session_id, req)
+        return await run_in_threadpool(debug_session_service.close, session_id, req)
     except KeyError:
         raise HTTPException(status_code=404, detail="Debug session not found")
     except Exception as e:
@@ -217,12 +410,288 @@ async def close_debug_session(session_id: str, req: DebugSessionCloseRequest = B
 @router.post("/debug-sessions/{session_id}/force-kill")
 async def force_kill_debug_session(session_id: str):
     try:
-        return debug_session_service.force_kill(session_id)
+        return await run_in_threadpool(debug_session_service.force_kill, session_id)
     except KeyError:
         raise HTTPException(status_code=404, detail="Debug session not found")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# --- Execution API ---
+
+@router.get("/executions/framework/validate")
+async def validate_execution_framework():
+    return await run_in_threadpool(execution_service.validate_framework)
+
+@router.post("/executions", status_code=202)
+async def create_execution(req: ExecutionRequest):
+    """実行をキューに追加する。空きがあればすぐに起動する"""
+    try:
+        return await run_in_threadpool(execution_service.start, req)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/executions")
+async def list_executions():
+    return execution_service.list()
+
+@router.get("/executions/history")
+async def get_execution_history(
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    status: Optional[str] = None,
+    scenario_path: Optional[str] = None,
+    scenario_id: Optional[str] = None,
+    env: Optional[str] = None,
+    suite_id: Optional[str] = None,
+):
+    """終了した実行の履歴。続きは next_cursor を cursor に渡して取得する"""
+    try:
+        return await run_in_threadpool(
+            execution_service.history,
+            limit,
+            cursor,
+            status=status,
+            scenario_path=scenario_path,
+            scenario_id=scenario_id,
+            env=env,
+            suite_id=suite_id,
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/executions/{run_id}")
+async def get_execution(run_id: str):
+    try:
+        return await run_in_threadpool(execution_service.get, run_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Execution not found")
+
+@router.get("/executions/{run_id}/timeline")
+async def get_execution_timeline(run_id: str):
+    try:
+        return await run_in_threadpool(execution_service.get_timeline, run_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Execution not found")
+
+@router.get("/executions/{run_id}/artifacts")
+async def get_execution_artifacts(run_id: str):
+    try:
+        state = await run_in_threadpool(execution_service.get, run_id)
+        return {"run_id": run_id, "status": state.status, "artifacts": state.artifacts}
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Execution not found")
+
+@router.get("/executions/{run_id}/logs")
+async def get_execution_logs(run_id: str, offset: int = 0, limit: int = 1000):
+    try:
+        return await run_in_threadpool(execution_service.get_logs, run_id, offset, limit)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Execution not found")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/executions/{run_id}/stream")
+async def stream_execution(run_id: str, request: Request, offset: int = 0):
+    try:
+        # 履歴に移った実行は run_store から読み込む
+        stream = await run_in_threadpool(execution_service.get_log_stream, run_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Execution not found")
+
+    async def fetch_missing(since: int):
+        # メモリから溢れた行はログファイルから読む
+        logs = await run_in_threadpool(execution_service.get_logs, run_id, since)
+        return logs["lines"], logs["next_offset"]
+
+    return _log_stream_response(
+        request, stream, stream.subscribe(), _resume_offset(request, offset), {"run_id": run_id}, fetch_missing
+    )
+
+@router.post("/executions/{run_id}/cancel")
+async def cancel_execution(run_id: str):
+    try:
+        return await run_in_threadpool(execution_service.cancel, run_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Execution not found")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# --- Artifacts API ---
+
+@router.get("/artifacts")
+async def list_artifacts(
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    status: Optional[str] = None,
+    scenario_path: Optional[str] = None,
+    scenario_id: Optional[str] = None,
+    env: Optional[str] = None,
+    suite_id: Optional[str] = None,
+):
+    """成果物のある実行の一覧。続きは next_cursor を cursor に渡して取得する"""
+    try:
+        return await run_in_threadpool(
+            execution_service.list_artifacts,
+            limit,
+            cursor,
+            status=status,
+            scenario_path=scenario_path,
+            scenario_id=scenario_id,
+            env=env,
+            suite_id=suite_id,
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/artifacts/owner")
+async def get_artifact_owner(path: str):
+    try:
+        return await run_in_threadpool(execution_service.find_artifact_owner, path)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="No execution produced this artifact")
+
+# --- Durations API ---
+
+@router.get("/durations/stats")
+async def get_duration_stats(
+    kind: str = "step",
+    group_by: str = "target",
+    since_days: int = 30,
+    limit: int = 50,
+    source: Optional[str] = None,
+    mode: Optional[str] = None,
+    scenario_path: Optional[str] = None,
+    scenario_id: Optional[str] = None,
+    env: Optional[str] = None,
+    status: Optional[str] = None,
+    section: Optional[str] = None,
+    type: Optional[str] = None,
+    operation: Optional[str] = None,
+    target: Optional[str] = None,
+):
+    """
+    所要時間の p50 / p95 を group_by ごとに p95 の大きい順で返す。
+    kind=step は target / operation / type / step / scenario / env、kind=scenario は scenario / env / mode で集計する。
+    """
+    try:
+        return await run_in_threadpool(
+            duration_store.stats,
+            kind,
+            group_by,
+            since_days,
+            limit,
+            source=source,
+            mode=mode,
+            scenario_path=scenario_path,
+            scenario_id=scenario_id,
+            env=env,
+            status=status,
+            section=section,
+            type=type,
+            operation=operation,
+            target=target,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/durations/trend")
+async def get_duration_trend(
+    kind: str = "step",
+    bucket: str = "day",
+    since_days: int = 30,
+    source: Optional[str] = None,
+    mode: Optional[str] = None,
+    scenario_path: Optional[str] = None,
+    scenario_id: Optional[str] = None,
+    env: Optional[str] = None,
+    status: Optional[str] = None,
+    section: Optional[str] = None,
+    type: Optional[str] = None,
+    operation: Optional[str] = None,
+    target: Optional[str] = None,
+):
+    """期間 (hour / day / week / month) ごとの p50 / p95 の推移"""
+    try:
+        return await run_in_threadpool(
+            duration_store.trend,
+            kind,
+            bucket,
+            since_days,
+            source=source,
+            mode=mode,
+            scenario_path=scenario_path,
+            scenario_id=scenario_id,
+            env=env,
+            status=status,
+            section=section,
+            type=type,
+            operation=operation,
+            target=target,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/durations/slowest")
+async def get_slowest_durations(
+    since_days: int = 30,
+    limit: int = 10,
+    scenario_path: Optional[str] = None,
+    env: Optional[str] = None,
+):
+    """p95 が大きいターゲットと操作"""
+    try:
+        filters = {"scenario_path": scenario_path, "env": env}
+        targets = await run_in_threadpool(duration_store.stats, "step", "target", since_days, limit, **filters)
+        operations = await run_in_threadpool(duration_store.stats, "step", "operation", since_days, limit, **filters)
+        return {"since_days": since_days, "targets": targets["groups"], "operations": operations["groups"]}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# --- Suite API ---
+
+@router.post("/suites/preview")
+async def preview_suite(req: SuiteRequest):
+    """選択条件に一致するシナリオを、実行せずに返す"""
+    try:
+        files = await run_in_threadpool(suite_service.select, req)
+        return {"total": len(files), "files": files}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/suites", status_code=202)
+async def create_suite(req: SuiteRequest):
+    """選択したシナリオを 1 件ずつの実行として実行キューに積む"""
+    try:
+        return await run_in_threadpool(suite_service.start, req)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/suites")
+async def list_suites():
+    return {"suites": await run_in_threadpool(suite_service.list)}
+
+@router.get("/suites/{suite_id}")
+async def get_suite(suite_id: str):
+    try:
+        return await run_in_threadpool(suite_service.get, suite_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Suite not found")
+
+@router.post("/suites/{suite_id}/cancel")
+async def cancel_suite(suite_id: str):
+    try:
+        return await run_in_threadpool(suite_service.cancel, suite_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Suite not found")
+
 # --- File Browser API ---
 
 class FileInfo(BaseModel):
@@ -231,6 +700,8 @@ class FileInfo(BaseModel):
     relativePath: str
     parent: str
     scenarioName: Optional[str] = ""
+    scenarioId: Optional[str] = ""
+    tags: List[str] = []
 
 class DirectoryFiles(BaseModel):
     name: str
@@ -245,14 +716,14 @@ async def list_files():
     directories = []
     
     for dir_config in config.scenario_directories:
-        files = FileService.list_files(dir_config.path)
+        files = await run_in_threadpool(FileService.list_files, dir_config.path)
         directories.append(DirectoryFiles(
             name=dir_config.name,
             files=files
         ))
 
     if config.shared_scenario_dir and os.path.exists(config.shared_scenario_dir):
-        files = FileService.list_files(config.shared_scenario_dir)
+        files = await run_in_threadpool(FileService.list_files, config.shared_scenario_dir)
         directories.append(DirectoryFiles(
             name="scenarios_shared",
             files=files
@@ -260,6 +731,43 @@ async def list_files():
         
     return FileListResponse(directories=directories)
 
+@router.get("/files/index")
+async def get_file_index_stats():
+    return scenario_index.stats()
+
+@router.get("/scenarios/cache")
+async def get_scenario_cache_stats():
+    return scenario_cache.stats()
+
+@router.get("/events")
+async def stream_file_events(request: Request):
+    """
+    シナリオディレクトリの変更 (created / modified / deleted / renamed / rescan) を SSE で配信する。
+    """
+    queue = watch_service.subscribe(scenario_roots(load_config()))
+
+    async def event_stream():
+        try:
+            while True:
+                try:
+                    events = await asyncio.wait_for(queue.get(), timeout=KEEP_ALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield sse_comment()
+                    continue
+                if events is None:
+                    break
+                yield sse_event({"events": events}, event="fs")
+        finally:
+            watch_service.unsubscribe(queue)
+
+    return sse_response(event_stream())
+
+@router.get("/events/status")
+async def get_file_events_status():
+    return watch_service.status()
+
 # --- Scenario API ---
 
 class LoadScenarioRequest(BaseModel):
@@ -269,8 +777,24 @@ class SaveScenarioRequest(BaseModel):
     path: str
     data: Dict[str, Any]
 
+# 読み込み中にファイルが書き換えられた場合に読み直す回数
+LOAD_RETRIES = 3
+
+def _load_version(path: str) -> Tuple[os.stat_result, str]:
+    stat = os.stat(path)
+    return stat, FileService.content_hash(path, stat.st_mtime_ns, stat.st_size)
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match は弱い比較 (W/ を無視して比較する)
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return any((tag[2:] if tag.startswith("W/") else tag) == etag for tag in candidates)
+
 @router.get("/scenarios/load")
-async def load_scenario(path: str):
+async def load_scenario(path: str, request: Request):
     # セキュリティチェック: パストラバーサル防止
     # 簡易チェック: 設定されたディレクトリ配下にあるか確認すべきだが、
     # ローカルツールなのでまずは絶対パスで存在確認のみ。
@@ -278,12 +802,30 @@ async def load_scenario(path: str):
         raise HTTPException(status_code=404, detail="File not found")
         
     try:
-        data = await FileService.load_json(path)
-        last_modified = os.path.getmtime(path)
-        return {
-            "data": data,
-            "last_modified": last_modified
-        }
+        for _ in range(LOAD_RETRIES):
+            stat, content_hash = await run_in_threadpool(_load_version, path)
+            etag = f'"{content_hash}"'
+            headers = {"ETag": etag, "Cache-Control": "no-cache", "X-Last-Modified": str(stat.st_mtime)}
+            # 内容が変わっていなければパースせずに 304 を返す
+            if _etag_matches(request.headers.get("if-none-match"), etag):
+                return Response(status_code=304, headers=headers)
+
+            data = await FileService.load_json(path)
+            # 読み込み中に書き換えられた場合は、返す内容とバージョンがずれないよう読み直す
+            latest = os.stat(path)
+            if (latest.st_mtime_ns, latest.st_size) == (stat.st_mtime_ns, stat.st_size):
+                break
+
+        return JSONResponse(
+            {
+                "data": data,
+                "last_modified": stat.st_mtime,
+                "hash": content_hash,
+            },
+            headers=headers,
+        )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -292,7 +834,20 @@ async def check_file_status(path: str):
     if not os.path.exists(path):
          raise HTTPException(status_code=404, detail="File not found")
     try:
-        return {"last_modified": os.path.getmtime(path)}
+        stat, content_hash = await run_in_threadpool(_load_version, path)
+        return {"last_modified": stat.st_mtime, "hash": content_hash}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+class BatchStatusRequest(BaseModel):
+    paths: List[str]
+    include_hash: bool = True
+
+@router.post("/scenarios/status/batch")
+async def check_files_status(req: BatchStatusRequest):
+    try:
+        files = await run_in_threadpool(FileService.stat_files, req.paths, req.include_hash)
+        return {"files": files}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -300,39 +855,93 @@ class SaveScenarioRequest(BaseModel):
     path: str
     data: Dict[str, Any]
     last_modified: Optional[float] = None
+    base_hash: Optional[str] = None
     force: Optional[bool] = False
 
+def _check_save_conflict(path: str, last_modified: Optional[float], base_hash: Optional[str], force: bool) -> None:
+    """
+    読み込み時のバージョン (mtime または内容ハッシュ) と現在のファイルを比較し、
+    他のプロセスに変更されていれば 409 を返す。
+    """
+    if force or not os.path.exists(path):
+        return
+
+    # Safety Check: Require a concurrency token for existing files if not forced
+    if last_modified is None and base_hash is None:
+         print("[ERROR] Missing last_modified for existing file. Rejecting save.")
+         raise HTTPException(
+            status_code=422,
+            detail="Missing concurrency token. Please reload the editor."
+         )
+
+    stat = os.stat(path)
+    if base_hash is not None:
+        conflict = FileService.content_hash(path, stat.st_mtime_ns, stat.st_size) != base_hash
+    else:
+        # Allow some small epsilon for clock differences or filesystem precision.
+        # If disk version is newer than loaded version, it's a conflict.
+        conflict = stat.st_mtime > last_modified + 0.001
+    if conflict:
+        raise HTTPException(
+            status_code=409,
+            detail="File on disk has changed.",
+            headers={"X-Current-Modified": str(stat.st_mtime)}
+        )
+
+def _version_of(path: str) -> Dict[str, Any]:
+    stat = os.stat(path)
+    return {
+        "last_modified": stat.st_mtime,
+        "hash": FileService.content_hash(path, stat.st_mtime_ns, stat.st_size),
+    }
+
 @router.post("/scenarios/save")
 async def save_scenario(req: SaveScenarioRequest):
     # パスが正当かどうかのチェック（ローカルツールとしての最低限）
     try:
-        file_exists = os.path.exists(req.path)
-
-        # Safety Check: Require last_modified for existing files if not forced
-        if file_exists and not req.force and req.last_modified is None:
-             print("[ERROR] Missing last_modified for existing file. Rejecting save.")
-             raise HTTPException(
-                status_code=422,
-                detail="Missing concurrency token. Please reload the editor."
-             )
-
-        # Conflict Check
-        if not req.force and req.last_modified is not None and file_exists:
-            current_mtime = os.path.getmtime(req.path)
-            
-            # Allow some small epsilon for clock differences or filesystem precision, 
-            # but usually equality or strictly greater check is fine.
-            # If disk version is newer than loaded version, it's a conflict.
-            if current_mtime > req.last_modified + 0.001: 
-                raise HTTPException(
-                    status_code=409, 
-                    detail="File on disk has changed.",
-                    headers={"X-Current-Modified": str(current_mtime)}
-                )
+        await run_in_threadpool(_check_save_conflict, req.path, req.last_modified, req.base_hash, req.force)
 
         await FileService.save_json(req.path, req.data)
-        new_mtime = os.path.getmtime(req.path)
-        return {"status": "success", "path": req.path, "last_modified": new_mtime}
+        version = await run_in_threadpool(_version_of, req.path)
+        return {"status": "success", "path": req.path, **version}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+class PatchScenarioRequest(BaseModel):
+    path: str
+    operations: List[Dict[str, Any]]
+    last_modified: Optional[float] = None
+    base_hash: Optional[str] = None
+    force: Optional[bool] = False
+
+@router.post("/scenarios/patch")
+async def patch_scenario(req: PatchScenarioRequest):
+    """
+    RFC 6902 (JSON Patch) 形式の差分を、読み込み時のバージョンに対して適用して保存する。
+    バージョンは last_modified (mtime) または base_hash (内容ハッシュ) で指定する。
+    差分を適用できない場合は 422 を返すので、クライアントは全体保存にフォールバックする。
+    """
+    if not os.path.exists(req.path):
+        raise HTTPException(status_code=404, detail="File not found")
+
+    try:
+        await run_in_threadpool(_check_save_conflict, req.path, req.last_modified, req.base_hash, req.force)
+
+        if req.operations:
+            data = await FileService.load_json(req.path)
+            try:
+                # 読み込んだ内容はキャッシュと共有しているので、変更する経路だけ複製して適用する
+                data = apply_patch(data, req.operations, in_place=False)
+            except JsonPatchError as e:
+                raise HTTPException(status_code=422, detail=str(e))
+            if not isinstance(data, dict):
+                raise HTTPException(status_code=422, detail="Patched document must be an object")
+            await FileService.save_json(req.path, data)
+
+        version = await run_in_threadpool(_version_of, req.path)
+        return {"status": "success", "path": req.path, **version}
     except HTTPException:
         raise
     except Exception as e:
@@ -363,8 +972,11 @@ async def delete_scenario(path: str):
 # --- Templates API ---
 
 @router.get("/templates")
-async def get_templates():
-    return TemplatesService.get_templates()
+async def get_templates(response: Response, q: str = "", offset: int = 0, limit: Optional[int] = None):
+    """表示順のテンプレート一覧。q で名前を絞り込み、offset / limit でページングする (総件数は X-Total-Count)"""
+    templates, total = TemplatesService.get_templates(q, max(0, offset), limit)
+    response.headers["X-Total-Count"] = str(total)
+    return templates
 
 class CreateTemplateRequest(BaseModel):
     name: str
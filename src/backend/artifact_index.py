@@ -0,0 +1,139 @@
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+EMPTY_ARTIFACTS: Dict[str, Optional[str]] = {"dir": None, "report": None, "log": None, "meta": None}
+# 割り当て済みとして覚えておくディレクトリの数 (古いものから忘れる)
+MAX_CLAIMED = 1000
+LISTING_SETTLE_NS = 2_000_000_000
+
+
+class ArtifactIndex:
+    """
+    実行と reports/ 配下の成果物ディレクトリの対応を管理する。
+    ランナーに run_id を渡している場合は reports/<run_id> をそのまま使う。
+    そうでなければ実行開始時点のディレクトリ一覧を記録しておき、終了時に
+    新しく作られたディレクトリのうち、他の実行がまだ割り当てていないものを割り当てる。
+    同時実行で候補が複数ある場合は、実行の出力や meta.json にシナリオが含まれるものを優先する。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # reports ディレクトリごとの一覧 (ディレクトリの mtime が変わらなければ再取得しない)
+        self._listings: Dict[str, Tuple[int, FrozenSet[str]]] = {}
+        self._baselines: Dict[str, FrozenSet[str]] = {}
+        self._claimed: Dict[str, str] = {}
+
+    def begin(self, run_id: str, framework_path: Path) -> None:
+        """実行開始時に reports/ の現在の内容を記録する"""
+        names = self._list(framework_path / "reports")
+        with self._lock:
+            self._baselines[run_id] = names
+
+    def claim(
+        self,
+        run_id: str,
+        framework_path: Path,
+        hints: Iterable[str] = (),
+        scenario_keys: Iterable[str] = (),
+    ) -> Dict[str, Optional[str]]:
+        """
+        実行に対応する成果物ディレクトリを決めて、report / log / meta のパスを返す。
+        hints は実行の出力 (末尾)、scenario_keys は meta.json に含まれるはずの値 (シナリオ ID など)。
+        """
+        reports_dir = framework_path / "reports"
+        with self._lock:
+            baseline = self._baselines.pop(run_id, None)
+
+        direct = reports_dir / run_id
+        if direct.is_dir():
+            return self._record(run_id, direct)
+        if baseline is None:
+            return dict(EMPTY_ARTIFACTS)
+
+        created = self._list(reports_dir) - baseline
+        with self._lock:
+            candidates = [name for name in sorted(created) if str(reports_dir / name) not in self._claimed]
+        if not candidates:
+            return dict(EMPTY_ARTIFACTS)
+        chosen = self._choose(reports_dir, candidates, list(hints), [key for key in scenario_keys if key])
+        with self._lock:
+            # 判定の間に他の実行が割り当てていれば、残りの候補から選び直す
+            if str(reports_dir / chosen) in self._claimed:
+                remaining = [name for name in candidates if str(reports_dir / name) not in self._claimed]
+                if not remaining:
+                    return dict(EMPTY_ARTIFACTS)
+                chosen = remaining[0]
+            return self._record_locked(run_id, reports_dir / chosen)
+
+    def forget(self, run_id: str) -> None:
+        with self._lock:
+            self._baselines.pop(run_id, None)
+
+    def _choose(self, reports_dir: Path, candidates: List[str], hints: List[str], scenario_keys: List[str]) -> str:
+        if len(candidates) == 1:
+            return candidates[0]
+        # 1. 実行の出力にディレクトリ名が現れるもの (pytest-html のレポートパスなど)
+        text = "\n".join(hints)
+        mentioned = [name for name in candidates if name in text]
+        if len(mentioned) == 1:
+            return mentioned[0]
+        # 2. meta.json にシナリオの識別子を含むもの
+        for name in mentioned or candidates:
+            meta = reports_dir / name / "meta.json"
+            try:
+                content = meta.read_text(encoding="utf-8", errors="replace")
+            except OSError:
+                continue
+            if scenario_keys and all(key in content for key in scenario_keys):
+                return name
+        # 3. 最も早く作られたもの
+        return min(mentioned or candidates, key=lambda name: _mtime(reports_dir / name))
+
+    def _record(self, run_id: str, directory: Path) -> Dict[str, Optional[str]]:
+        with self._lock:
+            return self._record_locked(run_id, directory)
+
+    def _record_locked(self, run_id: str, directory: Path) -> Dict[str, Optional[str]]:
+        self._claimed[str(directory)] = run_id
+        while len(self._claimed) > MAX_CLAIMED:
+            self._claimed.pop(next(iter(self._claimed)))
+        return artifacts_in(directory)
+
+    def _list(self, reports_dir: Path) -> FrozenSet[str]:
+        key = str(reports_dir)
+        try:
+            mtime = os.stat(key).st_mtime_ns
+        except OSError:
+            return frozenset()
+        cached = self._listings.get(key)
+        # mtime の分解能が粗いファイルシステムもあるので、直近に更新された場合は読み直す
+        if cached and cached[0] == mtime and time.time_ns() - mtime > LISTING_SETTLE_NS:
+            return cached[1]
+        names = frozenset(entry.name for entry in os.scandir(key) if entry.is_dir())
+        self._listings[key] = (mtime, names)
+        return names
+
+
+def artifacts_in(directory: Path) -> Dict[str, Optional[str]]:
+    report = directory / "report.html"
+    meta = directory / "meta.json"
+    logs = sorted(directory.glob("run_*.log"))
+    return {
+        "dir": str(directory),
+        "report": str(report) if report.exists() else None,
+        "log": str(logs[0]) if logs else None,
+        "meta": str(meta) if meta.exists() else None,
+    }
+
+
+def _mtime(path: Path) -> float:
+    try:
+        return path.stat().st_mtime
+    except OSError:
+        return float("inf")
+
+
+artifact_index = ArtifactIndex()
@@ -1,13 +1,20 @@
 import os
 import json
+import threading
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .storage import atomic_write_text
 
 CONFIG_FILE_NAME = "config.json"
 TEMPLATES_FILE_NAME = "user_templates.json"
 # プロジェクトルートに保存
 CONFIG_PATH = os.path.join(os.getcwd(), CONFIG_FILE_NAME)
 TEMPLATES_PATH = os.path.join(os.getcwd(), TEMPLATES_FILE_NAME)
+# ui_settings の変更をまとめてから書き込むまでの最大待ち時間 (秒)
+UI_SETTINGS_FLUSH_SECONDS = 2.0
+# 書き込みに失敗したときの再試行間隔の上限 (秒)。失敗するたびに倍にする
+UI_SETTINGS_FLUSH_MAX_SECONDS = 60.0
 
 class ScenarioDirectory(BaseModel):
     name: str
@@ -22,6 +29,28 @@ class ExecutionSettings(BaseModel):
     debug_server_port: int = 0
     debug_auto_close_resources: bool = True
     debug_run_teardown_on_close: bool = True
+    # 同時に動かす pytest プロセスの上限 (0: CPU コア数) と、環境ごとの上限 (未指定の環境は全体の上限のみ)
+    max_concurrent_runs: int = 1
+    env_concurrency: Dict[str, int] = Field(default_factory=dict)
+    # 環境ごとに起動済みのデバッグサーバーを待機させる (対象の環境は未指定なら default_env)
+    debug_warm_pool: bool = False
+    debug_warm_envs: List[str] = Field(default_factory=list)
+    # 同時に開けるデバッグセッションの数と、操作がないセッションを閉じるまでの時間 (0: 閉じない)
+    max_debug_sessions: int = 4
+    debug_session_idle_minutes: int = 30
+    # 実行履歴の保持上限 (件数 / 日数 / ログの合計 MB)。0 は無制限
+    history_max_runs: int = 1000
+    history_max_age_days: int = 30
+    history_max_log_mb: int = 500
+    # シナリオ・ステップの所要時間の統計を残す日数。0 は無制限
+    duration_history_days: int = 180
+    # ランナーに --run-id を渡して成果物を reports/<run_id> に出力させる (対応したフレームワークのみ)
+    pass_run_id: bool = False
+
+class PageObjectSettings(BaseModel):
+    scan_workers: int = 0  # 0: CPU コア数
+    scan_chunk_size: int = 32
+    parallel_scan_threshold: int = 64
 
 class AppConfig(BaseModel):
     scenario_directories: list[ScenarioDirectory] = Field(default_factory=list)
@@ -29,23 +58,166 @@ class AppConfig(BaseModel):
     page_object_folder: Optional[str] = None
     framework_path: Optional[str] = None
     execution_settings: ExecutionSettings = Field(default_factory=ExecutionSettings)
+    page_object_settings: PageObjectSettings = Field(default_factory=PageObjectSettings)
     ui_settings: Optional[dict] = Field(default_factory=dict)
 
-def load_config() -> AppConfig:
-    if os.path.exists(CONFIG_PATH):
+def scenario_roots(config: AppConfig) -> List[str]:
+    """シナリオディレクトリと共有シナリオディレクトリのパス一覧"""
+    roots = [d.path for d in config.scenario_directories]
+    if config.shared_scenario_dir:
+        roots.append(config.shared_scenario_dir)
+    return roots
+
+# (変更前, 変更後) の設定を受け取るコールバック
+ConfigListener = Callable[[AppConfig, AppConfig], None]
+
+class ConfigStore:
+    """
+    パース済みの AppConfig をメモリに保持し、config.json の (mtime_ns, size) が
+    変わったときだけ読み直す。書き込みもここを通し、内容が変わったら購読者へ通知する。
+    ui_settings の差分はメモリ上でマージし、UI_SETTINGS_FLUSH_SECONDS ごと
+    (またはシャットダウン時) にまとめて書き込む。
+    get() が返すインスタンスは共有されるため、呼び出し側で変更しないこと。
+    """
+
+    def __init__(self, path: str):
+        self._path = path
+        self._lock = threading.RLock()
+        self._config: Optional[AppConfig] = None
+        self._signature: Optional[Tuple[int, int]] = None
+        self._listeners: List[ConfigListener] = []
+        # まだ書き込んでいない ui_settings の差分
+        self._pending_ui: dict = {}
+        self._flush_timer: Optional[threading.Timer] = None
+        self._flush_delay = UI_SETTINGS_FLUSH_SECONDS
+        # ロック中に起きた (変更前, 変更後) の一覧。ロックを外してから購読者へ通知する
+        self._changes: List[Tuple[AppConfig, AppConfig]] = []
+        # 通知の順序を保つ。リスナーから get() などを呼べるよう再入可能にしておく
+        self._notify_lock = threading.RLock()
+
+    def get(self) -> AppConfig:
+        signature = self._stat()
+        with self._lock:
+            config = self._get_locked(signature)
+        self._notify()
+        return config
+
+    def save(self, config: AppConfig) -> None:
+        content = config.model_dump_json(indent=2)
+        with self._lock:
+            self._save_locked(config, content)
+        self._notify()
+
+    def update_ui_settings(self, delta: dict) -> AppConfig:
+        """ui_settings に差分をマージする。ディスクへの書き込みは後でまとめて行う"""
+        with self._lock:
+            config = self._merge_ui_settings(self._get_locked(self._stat()), delta)
+            self._pending_ui.update(delta)
+            self._replace(config, self._signature)
+            if self._flush_timer is None:
+                self._schedule_flush(self._flush_delay)
+        self._notify()
+        return config
+
+    def flush(self) -> None:
+        """未書き込みの ui_settings があれば書き込む"""
+        with self._lock:
+            self._cancel_flush()
+            if self._pending_ui:
+                # 待機中に外部で書き換えられていれば、その内容に差分を重ねてから書き込む
+                config = self._get_locked(self._stat())
+                try:
+                    self._save_locked(config, config.model_dump_json(indent=2))
+                except Exception as e:
+                    # 差分は残したまま、間隔を空けて書き込み直す
+                    self._flush_delay = min(self._flush_delay * 2, UI_SETTINGS_FLUSH_MAX_SECONDS)
+                    print(f"Error saving config (retrying in {self._flush_delay:g}s): {e}")
+                    self._schedule_flush(self._flush_delay)
+        self._notify()
+
+    def _get_locked(self, signature: Optional[Tuple[int, int]]) -> AppConfig:
+        if self._config is not None and signature == self._signature:
+            return self._config
+        config = self._read() if signature is not None else AppConfig()
+        if self._pending_ui:
+            # 外部で書き換えられた場合も、未書き込みの UI 設定は失わない
+            config = self._merge_ui_settings(config, self._pending_ui)
+        self._replace(config, signature)
+        return config
+
+    def _save_locked(self, config: AppConfig, content: str) -> None:
+        self._cancel_flush()
+        atomic_write_text(self._path, content)
+        self._pending_ui = {}
+        self._flush_delay = UI_SETTINGS_FLUSH_SECONDS
+        self._replace(config, self._stat())
+
+    def _schedule_flush(self, delay: float) -> None:
+        self._flush_timer = threading.Timer(delay, self.flush)
+        self._flush_timer.daemon = True
+        self._flush_timer.start()
+
+    def _cancel_flush(self) -> None:
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+
+    @staticmethod
+    def _merge_ui_settings(config: AppConfig, delta: dict) -> AppConfig:
+        ui_settings = dict(config.ui_settings or {})
+        ui_settings.update(delta)
+        return config.model_copy(update={"ui_settings": ui_settings})
+
+    def subscribe(self, listener: ConfigListener) -> None:
+        with self._lock:
+            self._listeners.append(listener)
+
+    def _stat(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self._path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _read(self) -> AppConfig:
         try:
-            with open(CONFIG_PATH, "r", encoding="utf-8") as f:
+            with open(self._path, "r", encoding="utf-8") as f:
                 data = json.load(f)
                 return AppConfig(**data)
         except Exception as e:
+            # 壊れたファイルは次に更新されるまで再読み込みしない
             print(f"Error loading config: {e}")
             return AppConfig()
-    return AppConfig()
+
+    def _replace(self, config: AppConfig, signature: Optional[Tuple[int, int]]) -> None:
+        old = self._config
+        self._config = config
+        self._signature = signature
+        if old is None or old == config:
+            return
+        self._changes.append((old, config))
+
+    def _notify(self) -> None:
+        """溜まった変更を購読者へ通知する。self._lock を持たない状態で呼ぶこと"""
+        with self._notify_lock:
+            with self._lock:
+                changes, self._changes = self._changes, []
+                listeners = list(self._listeners)
+            for old, config in changes:
+                for listener in listeners:
+                    try:
+                        listener(old, config)
+                    except Exception as e:
+                        print(f"Error notifying config change: {e}")
+
+config_store = ConfigStore(CONFIG_PATH)
+
+def load_config() -> AppConfig:
+    return config_store.get()
 
 def save_config(config: AppConfig) -> None:
     try:
-        with open(CONFIG_PATH, "w", encoding="utf-8") as f:
-            f.write(config.model_dump_json(indent=2))
+        config_store.save(config)
     except Exception as e:
         print(f"Error saving config: {e}")
         raise e
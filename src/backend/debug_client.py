@@ -0,0 +1,143 @@
+import http.client
+import json
+import select
+import socket
+import threading
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit
+
+DEFAULT_TIMEOUT_SECONDS = 10.0
+# 保持しておくアイドル接続の数 (状態取得・ログ取得・実行が同時に走っても足りる程度)
+POOL_SIZE = 4
+
+# 再利用した接続がサーバー側で閉じられていた場合に発生する例外
+_STALE_ERRORS = (http.client.RemoteDisconnected, http.client.BadStatusLine, ConnectionResetError, BrokenPipeError)
+# 応答の受信中に切断されても、サーバー側で実行済みかもしれないため送り直してよいメソッドに限る
+_IDEMPOTENT_METHODS = ("GET", "HEAD", "DELETE")
+
+
+class _RequestNotSent(ConnectionError):
+    """リクエストを送り終える前に接続が切れた (サーバーには届いていない)"""
+
+
+class DebugServerError(RuntimeError):
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+
+
+class DebugServerClient:
+    """
+    デバッグサーバーへの HTTP クライアント。
+    keep-alive の接続をプールして使い回し、呼び出しごとにタイムアウトを指定できる。
+    スレッドセーフなので、スレッドプールから並行して呼び出してよい。
+    """
+
+    def __init__(self, base_url: str, pool_size: int = POOL_SIZE):
+        parts = urlsplit(base_url)
+        self.base_url = base_url
+        self._host = parts.hostname or "127.0.0.1"
+        self._port = parts.port or 80
+        self._pool_size = pool_size
+        self._idle: List[http.client.HTTPConnection] = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def request(
+        self,
+        method: str,
+        path: str,
+        payload: Optional[Dict[str, Any]] = None,
+        timeout: float = DEFAULT_TIMEOUT_SECONDS,
+    ) -> Dict[str, Any]:
+        body = None
+        headers = {"Accept": "application/json", "Connection": "keep-alive"}
+        if payload is not None:
+            body = json.dumps(payload).encode("utf-8")
+            headers["Content-Type"] = "application/json"
+
+        conn, reused = self._acquire(timeout)
+        try:
+            try:
+                status, data = self._send(conn, method, path, body, headers)
+            except _STALE_ERRORS + (_RequestNotSent,) as exc:
+                conn.close()
+                if not reused or not (method in _IDEMPOTENT_METHODS or isinstance(exc, _RequestNotSent)):
+                    raise
+                # アイドル中に切断されていた接続は、新しい接続で 1 度だけやり直す
+                conn, reused = self._new_connection(timeout), False
+                status, data = self._send(conn, method, path, body, headers)
+        except (OSError, http.client.HTTPException) as exc:
+            conn.close()
+            if isinstance(exc, socket.timeout):
+                raise DebugServerError(f"Debug server did not respond within {timeout:g}s") from exc
+            raise DebugServerError(f"Debug server request failed: {exc}") from exc
+
+        self._release(conn)
+        if status >= 400:
+            raise DebugServerError(_error_message(data), status)
+        return json.loads(data.decode("utf-8"))
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+    def _send(self, conn: http.client.HTTPConnection, method: str, path: str, body: Optional[bytes], headers: Dict[str, str]):
+        try:
+            conn.request(method, path, body=body, headers=headers)
+        except _STALE_ERRORS as exc:
+            raise _RequestNotSent(str(exc) or type(exc).__name__) from exc
+        res = conn.getresponse()
+        data = res.read()
+        if res.will_close:
+            conn.close()
+        return res.status, data
+
+    def _acquire(self, timeout: float):
+        while True:
+            with self._lock:
+                conn = self._idle.pop() if self._idle else None
+            if conn is None:
+                return self._new_connection(timeout), False
+            if not _is_dropped(conn):
+                break
+            conn.close()
+        conn.timeout = timeout
+        if conn.sock is not None:
+            conn.sock.settimeout(timeout)
+        return conn, True
+
+    def _new_connection(self, timeout: float) -> http.client.HTTPConnection:
+        return http.client.HTTPConnection(self._host, self._port, timeout=timeout)
+
+    def _release(self, conn: http.client.HTTPConnection) -> None:
+        if conn.sock is None:
+            return
+        with self._lock:
+            if not self._closed and len(self._idle) < self._pool_size:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+
+def _error_message(body: bytes) -> str:
+    text = body.decode("utf-8", errors="replace")
+    try:
+        detail = json.loads(text)
+        return detail.get("message") or detail.get("error") or text
+    except Exception:
+        return text
+
+
+def _is_dropped(conn: http.client.HTTPConnection) -> bool:
+    # アイドル中の接続が読み取り可能なら、サーバーが閉じた (EOF) か想定外のデータが届いている
+    if conn.sock is None:
+        return True
+    try:
+        readable, _, _ = select.select([conn.sock], [], [], 0)
+    except (OSError, ValueError):
+        return True
+    return bool(readable)
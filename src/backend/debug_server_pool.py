@@ -0,0 +1,317 @@
+import json
+import os
+import queue
+import signal
+import subprocess
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from .config import AppConfig, config_store
+from .debug_client import DebugServerClient
+
+STARTUP_TIMEOUT_SECONDS = 15.0
+SHUTDOWN_TIMEOUT_SECONDS = 5.0
+# 起動時間の統計に使う直近のサンプル数
+STARTUP_SAMPLES = 50
+
+# (framework_path, python_executable, env) が同じサーバーだけを使い回す
+PoolKey = Tuple[str, str, str]
+
+
+class DebugServer:
+    """scripts/debug_server.py の 1 プロセスと、そこへの HTTP クライアント"""
+
+    def __init__(self, framework_path: Path, python_executable: str, env: str, host: str, port: int):
+        self.framework_path = framework_path
+        self.python_executable = python_executable
+        self.env = env
+        self.host = host
+        self.port = port
+        self.process: Optional[subprocess.Popen] = None
+        self.client: Optional[DebugServerClient] = None
+        self.base_url: Optional[str] = None
+        self.startup_seconds: Optional[float] = None
+        self.stderr: Deque[str] = deque(maxlen=200)
+
+    @property
+    def key(self) -> PoolKey:
+        return (str(self.framework_path), self.python_executable, self.env)
+
+    @property
+    def pid(self) -> Optional[int]:
+        return self.process.pid if self.process else None
+
+    def start(self, timeout: float = STARTUP_TIMEOUT_SECONDS) -> "DebugServer":
+        command = [
+            self.python_executable,
+            "scripts/debug_server.py",
+            "--host",
+            self.host,
+            "--port",
+            str(self.port),
+            "--env",
+            self.env,
+        ]
+        creationflags = subprocess.CREATE_NEW_PROCESS_GROUP if os.name == "nt" else 0
+        started = time.monotonic()
+        process = subprocess.Popen(
+            command,
+            cwd=str(self.framework_path),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            encoding="utf-8",
+            errors="replace",
+            creationflags=creationflags,
+            start_new_session=os.name != "nt",
+        )
+        self.process = process
+        handshake: "queue.Queue[str]" = queue.Queue(maxsize=1)
+        threading.Thread(target=self._read_stdout, args=(process, handshake), daemon=True).start()
+        threading.Thread(target=self._read_stderr, args=(process,), daemon=True).start()
+
+        # 1 行目 (ポート通知) はスレッドが読み取って渡すので、ここではポーリングせずに待つ
+        try:
+            first_line = handshake.get(timeout=timeout)
+        except queue.Empty:
+            self.kill()
+            raise RuntimeError("Debug server did not report a port")
+        if not first_line:
+            process.wait(timeout=1)
+            raise RuntimeError(f"Debug server exited: {'; '.join(self.stderr)}")
+
+        try:
+            info = json.loads(first_line)
+            self.base_url = f"http://{info['host']}:{info['port']}"
+        except Exception as exc:
+            self.kill()
+            raise RuntimeError(f"Invalid debug server startup response: {first_line}") from exc
+        self.client = DebugServerClient(self.base_url)
+        self.startup_seconds = time.monotonic() - started
+        return self
+
+    def alive(self) -> bool:
+        return self.process is not None and self.process.poll() is None and self.client is not None
+
+    def request(self, method: str, path: str, payload: Optional[Dict[str, Any]] = None, timeout: float = 10.0) -> Dict[str, Any]:
+        client = self.client
+        if not client:
+            raise RuntimeError("Debug server is not running")
+        return client.request(method, path, payload, timeout=timeout)
+
+    def shutdown(self) -> None:
+        if not self.alive():
+            self._close_client()
+            return
+        try:
+            self.request("POST", "/shutdown", {})
+            self.process.wait(timeout=SHUTDOWN_TIMEOUT_SECONDS)
+        except Exception:
+            self.kill()
+        finally:
+            self._close_client()
+
+    def kill(self) -> None:
+        process = self.process
+        self._close_client()
+        if not process or process.poll() is not None:
+            return
+        if os.name == "nt":
+            subprocess.run(
+                ["taskkill", "/PID", str(process.pid), "/T", "/F"],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                check=False,
+            )
+        else:
+            try:
+                os.killpg(os.getpgid(process.pid), signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def _close_client(self) -> None:
+        if self.client:
+            self.client.close()
+            self.client = None
+
+    def _read_stdout(self, process: subprocess.Popen, handshake: "queue.Queue[str]") -> None:
+        if not process.stdout:
+            handshake.put("")
+            return
+        handshake.put(process.stdout.readline())
+        # 以降の出力も読み捨てて、パイプが詰まってサーバーが止まらないようにする
+        for _ in iter(process.stdout.readline, ""):
+            pass
+        process.stdout.close()
+
+    def _read_stderr(self, process: subprocess.Popen) -> None:
+        if not process.stderr:
+            return
+        for line in iter(process.stderr.readline, ""):
+            self.stderr.append(line.rstrip("\n"))
+        process.stderr.close()
+
+
+class DebugServerPool:
+    """
+    環境ごとに起動済みのデバッグサーバーを 1 つ待機させておくプール。
+    debug_warm_pool が無効な場合は毎回起動し、返却されたサーバーは終了させる
+    (起動時間の計測だけ行う)。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._idle: Dict[PoolKey, List[DebugServer]] = {}
+        self._warming: Dict[PoolKey, threading.Thread] = {}
+        self._startup: Deque[float] = deque(maxlen=STARTUP_SAMPLES)
+        self._stats = {"warm_hits": 0, "cold_starts": 0, "background_starts": 0, "start_failures": 0, "reused": 0}
+        # 設定されたポート (debug_server_port) を使用中、または起動中のサーバー
+        self._port_holder: Optional[DebugServer] = None
+
+    def acquire(self, config: AppConfig, framework_path: Path, python_executable: str, env: str) -> DebugServer:
+        key = (str(framework_path), python_executable, env)
+        server = None
+        with self._lock:
+            idle = self._idle.get(key, [])
+            while idle and server is None:
+                candidate = idle.pop()
+                if candidate.alive():
+                    server = candidate
+                else:
+                    candidate.kill()
+            if server is not None:
+                self._stats["warm_hits"] += 1
+            else:
+                self._stats["cold_starts"] += 1
+
+        if server is None:
+            server = self._start(config, framework_path, python_executable, env, pooled=False)
+        # 使った分をバックグラウンドで補充する
+        self.replenish(config, framework_path, python_executable, env)
+        return server
+
+    def release(self, config: AppConfig, server: DebugServer) -> None:
+        """セッション終了後のサーバーを返却する。空きがあれば次のセッション用に残す"""
+        if config.execution_settings.debug_warm_pool and server.alive() and server.env in self._warm_envs(config):
+            with self._lock:
+                idle = self._idle.setdefault(server.key, [])
+                if not idle:
+                    idle.append(server)
+                    self._stats["reused"] += 1
+                    return
+        server.shutdown()
+
+    def replenish(self, config: AppConfig, framework_path: Path, python_executable: str, env: str) -> None:
+        if not config.execution_settings.debug_warm_pool or env not in self._warm_envs(config):
+            return
+        key = (str(framework_path), python_executable, env)
+        with self._lock:
+            if self._idle.get(key) or (key in self._warming and self._warming[key].is_alive()):
+                return
+            thread = threading.Thread(
+                target=self._warm, args=(config, framework_path, python_executable, env), daemon=True
+            )
+            self._warming[key] = thread
+        thread.start()
+
+    def warm_up(self, config: AppConfig, framework_path: Path, python_executable: str) -> None:
+        for env in self._warm_envs(config):
+            self.replenish(config, framework_path, python_executable, env)
+
+    def drain(self, wait: bool = True) -> None:
+        """待機中のサーバーをすべて終了させる"""
+        with self._lock:
+            servers = [server for idle in self._idle.values() for server in idle]
+            self._idle.clear()
+        if wait:
+            for server in servers:
+                server.shutdown()
+        else:
+            for server in servers:
+                threading.Thread(target=server.shutdown, daemon=True).start()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            samples = sorted(self._startup)
+            idle = {"/".join(key[2:]): len(servers) for key, servers in self._idle.items() if servers}
+            warming = sorted(key[2] for key, thread in self._warming.items() if thread.is_alive())
+            result: Dict[str, Any] = dict(self._stats, idle=idle, warming=warming)
+        result["startup_seconds"] = {
+            "samples": len(samples),
+            "last": round(self._startup[-1], 3) if self._startup else None,
+            "avg": round(sum(samples) / len(samples), 3) if samples else None,
+            "p50": round(samples[len(samples) // 2], 3) if samples else None,
+            "max": round(samples[-1], 3) if samples else None,
+        }
+        return result
+
+    def _warm(self, config: AppConfig, framework_path: Path, python_executable: str, env: str) -> None:
+        try:
+            server = self._start(config, framework_path, python_executable, env, pooled=True)
+        except Exception as e:
+            print(f"Failed to pre-start debug server for {env}: {e}")
+            return
+        with self._lock:
+            # 余ったサーバーの終了を待つ間に補充が止まらないよう、先に起動中の扱いを外す
+            if self._warming.get(server.key) is threading.current_thread():
+                del self._warming[server.key]
+            idle = self._idle.setdefault(server.key, [])
+            if not idle:
+                idle.append(server)
+                server = None
+        if server is not None:
+            server.shutdown()
+
+    def _start(self, config: AppConfig, framework_path: Path, python_executable: str, env: str, pooled: bool) -> DebugServer:
+        host = config.execution_settings.debug_server_host or "127.0.0.1"
+        if host != "127.0.0.1":
+            raise ValueError("Debug server host must be 127.0.0.1")
+        fixed_port = config.execution_settings.debug_server_port
+        server = DebugServer(framework_path, python_executable, env, host, 0)
+        with self._lock:
+            # 複数のサーバーが同時に存在しうるため、待機用のサーバーと、設定されたポートを
+            # 他のサーバー (起動中を含む) が使っている場合は空いているポートを使う
+            holder = self._port_holder
+            holder_busy = holder is not None and (holder.process is None or holder.process.poll() is None)
+            if fixed_port and not pooled and not config.execution_settings.debug_warm_pool and not holder_busy:
+                server.port = fixed_port
+                self._port_holder = server
+        try:
+            server.start()
+        except Exception:
+            with self._lock:
+                self._stats["start_failures"] += 1
+                if self._port_holder is server:
+                    self._port_holder = None
+            raise
+        with self._lock:
+            self._startup.append(server.startup_seconds)
+            if pooled:
+                self._stats["background_starts"] += 1
+        return server
+
+    def _warm_envs(self, config: AppConfig) -> List[str]:
+        settings = config.execution_settings
+        return list(settings.debug_warm_envs) or [settings.default_env or "DEFAULT"]
+
+
+debug_server_pool = DebugServerPool()
+
+
+def _on_config_changed(old: AppConfig, new: AppConfig) -> None:
+    # 待機中のサーバーは起動時の設定で動いているので、関係する設定が変わったら入れ替える
+    old_settings, new_settings = old.execution_settings, new.execution_settings
+    if (
+        old.framework_path != new.framework_path
+        or old_settings.python_executable != new_settings.python_executable
+        or old_settings.debug_warm_pool != new_settings.debug_warm_pool
+        or old_settings.debug_warm_envs != new_settings.debug_warm_envs
+    ):
+        # 設定の保存処理を待たせないよう、終了はバックグラウンドで行う
+        debug_server_pool.drain(wait=False)
+
+
+config_store.subscribe(_on_config_changed)
@@ -1,19 +1,33 @@
-import json
-import os
-import signal
-import subprocess
+import asyncio
 import sys
 import threading
 import time
-import urllib.error
-import urllib.request
-from collections import deque
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Deque, Dict, Optional
+from typing import Any, Dict, List, Optional, Set, Tuple
 
 from pydantic import BaseModel
 
-from .config import AppConfig, load_config
+from .config import AppConfig, config_store, load_config
+from .debug_server_pool import DebugServer, debug_server_pool
+from .duration_store import duration_store
+from .log_stream import LogStream
+from .scenario_cache import scenario_cache
+from .step_timeline import StepTimeline, step_results
+
+# 状態・ログ取得は短く、ステップ実行やクローズ (teardown を含む) は長めに待つ
+STATUS_TIMEOUT_SECONDS = 10.0
+COMMAND_TIMEOUT_SECONDS = 120.0
+# 完了後も結果を取得できるよう保持しておく実行ジョブの数
+MAX_FINISHED_JOBS = 50
+# ログ配信用にデバッグサーバーから状態・ログを取得する間隔 (実行中 / 待機中)
+PUMP_ACTIVE_INTERVAL_SECONDS = 0.25
+PUMP_IDLE_INTERVAL_SECONDS = 2.0
+ACTIVE_STATUSES = {"running", "starting", "cancelling"}
+# アイドル状態のセッションを確認する間隔
+REAPER_INTERVAL_SECONDS = 30.0
 
 
 class DebugSessionCreateRequest(BaseModel):
@@ -35,14 +49,121 @@ class DebugSessionCloseRequest(BaseModel):
     close_resources: Optional[bool] = None
 
 
+class _DebugSession:
+    """1 つのデバッグセッションと、それを動かすデバッグサーバー"""
+
+    def __init__(self, state: Dict[str, Any], server: DebugServer, scenario_path: Path, scenario_id: Optional[str], env: str):
+        self.session_id: str = state["session_id"]
+        self.server = server
+        self.scenario_path = scenario_path
+        self.scenario_id = scenario_id
+        self.env = env
+        self.section_lengths: Dict[str, int] = {}
+        self.state = state
+        # セッション中に実行したステップの結果 (同じステップを再実行すると置き換わる)
+        self.timeline = StepTimeline()
+        # 所要時間を記録するための、実行中のデバッグ実行 (run_id / started_at / 範囲 / 応答待ちか)
+        self.run: Optional[Dict[str, Any]] = None
+        self._run_lock = threading.Lock()
+        self.created_at = time.time()
+        self.last_activity = time.monotonic()
+        self.log_stream: Optional[LogStream] = None
+        self.pump: Optional[threading.Thread] = None
+        # 実行開始などで待機中の取得をすぐに行わせる
+        self.pump_wake = threading.Event()
+
+    @property
+    def key(self) -> Tuple[str, Optional[str]]:
+        return (str(self.scenario_path), self.scenario_id)
+
+    def touch(self) -> None:
+        self.last_activity = time.monotonic()
+
+    def begin_run(self, payload: Dict[str, Any]) -> None:
+        """ステップ実行の要求を送る前に呼ぶ。応答が返るまでは状態が待機中でも実行の終了とみなさない"""
+        with self._run_lock:
+            self.run = {
+                "run_id": uuid.uuid4().hex,
+                "started_at": datetime.now(timezone.utc).isoformat(),
+                "section": payload.get("section"),
+                "step_start": payload.get("step_start"),
+                "step_end": payload.get("step_end"),
+                "pending": True,
+            }
+
+    def end_request(self, failed: bool = False) -> None:
+        with self._run_lock:
+            if self.run is not None:
+                self.run["pending"] = False
+                if failed:
+                    self.run = None
+
+    def observe(self, state: Dict[str, Any]) -> None:
+        """デバッグサーバーから受け取った状態を記録し、直近の実行結果をステップの timeline に取り込む"""
+        self.state = state
+        finished_steps = self.timeline.merge(step_results(state))
+        status = state.get("status")
+        with self._run_lock:
+            if self.run is None and status in ACTIVE_STATUSES:
+                # next など、ステップ実行の要求以外で始まった実行
+                self.run = {"run_id": uuid.uuid4().hex, "started_at": datetime.now(timezone.utc).isoformat(), "pending": False}
+            run = self.run
+            ended = run is not None and not run["pending"] and status not in ACTIVE_STATUSES
+            if ended:
+                self.run = None
+        if finished_steps or ended:
+            try:
+                self._record_durations(run, status, finished_steps, ended)
+            except Exception as e:
+                print(f"Failed to record debug durations: {e}")
+
+    def _record_durations(self, run: Optional[Dict[str, Any]], status: Optional[str], steps: List[Dict[str, Any]], ended: bool) -> None:
+        run_id = run["run_id"] if run else self.session_id
+        if not ended:
+            duration_store.record_steps("debug", run_id, str(self.scenario_path), self.scenario_id, self.env, steps)
+            return
+        duration_store.record_run(
+            "debug",
+            run_id,
+            str(self.scenario_path),
+            self.scenario_id,
+            self.env,
+            status or "unknown",
+            run["started_at"],
+            datetime.now(timezone.utc).isoformat(),
+            mode="debug",
+            section=run.get("section"),
+            step_start=run.get("step_start"),
+            step_end=run.get("step_end"),
+            steps=steps,
+        )
+
+    def request(
+        self,
+        method: str,
+        path: str,
+        payload: Optional[Dict[str, Any]] = None,
+        timeout: float = STATUS_TIMEOUT_SECONDS,
+    ) -> Dict[str, Any]:
+        return self.server.request(method, path, payload, timeout=timeout)
+
+
 class DebugSessionService:
+    """
+    デバッグセッションの一覧を管理する。
+    セッションごとに専用のデバッグサーバー (プロセス) を割り当てるので、
+    複数のシナリオ・環境を同時にデバッグしても互いに影響しない。
+    """
+
     def __init__(self):
         self._lock = threading.RLock()
-        self._process: Optional[subprocess.Popen] = None
-        self._base_url: Optional[str] = None
-        self._session_id: Optional[str] = None
-        self._section_lengths: Dict[str, int] = {}
-        self._stderr: Deque[str] = deque(maxlen=200)
+        self._sessions: "OrderedDict[str, _DebugSession]" = OrderedDict()
+        # サーバー起動中のセッション (同じシナリオの二重起動と上限の判定に使う)
+        self._starting: Set[Tuple[str, Optional[str]]] = set()
+        # close_resources なしで閉じたサーバー (ブラウザなどを開いたまま次のセッションで使う)
+        self._retained: Optional[DebugServer] = None
+        self._jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._reaper: Optional[threading.Thread] = None
 
     def validate_framework(self) -> Dict[str, Any]:
         config = load_config()
@@ -60,14 +181,31 @@ class DebugSessionService:
         framework_path = self._validate_framework_path(config)
         scenario_path = self._validate_scenario_path(config, request.scenario_path)
         env = request.env or config.execution_settings.default_env or "DEFAULT"
+        key = (str(scenario_path), request.scenario_id)
 
         with self._lock:
-            if self._session_id:
-                if self._has_live_session_locked():
-                    raise ValueError("A debug session is already active")
-                self._clear_session_locked()
-            self._ensure_server(config, framework_path, env)
-            state = self._request(
+            stale = [s for s in self._sessions.values() if s.key == key and not s.server.alive()]
+            for session in stale:
+                self._clear_session_locked(session)
+            if key in self._starting or any(s.key == key for s in self._sessions.values()):
+                raise ValueError("A debug session is already active for this scenario")
+            limit = max(1, config.execution_settings.max_debug_sessions)
+            if len(self._sessions) + len(self._starting) >= limit:
+                raise ValueError(f"Too many debug sessions (max {limit})")
+            self._starting.add(key)
+            retained, self._retained = self._retained, None
+
+        # サーバーの起動やセッションの作成は時間がかかるので、ロックの外で行う
+        server = None
+        try:
+            if retained and retained.alive():
+                server = retained
+            else:
+                if retained:
+                    retained.kill()
+                python_executable = self._resolve_python(config, framework_path)
+                server = debug_server_pool.acquire(config, framework_path, python_executable, env)
+            state = server.request(
                 "POST",
                 "/sessions",
                 {
@@ -75,36 +213,158 @@ class DebugSessionService:
                     "scenario_id": request.scenario_id,
                     "env": env,
                 },
+                timeout=COMMAND_TIMEOUT_SECONDS,
             )
-            self._session_id = state["session_id"]
-            self._section_lengths = self._load_section_lengths(scenario_path, request.scenario_id)
-            return state
+            session = _DebugSession(state, server, scenario_path, request.scenario_id, env)
+            session.section_lengths = self._load_section_lengths(scenario_path, request.scenario_id)
+        except Exception:
+            if server:
+                server.shutdown()
+            raise
+        finally:
+            with self._lock:
+                self._starting.discard(key)
 
-    def get_active_session(self) -> Dict[str, Any]:
         with self._lock:
-            session_id = self._session_id
-            if not session_id:
-                return {"active": False, "session": None}
+            if session.session_id in self._sessions:
+                server.shutdown()
+                raise RuntimeError(f"Duplicate debug session id: {session.session_id}")
+            self._sessions[session.session_id] = session
+            self._ensure_reaper_locked()
+        return state
 
-        try:
-            state = self.get_session(session_id)
-            return {"active": True, "session": state}
-        except Exception:
-            with self._lock:
-                self._clear_session_locked()
-            self._shutdown_server()
-            return {"active": False, "session": None}
+    def list_sessions(self) -> List[Dict[str, Any]]:
+        """セッションの一覧 (状態は最後に取得したもの)。デバッグサーバーへの問い合わせは行わない"""
+        now = time.monotonic()
+        with self._lock:
+            sessions = list(self._sessions.values())
+            running = {job["session_id"] for job in self._jobs.values() if job["status"] == "running"}
+        return [
+            {
+                "session_id": session.session_id,
+                "scenario_path": str(session.scenario_path),
+                "scenario_id": session.scenario_id,
+                "env": session.env,
+                "pid": session.server.pid,
+                "alive": session.server.alive(),
+                "status": (session.state or {}).get("status"),
+                "job_running": session.session_id in running,
+                "created_at": session.created_at,
+                "idle_seconds": round(now - session.last_activity, 1),
+            }
+            for session in sessions
+        ]
+
+    def get_active_session(self) -> Dict[str, Any]:
+        """最後に操作されたセッションを返す (画面の再読み込み時の復元用)"""
+        with self._lock:
+            sessions = sorted(self._sessions.values(), key=lambda s: s.last_activity, reverse=True)
+        for session in sessions:
+            try:
+                state = self.get_session(session.session_id)
+                return {"active": True, "session": state}
+            except KeyError:
+                continue
+            except Exception:
+                # 応答しないサーバーはプールへ戻さずに終了させる
+                with self._lock:
+                    self._clear_session_locked(session)
+                session.server.shutdown()
+        return {"active": False, "session": None}
 
     def get_session(self, session_id: str) -> Dict[str, Any]:
-        self._require_session(session_id)
-        return self._request("GET", f"/sessions/{session_id}")
+        session = self._get_session(session_id)
+        state = session.request("GET", f"/sessions/{session_id}")
+        session.observe(state)
+        session.touch()
+        return state
 
     def get_logs(self, session_id: str, offset: int = 0) -> Dict[str, Any]:
-        self._require_session(session_id)
-        return self._request("GET", f"/sessions/{session_id}/logs?offset={offset}")
+        session = self._get_session(session_id)
+        session.touch()
+        return session.request("GET", f"/sessions/{session_id}/logs?offset={offset}")
+
+    def subscribe_logs(self, session_id: str) -> Tuple[LogStream, asyncio.Queue]:
+        """
+        セッションのログ・状態の配信を購読する (イベントループ上から呼び出す)。
+        購読者がいる間はセッションごとに 1 本のスレッドがデバッグサーバーから取得して全購読者へ配信する。
+        """
+        with self._lock:
+            session = self._get_session(session_id)
+            if session.log_stream is None:
+                session.log_stream = LogStream()
+            stream = session.log_stream
+            queue = stream.subscribe()
+            if session.pump is None:
+                session.pump = threading.Thread(target=self._pump_logs, args=(session, stream), daemon=True)
+                session.pump.start()
+            return stream, queue
+
+    def _pump_logs(self, session: _DebugSession, stream: LogStream) -> None:
+        session_id = session.session_id
+        while True:
+            # 終了判定は subscribe_logs と同じロックの下で行い、購読者の取りこぼしを防ぐ
+            with self._lock:
+                if self._sessions.get(session_id) is not session or stream.closed or not stream.has_subscribers():
+                    if session.pump is threading.current_thread():
+                        session.pump = None
+                    return
+            try:
+                state = session.request("GET", f"/sessions/{session_id}")
+                logs = session.request("GET", f"/sessions/{session_id}/logs?offset={stream.next_offset}")
+                stream.append(logs.get("logs") or [], logs.get("next_offset"))
+                stream.set_state(state)
+                session.observe(state)
+                active = state.get("status") in ACTIVE_STATUSES
+                if active:
+                    # 実行中のセッションはアイドル扱いにしない
+                    session.touch()
+            except Exception as exc:
+                stream.set_state({"session_id": session_id, "status": "unreachable", "error": str(exc)})
+                active = False
+            session.pump_wake.wait(PUMP_ACTIVE_INTERVAL_SECONDS if active else PUMP_IDLE_INTERVAL_SECONDS)
+            session.pump_wake.clear()
+
+    def start_run(self, session_id: str, request: DebugSessionRunRequest) -> Dict[str, Any]:
+        """
+        ステップ実行をバックグラウンドのジョブとして開始し、すぐにジョブの状態を返す。
+        入力の検証エラーはジョブを作らずにその場で送出する。
+        """
+        session = self._get_session(session_id)
+        payload = self._build_run_payload(session, request)
+        job = {
+            "job_id": uuid.uuid4().hex,
+            "session_id": session_id,
+            "status": "running",
+            "result": None,
+            "error": None,
+            "started_at": time.time(),
+            "finished_at": None,
+        }
+        with self._lock:
+            # 1 つのセッション (ブラウザ) で同時に実行できるのは 1 件まで
+            if any(j["session_id"] == session_id and j["status"] == "running" for j in self._jobs.values()):
+                raise ValueError("A debug run is already in progress for this session")
+            self._jobs[job["job_id"]] = job
+            self._prune_jobs_locked()
+            snapshot = dict(job)
+        session.touch()
+        threading.Thread(target=self._run_job, args=(session, job, payload), daemon=True).start()
+        return snapshot
+
+    def get_timeline(self, session_id: str) -> Dict[str, Any]:
+        """セッション中に実行したステップの所要時間と結果"""
+        session = self._get_session(session_id)
+        return {"session_id": session_id, "scenario_path": str(session.scenario_path), **session.timeline.summary()}
+
+    def get_job(self, session_id: str, job_id: str) -> Dict[str, Any]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if not job or job["session_id"] != session_id:
+                raise KeyError(job_id)
+            return dict(job)
 
-    def run(self, session_id: str, request: DebugSessionRunRequest) -> Dict[str, Any]:
-        self._require_session(session_id)
+    def _build_run_payload(self, session: _DebugSession, request: DebugSessionRunRequest) -> Dict[str, Any]:
         if request.mode not in {"all", "until", "single", "range", "teardown"}:
             raise ValueError("Invalid debug run mode")
 
@@ -114,23 +374,52 @@ class DebugSessionService:
             payload["section"] = request.section or "steps"
             payload["step_start"] = 0
             if payload.get("step_end") is None:
-                length = self._section_lengths.get(payload["section"], 0)
+                length = session.section_lengths.get(payload["section"], 0)
                 if length == 0:
                     raise ValueError(f"No steps in section: {payload['section']}")
                 payload["step_end"] = length - 1
-        return self._request("POST", f"/sessions/{session_id}/run", payload)
+        return payload
+
+    def _run_job(self, session: _DebugSession, job: Dict[str, Any], payload: Dict[str, Any]) -> None:
+        session_id = job["session_id"]
+        try:
+            session.pump_wake.set()
+            session.begin_run(payload)
+            result = session.request("POST", f"/sessions/{session_id}/run", payload, timeout=COMMAND_TIMEOUT_SECONDS)
+            session.end_request()
+            session.observe(result)
+            update = {"status": "succeeded", "result": result}
+        except Exception as exc:
+            session.end_request(failed=True)
+            update = {"status": "failed", "error": str(exc)}
+        with self._lock:
+            job.update(update, finished_at=time.time())
+        session.touch()
+        session.pump_wake.set()
+
+    def _prune_jobs_locked(self) -> None:
+        finished = [job_id for job_id, job in self._jobs.items() if job["status"] != "running"]
+        for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self._jobs[job_id]
 
     def next(self, session_id: str) -> Dict[str, Any]:
-        self._require_session(session_id)
-        return self._request("POST", f"/sessions/{session_id}/next", {})
+        session = self._get_session(session_id)
+        session.touch()
+        state = session.request("POST", f"/sessions/{session_id}/next", {}, timeout=COMMAND_TIMEOUT_SECONDS)
+        session.observe(state)
+        session.pump_wake.set()
+        return state
 
     def cancel(self, session_id: str) -> Dict[str, Any]:
-        self._require_session(session_id)
-        return self._request("POST", f"/sessions/{session_id}/cancel", {})
+        session = self._get_session(session_id)
+        session.touch()
+        state = session.request("POST", f"/sessions/{session_id}/cancel", {})
+        session.pump_wake.set()
+        return state
 
     def close(self, session_id: str, request: DebugSessionCloseRequest) -> Dict[str, Any]:
         config = load_config()
-        self._require_session(session_id)
+        session = self._get_session(session_id)
         payload = {
             "run_teardown": (
                 config.execution_settings.debug_run_teardown_on_close
@@ -143,149 +432,103 @@ class DebugSessionService:
                 else request.close_resources
             ),
         }
-        state = self._request("DELETE", f"/sessions/{session_id}", payload)
+        state = session.request("DELETE", f"/sessions/{session_id}", payload, timeout=COMMAND_TIMEOUT_SECONDS)
+        released: Optional[DebugServer] = session.server
         with self._lock:
-            self._session_id = None
-            self._section_lengths = {}
-        if payload["close_resources"]:
-            self._shutdown_server()
+            if session.log_stream is not None:
+                session.log_stream.set_state(state)
+            self._clear_session_locked(session)
+            if not payload["close_resources"]:
+                # リソースを開いたままのサーバーは、次に作成するセッションで使い回す
+                released, self._retained = self._retained, session.server
+        if released is not None:
+            # 待機中のサーバーが足りなければ、終了させずに次のセッション用として残す
+            debug_server_pool.release(config, released)
         return state
 
     def force_kill(self, session_id: str) -> Dict[str, Any]:
-        self._require_session(session_id)
+        session = self._get_session(session_id)
         with self._lock:
-            pid = self._process.pid if self._process else None
-            self._kill_process()
-            self._session_id = None
-            self._section_lengths = {}
-            self._base_url = None
+            pid = session.server.pid
+            session.server.kill()
+            self._clear_session_locked(session)
             return {"session_id": session_id, "status": "killed", "pid": pid}
 
-    def _ensure_server(self, config: AppConfig, framework_path: Path, env: str) -> None:
-        if self._process and self._process.poll() is None and self._base_url:
+    def warm_up(self) -> None:
+        """debug_warm_pool が有効なら、対象の環境ごとにデバッグサーバーを起動しておく"""
+        config = load_config()
+        if not config.execution_settings.debug_warm_pool:
             return
-
-        python_executable = self._resolve_python(config, framework_path)
-        host = config.execution_settings.debug_server_host or "127.0.0.1"
-        if host != "127.0.0.1":
-            raise ValueError("Debug server host must be 127.0.0.1")
-        port = config.execution_settings.debug_server_port
-        command = [
-            python_executable,
-            "scripts/debug_server.py",
-            "--host",
-            host,
-            "--port",
-            str(port),
-            "--env",
-            env,
-        ]
-        creationflags = subprocess.CREATE_NEW_PROCESS_GROUP if os.name == "nt" else 0
-        self._stderr.clear()
-        process = subprocess.Popen(
-            command,
-            cwd=str(framework_path),
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-            encoding="utf-8",
-            errors="replace",
-            creationflags=creationflags,
-            start_new_session=os.name != "nt",
-        )
-        self._process = process
-        threading.Thread(target=self._read_stderr, args=(process,), daemon=True).start()
-
-        deadline = time.time() + 15
-        first_line = ""
-        while time.time() < deadline:
-            if process.poll() is not None:
-                raise RuntimeError(f"Debug server exited: {'; '.join(self._stderr)}")
-            first_line = process.stdout.readline() if process.stdout else ""
-            if first_line:
-                break
-            time.sleep(0.05)
-        if not first_line:
-            self._kill_process()
-            raise RuntimeError("Debug server did not report a port")
-
         try:
-            info = json.loads(first_line)
-            self._base_url = f"http://{info['host']}:{info['port']}"
-        except Exception as exc:
-            self._kill_process()
-            raise RuntimeError(f"Invalid debug server startup response: {first_line}") from exc
-
-    def _shutdown_server(self) -> None:
-        with self._lock:
-            if not self._process or self._process.poll() is not None or not self._base_url:
-                self._base_url = None
-                return
-            try:
-                self._request("POST", "/shutdown", {})
-                self._process.wait(timeout=5)
-            except Exception:
-                self._kill_process()
-            finally:
-                self._base_url = None
-                self._process = None
-
-    def _kill_process(self) -> None:
-        process = self._process
-        if not process or process.poll() is not None:
-            self._process = None
+            framework_path = self._validate_framework_path(config)
+        except ValueError:
             return
-        try:
-            if os.name == "nt":
-                subprocess.run(
-                    ["taskkill", "/PID", str(process.pid), "/T", "/F"],
-                    stdout=subprocess.DEVNULL,
-                    stderr=subprocess.DEVNULL,
-                    check=False,
-                )
-            else:
-                os.killpg(os.getpgid(process.pid), signal.SIGTERM)
-        finally:
-            self._process = None
-
-    def _has_live_session_locked(self) -> bool:
-        try:
-            self._request("GET", f"/sessions/{self._session_id}")
-            return True
-        except Exception:
-            return False
-
-    def _clear_session_locked(self) -> None:
-        self._session_id = None
-        self._section_lengths = {}
-
-    def _request(self, method: str, path: str, payload: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
-        if not self._base_url:
-            raise RuntimeError("Debug server is not running")
-        data = None
-        headers = {"Accept": "application/json"}
-        if payload is not None:
-            data = json.dumps(payload).encode("utf-8")
-            headers["Content-Type"] = "application/json"
-        req = urllib.request.Request(f"{self._base_url}{path}", data=data, headers=headers, method=method)
-        try:
-            with urllib.request.urlopen(req, timeout=120) as res:
-                return json.loads(res.read().decode("utf-8"))
-        except urllib.error.HTTPError as exc:
-            body = exc.read().decode("utf-8", errors="replace")
-            try:
-                detail = json.loads(body)
-                message = detail.get("message") or detail.get("error") or body
-            except Exception:
-                message = body
-            raise RuntimeError(message) from exc
+        python_executable = self._resolve_python(config, framework_path)
+        debug_server_pool.warm_up(config, framework_path, python_executable)
 
-    def _read_stderr(self, process: subprocess.Popen) -> None:
-        if not process.stderr:
-            return
-        for line in iter(process.stderr.readline, ""):
-            self._stderr.append(line.rstrip("\n"))
-        process.stderr.close()
+    def shutdown(self) -> None:
+        """アプリ終了時に、使用中のデバッグサーバーを終了させる"""
+        with self._lock:
+            servers = [session.server for session in self._sessions.values()]
+            for session in list(self._sessions.values()):
+                self._clear_session_locked(session)
+            if self._retained:
+                servers.append(self._retained)
+                self._retained = None
+        for server in servers:
+            server.shutdown()
+
+    def pool_stats(self) -> Dict[str, Any]:
+        stats = debug_server_pool.stats()
+        with self._lock:
+            stats["active"] = [
+                {"session_id": session.session_id, "env": session.env, "pid": session.server.pid}
+                for session in self._sessions.values()
+            ]
+        return stats
+
+    def _ensure_reaper_locked(self) -> None:
+        if self._reaper is None:
+            self._reaper = threading.Thread(target=self._reap_idle, daemon=True)
+            self._reaper.start()
+
+    def _reap_idle(self) -> None:
+        """一定時間操作されていないセッションを閉じる。セッションがなくなったら終了する"""
+        while True:
+            time.sleep(REAPER_INTERVAL_SECONDS)
+            timeout = load_config().execution_settings.debug_session_idle_minutes * 60
+            now = time.monotonic()
+            with self._lock:
+                if not self._sessions:
+                    self._reaper = None
+                    return
+                running = {job["session_id"] for job in self._jobs.values() if job["status"] == "running"}
+                idle = [
+                    session
+                    for session in self._sessions.values()
+                    if timeout > 0
+                    and now - session.last_activity > timeout
+                    and session.session_id not in running
+                    and (session.state or {}).get("status") not in ACTIVE_STATUSES
+                ]
+            for session in idle:
+                try:
+                    self.close(session.session_id, DebugSessionCloseRequest())
+                except KeyError:
+                    pass
+                except Exception as e:
+                    print(f"Failed to close idle debug session {session.session_id}: {e}")
+                    with self._lock:
+                        self._clear_session_locked(session)
+                    session.server.kill()
+
+    def _clear_session_locked(self, session: _DebugSession) -> None:
+        if self._sessions.get(session.session_id) is session:
+            del self._sessions[session.session_id]
+        if session.log_stream is not None:
+            session.log_stream.close()
+            session.log_stream = None
+        session.pump_wake.set()
 
     def _resolve_python(self, config: AppConfig, framework_path: Path) -> str:
         configured = (config.execution_settings.python_executable or "").strip()
@@ -325,8 +568,7 @@ class DebugSessionService:
         return path
 
     def _load_section_lengths(self, scenario_path: Path, scenario_id: Optional[str]) -> Dict[str, int]:
-        with open(scenario_path, "r", encoding="utf-8") as file:
-            data = json.load(file)
+        data = scenario_cache.get(str(scenario_path))
         scenarios = data if isinstance(data, list) else [data]
         scenario = None
         for item in scenarios:
@@ -340,10 +582,22 @@ class DebugSessionService:
             for section in ("setup", "steps", "teardown")
         }
 
-    def _require_session(self, session_id: str) -> None:
+    def _get_session(self, session_id: str) -> _DebugSession:
         with self._lock:
-            if not self._session_id or self._session_id != session_id:
+            session = self._sessions.get(session_id)
+            if session is None:
                 raise KeyError(session_id)
+            return session
 
 
 debug_session_service = DebugSessionService()
+
+
+def _on_config_changed(old: AppConfig, new: AppConfig) -> None:
+    # 待機中のサーバーはプール側で入れ替えられるので、新しい設定で起動し直す
+    changed = old.framework_path != new.framework_path or old.execution_settings != new.execution_settings
+    if changed and new.execution_settings.debug_warm_pool:
+        debug_session_service.warm_up()
+
+
+config_store.subscribe(_on_config_changed)
@@ -0,0 +1,328 @@
+import itertools
+import math
+import os
+import sqlite3
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .scenario_cache import scenario_cache
+from .step_timeline import duration_between
+from .storage import cache_path
+
+DURATION_STORE_PATH = cache_path("durations.sqlite3")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS scenario_durations (
+    id INTEGER PRIMARY KEY,
+    source TEXT NOT NULL,
+    run_id TEXT NOT NULL,
+    mode TEXT,
+    scenario_path TEXT,
+    scenario_id TEXT,
+    env TEXT,
+    status TEXT,
+    section TEXT,
+    step_start INTEGER,
+    step_end INTEGER,
+    started_at TEXT NOT NULL,
+    duration_ms INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS step_durations (
+    id INTEGER PRIMARY KEY,
+    source TEXT NOT NULL,
+    run_id TEXT NOT NULL,
+    scenario_path TEXT,
+    scenario_id TEXT,
+    env TEXT,
+    section TEXT NOT NULL,
+    step_index INTEGER NOT NULL,
+    name TEXT,
+    type TEXT,
+    operation TEXT,
+    target TEXT,
+    status TEXT,
+    started_at TEXT NOT NULL,
+    duration_ms INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS scenario_durations_started ON scenario_durations (started_at);
+CREATE INDEX IF NOT EXISTS scenario_durations_scenario ON scenario_durations (scenario_path, started_at);
+CREATE INDEX IF NOT EXISTS step_durations_started ON step_durations (started_at);
+CREATE INDEX IF NOT EXISTS step_durations_target ON step_durations (target, started_at);
+CREATE INDEX IF NOT EXISTS step_durations_operation ON step_durations (operation, started_at);
+CREATE INDEX IF NOT EXISTS step_durations_scenario ON step_durations (scenario_path, section, step_index, started_at);
+"""
+
+_TABLES = {"scenario": "scenario_durations", "step": "step_durations"}
+# 集計の単位ごとの列
+_GROUPS = {
+    "scenario": {
+        "scenario": ("scenario_path", "scenario_id"),
+        "env": ("env",),
+        "mode": ("mode",),
+    },
+    "step": {
+        "target": ("target",),
+        "operation": ("operation",),
+        "type": ("type",),
+        "step": ("scenario_path", "scenario_id", "section", "step_index"),
+        "scenario": ("scenario_path", "scenario_id"),
+        "env": ("env",),
+    },
+}
+_FILTERS = {
+    "scenario": ("source", "mode", "scenario_path", "scenario_id", "env", "status"),
+    "step": ("source", "scenario_path", "scenario_id", "env", "status", "section", "type", "operation", "target"),
+}
+_BUCKETS = {"hour": "%Y-%m-%dT%H:00", "day": "%Y-%m-%d", "week": "%Y-W%W", "month": "%Y-%m"}
+FAILED_STATUSES = ("failed", "error", "timeout")
+
+
+class DurationStore:
+    """
+    シナリオ全体とステップごとの所要時間を時系列で SQLite に記録する。
+    ステップにはシナリオ JSON の type、params の operation (または action)、target を添えて保存し、
+    ターゲットや操作ごとの p50 / p95、期間ごとの推移を集計できるようにする。
+    """
+
+    def __init__(self, path: str = DURATION_STORE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def record_run(
+        self,
+        source: str,
+        run_id: str,
+        scenario_path: str,
+        scenario_id: Optional[str],
+        env: Optional[str],
+        status: str,
+        started_at: str,
+        ended_at: str,
+        mode: Optional[str] = None,
+        section: Optional[str] = None,
+        step_start: Optional[int] = None,
+        step_end: Optional[int] = None,
+        steps: Iterable[Dict[str, Any]] = (),
+    ) -> None:
+        """実行 1 回分の所要時間と、そのステップの所要時間を記録する"""
+        duration_ms = duration_between(started_at, ended_at)
+        step_rows = self._step_rows(source, run_id, scenario_path, scenario_id, env, steps, ended_at)
+        with self._lock:
+            conn = self._connect_locked()
+            if duration_ms is not None:
+                conn.execute(
+                    "INSERT INTO scenario_durations (source, run_id, mode, scenario_path, scenario_id, env, status, "
+                    "section, step_start, step_end, started_at, duration_ms) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (source, run_id, mode, scenario_path, scenario_id, env, status,
+                     section, step_start, step_end, _normalize_time(started_at), duration_ms),
+                )
+            self._insert_steps_locked(conn, step_rows)
+            conn.commit()
+
+    def record_steps(
+        self,
+        source: str,
+        run_id: str,
+        scenario_path: str,
+        scenario_id: Optional[str],
+        env: Optional[str],
+        steps: Iterable[Dict[str, Any]],
+    ) -> None:
+        """終了したステップの所要時間だけを記録する (デバッグ実行で 1 ステップずつ終わる場合など)"""
+        rows = self._step_rows(source, run_id, scenario_path, scenario_id, env, steps, None)
+        if not rows:
+            return
+        with self._lock:
+            conn = self._connect_locked()
+            self._insert_steps_locked(conn, rows)
+            conn.commit()
+
+    def stats(
+        self,
+        kind: str = "step",
+        group_by: str = "target",
+        since_days: int = 30,
+        limit: int = 50,
+        **filters: Optional[str],
+    ) -> Dict[str, Any]:
+        """group_by ごとの件数・p50・p95・平均・最大を、p95 の大きい順に最大 limit 件返す"""
+        table, columns = self._group_columns(kind, group_by)
+        where, params = self._where(kind, since_days, filters)
+        # target を持たないステップなど、集計キーのない記録は除く
+        where = f"{where} AND {columns[0]} IS NOT NULL" if where else f"WHERE {columns[0]} IS NOT NULL"
+        group = ", ".join(columns)
+        sql = f"SELECT {group}, duration_ms, status, started_at FROM {table} {where} ORDER BY {group}, duration_ms"
+        with self._lock:
+            rows = self._connect_locked().execute(sql, params).fetchall()
+        groups = []
+        for key, items in itertools.groupby(rows, key=lambda row: tuple(row[column] for column in columns)):
+            items = list(items)
+            entry = dict(zip(columns, key))
+            entry.update(_aggregate([row["duration_ms"] for row in items]))
+            entry["failures"] = sum(1 for row in items if row["status"] in FAILED_STATUSES)
+            entry["last_at"] = max(row["started_at"] for row in items)
+            groups.append(entry)
+        groups.sort(key=lambda entry: entry["p95_ms"], reverse=True)
+        return {"kind": kind, "group_by": group_by, "since_days": since_days, "groups": groups[:max(1, min(limit, 500))]}
+
+    def trend(self, kind: str = "step", bucket: str = "day", since_days: int = 30, **filters: Optional[str]) -> Dict[str, Any]:
+        """期間 (bucket) ごとの件数・p50・p95・平均を古い順に返す"""
+        table = _TABLES.get(kind)
+        if table is None:
+            raise ValueError(f"Unknown kind: {kind}")
+        if bucket not in _BUCKETS:
+            raise ValueError(f"Unknown bucket: {bucket}")
+        where, params = self._where(kind, since_days, filters)
+        sql = (
+            f"SELECT strftime(?, started_at) AS bucket, duration_ms FROM {table} {where} "
+            "ORDER BY bucket, duration_ms"
+        )
+        with self._lock:
+            rows = self._connect_locked().execute(sql, [_BUCKETS[bucket], *params]).fetchall()
+        points = [
+            {"bucket": key, **_aggregate([row["duration_ms"] for row in items])}
+            for key, items in itertools.groupby(rows, key=lambda row: row["bucket"])
+        ]
+        return {"kind": kind, "bucket": bucket, "since_days": since_days, "points": points}
+
+    def apply_retention(self, max_age_days: int) -> int:
+        """max_age_days より古い記録を削除し、削除した件数を返す (0 で無制限)"""
+        if max_age_days <= 0:
+            return 0
+        cutoff = (datetime.now(timezone.utc) - timedelta(days=max_age_days)).isoformat()
+        with self._lock:
+            conn = self._connect_locked()
+            removed = conn.execute("DELETE FROM scenario_durations WHERE started_at < ?", (cutoff,)).rowcount
+            removed += conn.execute("DELETE FROM step_durations WHERE started_at < ?", (cutoff,)).rowcount
+            conn.commit()
+        return removed
+
+    def _group_columns(self, kind: str, group_by: str) -> Tuple[str, Tuple[str, ...]]:
+        table = _TABLES.get(kind)
+        if table is None:
+            raise ValueError(f"Unknown kind: {kind}")
+        columns = _GROUPS[kind].get(group_by)
+        if columns is None:
+            raise ValueError(f"Cannot group {kind} durations by {group_by}")
+        return table, columns
+
+    def _where(self, kind: str, since_days: int, filters: Dict[str, Optional[str]]) -> Tuple[str, List[Any]]:
+        clauses: List[str] = []
+        params: List[Any] = []
+        if since_days > 0:
+            clauses.append("started_at >= ?")
+            params.append((datetime.now(timezone.utc) - timedelta(days=since_days)).isoformat())
+        for name in _FILTERS[kind]:
+            value = filters.get(name)
+            if value:
+                clauses.append(f"{name} = ?")
+                params.append(value)
+        return (f"WHERE {' AND '.join(clauses)}" if clauses else ""), params
+
+    def _step_rows(
+        self,
+        source: str,
+        run_id: str,
+        scenario_path: str,
+        scenario_id: Optional[str],
+        env: Optional[str],
+        steps: Iterable[Dict[str, Any]],
+        fallback_time: Optional[str],
+    ) -> List[Tuple[Any, ...]]:
+        timed = [step for step in steps or () if isinstance(step.get("duration_ms"), (int, float))]
+        if not timed:
+            return []
+        details = _step_details(scenario_path, scenario_id)
+        rows = []
+        for step in timed:
+            name, step_type, operation, target = details.get((step["section"], step["index"]), (None, None, None, None))
+            started_at = step.get("started_at") or step.get("ended_at") or fallback_time
+            rows.append((
+                source, run_id, scenario_path, scenario_id, env, step["section"], step["index"],
+                step.get("name") or name, step_type, operation, target, step.get("status"),
+                _normalize_time(started_at), int(step["duration_ms"]),
+            ))
+        return rows
+
+    def _insert_steps_locked(self, conn: sqlite3.Connection, rows: List[Tuple[Any, ...]]) -> None:
+        if rows:
+            conn.executemany(
+                "INSERT INTO step_durations (source, run_id, scenario_path, scenario_id, env, section, step_index, "
+                "name, type, operation, target, status, started_at, duration_ms) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    def _connect_locked(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+
+def _step_details(scenario_path: str, scenario_id: Optional[str]) -> Dict[Tuple[str, int], Tuple[Any, ...]]:
+    """シナリオ JSON から (section, index) ごとの name / type / operation / target を引く"""
+    try:
+        data = scenario_cache.get(scenario_path)
+    except (OSError, ValueError):
+        return {}
+    scenarios = data if isinstance(data, list) else [data]
+    scenario = next((item for item in scenarios if isinstance(item, dict) and (not scenario_id or item.get("id") == scenario_id)), None)
+    if scenario is None:
+        return {}
+    details = {}
+    for section in ("setup", "steps", "teardown"):
+        steps = scenario.get(section)
+        if not isinstance(steps, list):
+            continue
+        for index, step in enumerate(steps):
+            if not isinstance(step, dict):
+                continue
+            params = step.get("params") if isinstance(step.get("params"), dict) else {}
+            operation = params.get("operation") or params.get("action")
+            target = params.get("target")
+            details[(section, index)] = (
+                step.get("name"),
+                step.get("type"),
+                str(operation) if operation is not None else None,
+                str(target) if target is not None else None,
+            )
+    return details
+
+
+def _aggregate(durations: List[int]) -> Dict[str, Any]:
+    """昇順に並んだ所要時間の件数・p50・p95・平均・最大"""
+    count = len(durations)
+    return {
+        "count": count,
+        "p50_ms": _percentile(durations, 0.5),
+        "p95_ms": _percentile(durations, 0.95),
+        "avg_ms": round(sum(durations) / count, 1),
+        "max_ms": durations[-1],
+    }
+
+
+def _percentile(durations: List[int], q: float) -> int:
+    # nearest-rank 法
+    return durations[max(0, math.ceil(q * len(durations)) - 1)]
+
+
+def _normalize_time(value: Optional[str]) -> str:
+    """比較・期間集計ができるよう、時刻を UTC の ISO 形式にそろえる"""
+    if value:
+        try:
+            parsed = datetime.fromisoformat(value)
+            if parsed.tzinfo is None:
+                parsed = parsed.replace(tzinfo=timezone.utc)
+            return parsed.astimezone(timezone.utc).isoformat()
+        except (TypeError, ValueError):
+            pass
+    return datetime.now(timezone.utc).isoformat()
+
+
+duration_store = DurationStore()
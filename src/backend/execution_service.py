@@ -1,17 +1,33 @@
+import json
+import math
 import os
 import signal
 import subprocess
 import sys
 import threading
+import time
 import uuid
 from collections import deque
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Deque, Dict, List, Optional
+from typing import Any, Callable, Deque, Dict, List, Optional
 
 from pydantic import BaseModel
 
+from .artifact_index import EMPTY_ARTIFACTS, artifact_index
 from .config import AppConfig, load_config
+from .duration_store import duration_store
+from .log_stream import LogStream
+from .run_log import MAX_READ_LINES, RunLog
+from .run_store import RUN_LOG_DIR, run_store
+from .step_timeline import StepTimeline, step_results
+
+# 完了後もメモリに残しておく実行の数 (それより古いものは run_store から読む)
+MAX_FINISHED_RUNS = 20
+# 待ち時間の見積もりに使う直近の実行時間の数
+DURATION_SAMPLES = 20
+ACTIVE_STATUSES = {"starting", "running", "cancelling"}
+FINISHED_STATUSES = {"succeeded", "failed", "cancelled", "failed_to_start"}
 
 
 class ExecutionRequest(BaseModel):
@@ -35,71 +51,191 @@ class ExecutionState(BaseModel):
     section: str = "steps"
     step_start: Optional[int] = None
     step_end: Optional[int] = None
+    env: str = "DEFAULT"
     command: List[str]
-    started_at: str
+    queued_at: str
+    # 待機中は 1 始まりの順番と、これまでの待ち時間・開始までの見積もり (秒)
+    queue_position: Optional[int] = None
+    wait_seconds: Optional[float] = None
+    estimated_wait_seconds: Optional[float] = None
+    started_at: Optional[str] = None
     ended_at: Optional[str] = None
+    duration_seconds: Optional[float] = None
+    suite_id: Optional[str] = None
     exit_code: Optional[int] = None
     artifacts: Dict[str, Optional[str]] = {}
     error: Optional[str] = None
 
 
 class ExecutionService:
+    """
+    pytest による実行を FIFO のキューに積み、同時実行数の上限
+    (全体: max_concurrent_runs / 環境ごと: env_concurrency) の範囲で順に起動する。
+    上限に達した環境 (またはスイートの workers) の実行は待たせたまま、
+    後ろにある他の実行を先に起動する。
+    """
+
     def __init__(self):
         self._runs: Dict[str, Dict[str, Any]] = {}
-        self._lock = threading.Lock()
+        self._queue: Deque[str] = deque()
+        self._active: Dict[str, str] = {}
+        self._durations: Deque[float] = deque(maxlen=DURATION_SAMPLES)
+        self._listeners: List[Callable[[ExecutionState], None]] = []
+        self._lock = threading.RLock()
+
+    def subscribe(self, listener: Callable[[ExecutionState], None]) -> None:
+        """実行が終了 (成功・失敗・キャンセル) したときに状態を受け取るリスナーを登録する"""
+        self._listeners.append(listener)
 
-    def start(self, request: ExecutionRequest) -> ExecutionState:
+    def start(
+        self,
+        request: ExecutionRequest,
+        suite_id: Optional[str] = None,
+        suite_workers: Optional[int] = None,
+    ) -> ExecutionState:
         config = load_config()
         framework_path = self._validate_framework_path(config)
         scenario_path = self._validate_scenario_path(config, request.scenario_path)
         self._validate_range(request)
 
-        with self._lock:
-            if any(run["state"].status == "running" for run in self._runs.values()):
-                raise ValueError("Another execution is already running")
-
         run_id = f"run_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
         max_log_lines = max(100, config.execution_settings.max_log_lines)
-        logs: Deque[Dict[str, str]] = deque(maxlen=max_log_lines)
-        command = self._build_command(config, framework_path, scenario_path, request)
+        env = request.env or config.execution_settings.default_env or "DEFAULT"
+        command = self._build_command(config, framework_path, scenario_path, request, run_id)
 
         state = ExecutionState(
             run_id=run_id,
-            status="starting",
+            status="queued",
             mode=request.mode,
             scenario_path=str(scenario_path),
             scenario_id=request.scenario_id,
             section=request.section,
             step_start=request.step_start,
             step_end=request.step_end,
+            env=env,
             command=command,
-            started_at=datetime.now(timezone.utc).isoformat(),
+            queued_at=datetime.now(timezone.utc).isoformat(),
+            suite_id=suite_id,
         )
 
-        run = {"state": state, "logs": logs, "process": None, "framework_path": framework_path}
+        run = {
+            "state": state,
+            # 全行はファイルへ、直近の max_log_lines 行はメモリに保持する
+            "logs": RunLog(os.path.join(RUN_LOG_DIR, f"{run_id}.jsonl"), tail_lines=max_log_lines),
+            "process": None,
+            "framework_path": framework_path,
+            "queued": time.monotonic(),
+            "suite_workers": suite_workers,
+            "timeline": StepTimeline(),
+        }
         with self._lock:
             self._runs[run_id] = run
+            self._queue.append(run_id)
+            self._prune_locked()
+            self._dispatch_locked(config)
+            return self._snapshot_locked(run)
 
-        thread = threading.Thread(target=self._run_process, args=(run_id,), daemon=True)
-        thread.start()
-        return state
+    def list(self) -> Dict[str, Any]:
+        config = load_config()
+        with self._lock:
+            runs = [self._snapshot_locked(run) for run in reversed(list(self._runs.values()))]
+            return {
+                "runs": runs,
+                "queued": len(self._queue),
+                "running": len(self._active),
+                "max_concurrent_runs": self._max_concurrent(config),
+                "env_concurrency": dict(config.execution_settings.env_concurrency),
+            }
 
     def get(self, run_id: str) -> ExecutionState:
-        run = self._get_run(run_id)
-        return run["state"]
-
-    def get_logs(self, run_id: str) -> Dict[str, Any]:
-        run = self._get_run(run_id)
-        return {"run_id": run_id, "lines": list(run["logs"])}
+        with self._lock:
+            run = self._runs.get(run_id)
+            if run:
+                return self._snapshot_locked(run)
+        return ExecutionState.model_validate(run_store.get(run_id)["state"])
+
+    def history(self, limit: int = 50, cursor: Optional[str] = None, **filters: Optional[str]) -> Dict[str, Any]:
+        """終了した実行の要約を新しい順にページ単位で返す"""
+        result = run_store.query(limit=limit, cursor=cursor, **filters)
+        result["stats"] = run_store.stats()
+        return result
+
+    def list_artifacts(self, limit: int = 50, cursor: Optional[str] = None, **filters: Optional[str]) -> Dict[str, Any]:
+        """成果物 (report / log / meta) が見つかった終了済みの実行を新しい順に返す"""
+        return run_store.query(limit=limit, cursor=cursor, has_artifacts=True, **filters)
+
+    def find_artifact_owner(self, path: str) -> Dict[str, Any]:
+        """成果物ディレクトリ (またはその中のファイル) を出力した実行を返す"""
+        return run_store.find_by_artifact(path)
+
+    def get_timeline(self, run_id: str) -> Dict[str, Any]:
+        """ステップごとの所要時間と結果 (実行中は途中まで)"""
+        with self._lock:
+            run = self._runs.get(run_id)
+        if run:
+            state: ExecutionState = run["state"]
+            timeline: StepTimeline = run["timeline"]
+        else:
+            record = run_store.get(run_id)
+            state = ExecutionState.model_validate(record["state"])
+            timeline = StepTimeline(record["timeline"])
+        return {"run_id": run_id, "scenario_path": state.scenario_path, "status": state.status, **timeline.summary()}
+
+    def get_logs(self, run_id: str, offset: int = 0, limit: int = MAX_READ_LINES) -> Dict[str, Any]:
+        """offset 以降の行を最大 limit 行返す。続きは next_offset から取得する"""
+        logs = self._get_logs(run_id)
+        lines, next_offset = logs.read(offset, limit)
+        return {"run_id": run_id, "lines": lines, "next_offset": next_offset, "total": logs.count}
+
+    def get_log_stream(self, run_id: str) -> LogStream:
+        return self._get_logs(run_id).stream
+
+    def prune_history(self) -> None:
+        """起動時に保持上限を適用し、記録のないログファイルを削除する"""
+        try:
+            with self._lock:
+                keep = [run["logs"].path for run in self._runs.values()]
+            run_store.remove_orphan_logs(keep)
+            self._apply_retention(load_config())
+        except Exception as e:
+            print(f"Failed to prune execution history: {e}")
 
     def cancel(self, run_id: str) -> ExecutionState:
-        run = self._get_run(run_id)
-        state = run["state"]
-        process = run.get("process")
-        if state.status != "running" or process is None:
-            return state
-
-        state.status = "cancelling"
+        with self._lock:
+            run = self._runs.get(run_id)
+            if run is None:
+                # 履歴に移った実行は既に終了している
+                return self.get(run_id)
+            state = run["state"]
+            if state.status == "queued":
+                # 起動前なら待ち行列から外すだけ
+                self._queue.remove(run_id)
+                state.status = "cancelled"
+                state.ended_at = datetime.now(timezone.utc).isoformat()
+                self._publish_state_locked(run)
+                run["logs"].close()
+                self._dispatch_locked(load_config())
+                cancelled = self._snapshot_locked(run)
+            else:
+                cancelled = None
+                process = run.get("process")
+                if state.status not in ("starting", "running"):
+                    return self._snapshot_locked(run)
+                state.status = "cancelling"
+                self._publish_state_locked(run)
+                if process is None:
+                    # 起動処理中: _run_process が Popen の前後でこの状態を見て停止する
+                    return self._snapshot_locked(run)
+        if cancelled is not None:
+            self._persist(run, cancelled)
+            self._notify_finished(cancelled)
+            return cancelled
+
+        self._terminate(process, state)
+        return self.get(run_id)
+
+    def _terminate(self, process: subprocess.Popen, state: ExecutionState) -> None:
+        """実行中のプロセスをプロセスグループごと停止する"""
         try:
             if os.name == "nt":
                 subprocess.run(
@@ -112,7 +248,145 @@ class ExecutionService:
                 os.killpg(os.getpgid(process.pid), signal.SIGTERM)
         except Exception as exc:
             state.error = f"Failed to cancel process: {exc}"
-        return state
+
+    def _dispatch_locked(self, config: AppConfig) -> None:
+        limit = self._max_concurrent(config)
+        env_limits = config.execution_settings.env_concurrency
+        running_by_env: Dict[str, int] = {}
+        running_by_suite: Dict[str, int] = {}
+        for active_id, env in self._active.items():
+            running_by_env[env] = running_by_env.get(env, 0) + 1
+            suite_id = self._runs[active_id]["state"].suite_id
+            if suite_id:
+                running_by_suite[suite_id] = running_by_suite.get(suite_id, 0) + 1
+
+        for run_id in list(self._queue):
+            if len(self._active) >= limit:
+                break
+            run = self._runs[run_id]
+            env = run["state"].env
+            env_limit = env_limits.get(env)
+            if env_limit is not None and running_by_env.get(env, 0) >= max(1, env_limit):
+                continue
+            suite_id = run["state"].suite_id
+            suite_workers = run["suite_workers"]
+            if suite_id and suite_workers and running_by_suite.get(suite_id, 0) >= suite_workers:
+                continue
+            self._queue.remove(run_id)
+            self._active[run_id] = env
+            running_by_env[env] = running_by_env.get(env, 0) + 1
+            if suite_id:
+                running_by_suite[suite_id] = running_by_suite.get(suite_id, 0) + 1
+            run["state"].status = "starting"
+            run["state"].started_at = datetime.now(timezone.utc).isoformat()
+            run["started"] = time.monotonic()
+            self._publish_state_locked(run)
+            threading.Thread(target=self._run_process, args=(run_id,), daemon=True).start()
+
+        # 順番が変わった待機中の実行にも新しい位置を通知する
+        for run_id in self._queue:
+            self._publish_state_locked(self._runs[run_id])
+
+    def _finish_locked(self, run_id: str) -> None:
+        run = self._runs[run_id]
+        self._active.pop(run_id, None)
+        if "started" in run:
+            duration = time.monotonic() - run["started"]
+            run["state"].duration_seconds = round(duration, 3)
+            self._durations.append(duration)
+        self._dispatch_locked(load_config())
+
+    def _snapshot_locked(self, run: Dict[str, Any]) -> ExecutionState:
+        state: ExecutionState = run["state"]
+        update: Dict[str, Any] = {"queue_position": None, "estimated_wait_seconds": None}
+        if state.status == "queued":
+            position = self._queue.index(state.run_id) + 1
+            update["queue_position"] = position
+            update["wait_seconds"] = round(time.monotonic() - run["queued"], 1)
+            if self._durations:
+                average = sum(self._durations) / len(self._durations)
+                limit = max(1, self._max_concurrent(load_config()))
+                update["estimated_wait_seconds"] = round(average * math.ceil(position / limit), 1)
+        elif "started" in run:
+            update["wait_seconds"] = round(run["started"] - run["queued"], 1)
+        return state.model_copy(update=update)
+
+    def _publish_state_locked(self, run: Dict[str, Any]) -> None:
+        run["logs"].set_state(self._snapshot_locked(run).model_dump())
+
+    def _prune_locked(self) -> None:
+        # 古い終了済みの実行はメモリから外す。終了直後で run_store への保存が済んでいないものは残す
+        finished = [run_id for run_id, run in self._runs.items() if run.get("persisted")]
+        for run_id in finished[:max(0, len(finished) - MAX_FINISHED_RUNS)]:
+            del self._runs[run_id]
+
+    def _persist(self, run: Dict[str, Any], snapshot: ExecutionState) -> None:
+        logs: RunLog = run["logs"]
+        try:
+            run_store.save(
+                snapshot.model_dump(),
+                None if logs.error else logs.path,
+                logs.count,
+                logs.size,
+                logs.index_bytes(),
+                run["timeline"].to_list(),
+            )
+            self._apply_retention(load_config())
+        except Exception as e:
+            print(f"Failed to save execution history: {e}")
+        if snapshot.started_at and snapshot.ended_at:
+            try:
+                duration_store.record_run(
+                    "execution",
+                    snapshot.run_id,
+                    snapshot.scenario_path,
+                    snapshot.scenario_id,
+                    snapshot.env,
+                    snapshot.status,
+                    snapshot.started_at,
+                    snapshot.ended_at,
+                    mode=snapshot.mode,
+                    section=snapshot.section,
+                    step_start=snapshot.step_start,
+                    step_end=snapshot.step_end,
+                    steps=run["timeline"].to_list(),
+                )
+            except Exception as e:
+                print(f"Failed to record durations: {e}")
+        # 保存してからメモリ上の古い実行を外す (保存に失敗した場合も、以降は履歴から読めないので同じ扱い)
+        with self._lock:
+            run["persisted"] = True
+            self._prune_locked()
+
+    def _apply_retention(self, config: AppConfig) -> None:
+        settings = config.execution_settings
+        run_store.apply_retention(settings.history_max_runs, settings.history_max_age_days, settings.history_max_log_mb)
+        duration_store.apply_retention(settings.duration_history_days)
+
+    def _get_logs(self, run_id: str) -> RunLog:
+        with self._lock:
+            run = self._runs.get(run_id)
+            if run:
+                return run["logs"]
+        record = run_store.get(run_id)
+        logs = RunLog.restore(record["log_path"] or "", record["log_lines"], record["log_bytes"], record["log_index"])
+        if not record["log_path"]:
+            logs.error = "Log file was not saved"
+        logs.set_state(record["state"])
+        logs.stream.close()
+        return logs
+
+    def _max_concurrent(self, config: AppConfig) -> int:
+        # 0 以下は CPU コア数 (page_object_settings.scan_workers と同じ扱い)
+        configured = config.execution_settings.max_concurrent_runs
+        return configured if configured > 0 else (os.cpu_count() or 1)
+
+    def _notify_finished(self, state: ExecutionState) -> None:
+        for listener in list(self._listeners):
+            try:
+                listener(state)
+            except Exception as e:
+                print(f"Execution listener failed: {e}")
 
     def validate_framework(self) -> Dict[str, Any]:
         config = load_config()
@@ -125,10 +399,17 @@ class ExecutionService:
     def _run_process(self, run_id: str) -> None:
         run = self._get_run(run_id)
         state: ExecutionState = run["state"]
-        logs: Deque[Dict[str, str]] = run["logs"]
+        logs: RunLog = run["logs"]
         framework_path: Path = run["framework_path"]
 
         try:
+            artifact_index.begin(run_id, framework_path)
+            with self._lock:
+                cancel_requested = state.status == "cancelling"
+            if cancel_requested:
+                # 起動前に取り消されたのでプロセスを作らない
+                state.status = "cancelled"
+                return
             creationflags = subprocess.CREATE_NEW_PROCESS_GROUP if os.name == "nt" else 0
             process = subprocess.Popen(
                 state.command,
@@ -141,11 +422,18 @@ class ExecutionService:
                 creationflags=creationflags,
                 start_new_session=os.name != "nt",
             )
-            run["process"] = process
-            state.status = "running"
+            with self._lock:
+                run["process"] = process
+                cancel_requested = state.status == "cancelling"
+                if not cancel_requested:
+                    state.status = "running"
+                    self._publish_state_locked(run)
+            if cancel_requested:
+                # Popen の間に取り消された
+                self._terminate(process, state)
 
             readers = [
-                threading.Thread(target=self._read_stream, args=(process.stdout, logs, "stdout"), daemon=True),
+                threading.Thread(target=self._read_stream, args=(process.stdout, logs, "stdout", run["timeline"]), daemon=True),
                 threading.Thread(target=self._read_stream, args=(process.stderr, logs, "stderr"), daemon=True),
             ]
             for reader in readers:
@@ -163,24 +451,49 @@ class ExecutionService:
         except Exception as exc:
             state.status = "failed_to_start"
             state.error = str(exc)
-            logs.append({"stream": "stderr", "text": str(exc)})
+            logs.append([{"stream": "stderr", "text": str(exc)}])
         finally:
             state.ended_at = datetime.now(timezone.utc).isoformat()
-            state.artifacts = self._find_artifacts(framework_path, state.started_at)
-
-    def _read_stream(self, stream, logs: Deque[Dict[str, str]], stream_name: str) -> None:
+            state.artifacts = self._claim_artifacts(run_id, framework_path, state, logs)
+            self._load_meta_steps(run["timeline"], state.artifacts.get("meta"))
+            with self._lock:
+                self._finish_locked(run_id)
+                self._publish_state_locked(run)
+                snapshot = self._snapshot_locked(run)
+                # 終了したプロセスのハンドルは保持しない
+                run["process"] = None
+            logs.close()
+            self._persist(run, snapshot)
+            self._notify_finished(snapshot)
+
+    def _read_stream(self, stream, logs: RunLog, stream_name: str, timeline: Optional[StepTimeline] = None) -> None:
         if stream is None:
             return
         for line in iter(stream.readline, ""):
-            logs.append({"stream": stream_name, "text": line.rstrip("\n")})
+            text = line.rstrip("\n")
+            logs.append([{"stream": stream_name, "text": text}])
+            if timeline is not None:
+                # ランナーが出力するステップの開始・終了イベントを取り込む
+                timeline.feed_line(text)
         stream.close()
 
+    def _load_meta_steps(self, timeline: StepTimeline, meta_path: Optional[str]) -> None:
+        """meta.json にステップ結果があれば、出力から得た内容より優先して取り込む"""
+        if not meta_path:
+            return
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                timeline.merge(step_results(json.load(f)))
+        except (OSError, ValueError) as e:
+            print(f"Failed to read step results from {meta_path}: {e}")
+
     def _build_command(
         self,
         config: AppConfig,
         framework_path: Path,
         scenario_path: Path,
         request: ExecutionRequest,
+        run_id: str,
     ) -> List[str]:
         python_executable = self._resolve_python(config, framework_path)
         env = request.env or config.execution_settings.default_env or "DEFAULT"
@@ -204,6 +517,8 @@ class ExecutionService:
             command.extend(["--step-end", str(request.step_end)])
         if not request.include_teardown:
             command.append("--skip-teardown")
+        if config.execution_settings.pass_run_id:
+            command.extend(["--run-id", run_id])
         return command
 
     def _resolve_python(self, config: AppConfig, framework_path: Path) -> str:
@@ -258,27 +573,16 @@ class ExecutionService:
         if request.step_start is not None and request.step_end is not None and request.step_start > request.step_end:
             raise ValueError("step_start must be less than or equal to step_end")
 
-    def _find_artifacts(self, framework_path: Path, started_at: str) -> Dict[str, Optional[str]]:
-        reports_dir = framework_path / "reports"
-        if not reports_dir.exists():
-            return {"report": None, "log": None, "meta": None}
-
-        started = datetime.fromisoformat(started_at)
-        candidates = [p for p in reports_dir.iterdir() if p.is_dir()]
-        candidates.sort(key=lambda p: p.stat().st_mtime, reverse=True)
-
-        for directory in candidates:
-            modified = datetime.fromtimestamp(directory.stat().st_mtime, timezone.utc)
-            if modified >= started:
-                meta = directory / "meta.json"
-                report = directory / "report.html"
-                logs = list(directory.glob("run_*.log"))
-                return {
-                    "report": str(report) if report.exists() else None,
-                    "log": str(logs[0]) if logs else None,
-                    "meta": str(meta) if meta.exists() else None,
-                }
-        return {"report": None, "log": None, "meta": None}
+    def _claim_artifacts(self, run_id: str, framework_path: Path, state: ExecutionState, logs: RunLog) -> Dict[str, Optional[str]]:
+        # 同時実行で候補が複数ある場合は、出力の末尾 (レポートのパス) と meta.json のシナリオで見分ける
+        tail, _, _ = logs.stream.read_since(max(0, logs.count - 200))
+        hints = [line.get("text", "") for line in tail if isinstance(line, dict)]
+        scenario_keys = [Path(state.scenario_path).name, state.scenario_id or ""]
+        try:
+            return artifact_index.claim(run_id, framework_path, hints, scenario_keys)
+        except OSError as e:
+            print(f"Failed to find artifacts for {run_id}: {e}")
+            return dict(EMPTY_ARTIFACTS)
 
     def _get_run(self, run_id: str) -> Dict[str, Any]:
         with self._lock:
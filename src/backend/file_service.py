@@ -1,38 +1,31 @@
+import asyncio
+import hashlib
 import json
 import aiofiles
 from collections import OrderedDict
-from typing import Any, Dict
+from functools import lru_cache
+from typing import Any, Dict, List, Tuple
 import os
 
+from .scenario_cache import scenario_cache
+from .scenario_header import SAVED_KEY_ORDER
+from .scenario_index import scenario_index
+
 class FileService:
     # 保存時のキー順序定義
-    ORDER_PRIORITY = [
-        "id",
-        "name",
-        "tags",
-        "description",
-        "setup",
-        "steps",
-        "teardown"
-    ]
+    ORDER_PRIORITY = list(SAVED_KEY_ORDER)
     EDITOR_KEY = "_editor"
 
     @staticmethod
     async def load_json(path: str) -> Dict[str, Any]:
         """
-        JSONファイルを読み込む。順序を保持するためにOrderedDictを使用するが、
-        Python 3.7+のdictも順序保持するため、標準のjson.loadで十分。
-        ただし、念のためobject_pairs_hookを指定して明示的に扱うことも可能だが、
-        ここでは標準のdict(順序保持)に任せる。
+        JSONファイルを読み込む。順序を保持するためにOrderedDictを使用する。
+        パース結果は scenario_cache で共有されるため、呼び出し側で変更しないこと。
         """
         if not os.path.exists(path):
             raise FileNotFoundError(f"File not found: {path}")
-            
-        async with aiofiles.open(path, mode='r', encoding='utf-8') as f:
-            content = await f.read()
-            # コメント付きJSON等の対応が必要な場合はここで調整するが、
-            # 要件では標準JSON。
-            return json.loads(content, object_pairs_hook=OrderedDict)
+
+        return await asyncio.to_thread(scenario_cache.get, path)
 
     @staticmethod
     async def save_json(path: str, data: Dict[str, Any], indent: int = 2) -> None:
@@ -82,41 +75,68 @@ class FileService:
     @staticmethod
     def list_files(directory: str, extensions: list = None) -> list:
         """
-        指定ディレクトリ配下のファイルを再帰的にリストアップする
+        指定ディレクトリ配下のファイルを再帰的にリストアップする。
+        シナリオ名はメタデータインデックスから取得し、変更のないファイルは再読み込みしない。
         """
         if extensions is None:
             extensions = ['.json']
-            
-        file_list = []
+
         if not os.path.exists(directory):
-            return file_list
-
-        for root, dirs, files in os.walk(directory):
-            for file in files:
-                if any(file.endswith(ext) for ext in extensions):
-                    full_path = os.path.join(root, file)
-                    rel_path = os.path.relpath(full_path, directory)
-                    
-                    # Extract scenario name from file content
-                    scenario_name = ""
-                    try:
-                        with open(full_path, 'r', encoding='utf-8') as f:
-                            data = json.load(f)
-                            # dataが辞書で、かつ'name'キーを持っているか確認
-                            if isinstance(data, dict):
-                                scenario_name = data.get('name', '')
-                    except Exception:
-                        pass # Ignore errors if file is not valid JSON or can't be read
-
-                    # Windowsのパス区切りを統一的に扱うために / に置換することも検討
-                    file_list.append({
-                        "name": file,
-                        "path": full_path,
-                        "relativePath": rel_path.replace(os.path.sep, '/'),
-                        "parent": os.path.basename(root),
-                        "scenarioName": scenario_name
-                    })
-        return file_list
+            return []
+
+        return scenario_index.list_files(directory, extensions)
+
+    @staticmethod
+    def content_hash(path: str, mtime_ns: int, size: int) -> str:
+        """
+        ファイル内容のハッシュを返す。(path, mtime_ns, size) が同じ間はキャッシュした値を使う。
+        """
+        return _content_hash(path, mtime_ns, size)
+
+    @staticmethod
+    def stat_files(paths: List[str], include_hash: bool = True) -> List[Dict[str, Any]]:
+        """
+        複数ファイルの状態 (mtime / size / ハッシュ) をまとめて取得する。
+        ディレクトリごとに os.scandir の結果を使い、パスごとのエラーは結果に含めて返す。
+        """
+        groups: Dict[str, List[Tuple[int, str]]] = {}
+        for i, path in enumerate(paths):
+            directory, name = os.path.split(os.path.abspath(path))
+            groups.setdefault(directory, []).append((i, name))
+
+        results: List[Dict[str, Any]] = [{} for _ in paths]
+        for directory, items in groups.items():
+            try:
+                with os.scandir(directory) as it:
+                    entries = {os.path.normcase(entry.name): entry for entry in it}
+            except OSError as e:
+                for i, _ in items:
+                    results[i] = {"path": paths[i], "exists": False, "error": e.strerror or str(e)}
+                continue
+
+            for i, name in items:
+                entry = entries.get(os.path.normcase(name))
+                if entry is None:
+                    results[i] = {"path": paths[i], "exists": False, "error": "File not found"}
+                    continue
+                try:
+                    if entry.is_dir():
+                        results[i] = {"path": paths[i], "exists": False, "error": "Not a file"}
+                        continue
+                    stat = entry.stat()
+                    result = {
+                        "path": paths[i],
+                        "exists": True,
+                        "last_modified": stat.st_mtime,
+                        "mtime_ns": stat.st_mtime_ns,
+                        "size": stat.st_size,
+                    }
+                    if include_hash:
+                        result["hash"] = _content_hash(entry.path, stat.st_mtime_ns, stat.st_size)
+                    results[i] = result
+                except OSError as e:
+                    results[i] = {"path": paths[i], "exists": False, "error": e.strerror or str(e)}
+        return results
 
     @staticmethod
     def delete_file(path: str) -> None:
@@ -145,3 +165,12 @@ class FileService:
         os.rename(old_path, new_path)
         return new_path
 
+
+
+@lru_cache(maxsize=4096)
+def _content_hash(path: str, mtime_ns: int, size: int) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
@@ -0,0 +1,154 @@
+import copy
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+
+class JsonPatchError(ValueError):
+    pass
+
+
+def parse_pointer(pointer: str) -> List[str]:
+    """RFC 6901 の JSON Pointer をトークンのリストに分解する"""
+    if pointer == "":
+        return []
+    if not pointer.startswith("/"):
+        raise JsonPatchError(f"Invalid JSON pointer: {pointer!r}")
+    return [token.replace("~1", "/").replace("~0", "~") for token in pointer[1:].split("/")]
+
+
+def _array_index(container: list, token: str, allow_end: bool) -> int:
+    if token == "-" and allow_end:
+        return len(container)
+    if not token.isdigit() or (len(token) > 1 and token.startswith("0")):
+        raise JsonPatchError(f"Invalid array index: {token!r}")
+    index = int(token)
+    limit = len(container) if allow_end else len(container) - 1
+    if index > limit:
+        raise JsonPatchError(f"Array index out of range: {token}")
+    return index
+
+
+def _shallow_copy(value: Any) -> Any:
+    # OrderedDict などの型を保ったままコピーする
+    return type(value)(value) if isinstance(value, dict) else list(value)
+
+
+def _resolve_parent(doc: Any, tokens: List[str], copied: Optional[Set[int]] = None) -> Tuple[Any, str]:
+    """
+    copied を渡した場合は、たどったコンテナのうち未コピーのものを浅くコピーして親に付け替える
+    (元のドキュメントを変更せずに、変更される経路だけを複製する)。
+    """
+    current = doc
+    for token in tokens[:-1]:
+        if isinstance(current, dict):
+            if token not in current:
+                raise JsonPatchError(f"Path not found: {token!r}")
+            key: Any = token
+        elif isinstance(current, list):
+            key = _array_index(current, token, allow_end=False)
+        else:
+            raise JsonPatchError(f"Cannot traverse into {type(current).__name__}")
+        child = current[key]
+        if copied is not None and isinstance(child, (dict, list)) and id(child) not in copied:
+            child = _shallow_copy(child)
+            copied.add(id(child))
+            current[key] = child
+        current = child
+    return current, tokens[-1]
+
+
+def _get(doc: Any, tokens: List[str]) -> Any:
+    if not tokens:
+        return doc
+    parent, key = _resolve_parent(doc, tokens)
+    if isinstance(parent, dict):
+        if key not in parent:
+            raise JsonPatchError(f"Path not found: {key!r}")
+        return parent[key]
+    if isinstance(parent, list):
+        return parent[_array_index(parent, key, allow_end=False)]
+    raise JsonPatchError(f"Cannot traverse into {type(parent).__name__}")
+
+
+def _add(doc: Any, tokens: List[str], value: Any, copied: Optional[Set[int]] = None) -> Any:
+    if not tokens:
+        return value
+    parent, key = _resolve_parent(doc, tokens, copied)
+    if isinstance(parent, dict):
+        parent[key] = value
+    elif isinstance(parent, list):
+        parent.insert(_array_index(parent, key, allow_end=True), value)
+    else:
+        raise JsonPatchError(f"Cannot add into {type(parent).__name__}")
+    return doc
+
+
+def _remove(doc: Any, tokens: List[str], copied: Optional[Set[int]] = None) -> Tuple[Any, Any]:
+    if not tokens:
+        raise JsonPatchError("Cannot remove the document root")
+    parent, key = _resolve_parent(doc, tokens, copied)
+    if isinstance(parent, dict):
+        if key not in parent:
+            raise JsonPatchError(f"Path not found: {key!r}")
+        return doc, parent.pop(key)
+    if isinstance(parent, list):
+        return doc, parent.pop(_array_index(parent, key, allow_end=False))
+    raise JsonPatchError(f"Cannot remove from {type(parent).__name__}")
+
+
+def _replace(doc: Any, tokens: List[str], value: Any, copied: Optional[Set[int]] = None) -> Any:
+    if not tokens:
+        return value
+    parent, key = _resolve_parent(doc, tokens, copied)
+    # キーの位置 (オブジェクト内の順序) を変えないよう、その場で置き換える
+    if isinstance(parent, dict):
+        if key not in parent:
+            raise JsonPatchError(f"Path not found: {key!r}")
+        parent[key] = value
+    elif isinstance(parent, list):
+        parent[_array_index(parent, key, allow_end=False)] = value
+    else:
+        raise JsonPatchError(f"Cannot replace in {type(parent).__name__}")
+    return doc
+
+
+def apply_patch(doc: Any, operations: List[Dict[str, Any]], in_place: bool = True) -> Any:
+    """
+    RFC 6902 の操作 (add / remove / replace / move / copy / test) を順に適用する。
+    in_place=True の場合 doc はその場で変更されるので、失敗時に元の内容が必要なら
+    呼び出し側でコピーを渡すこと。in_place=False の場合は変更される経路のコンテナだけを
+    複製し、doc 自体は変更しない (キャッシュ共有中のドキュメント向け)。
+    ルートを置き換える操作があるため、戻り値を新しいドキュメントとして使う。
+    """
+    copied: Optional[Set[int]] = None
+    if not in_place and isinstance(doc, (dict, list)):
+        doc = _shallow_copy(doc)
+        copied = {id(doc)}
+    for i, operation in enumerate(operations):
+        op = operation.get("op")
+        try:
+            tokens = parse_pointer(operation["path"])
+            if op == "add":
+                doc = _add(doc, tokens, copy.deepcopy(operation["value"]), copied)
+            elif op == "remove":
+                doc, _ = _remove(doc, tokens, copied)
+            elif op == "replace":
+                doc = _replace(doc, tokens, copy.deepcopy(operation["value"]), copied)
+            elif op == "move":
+                from_tokens = parse_pointer(operation["from"])
+                if tokens[:len(from_tokens)] == from_tokens and tokens != from_tokens:
+                    raise JsonPatchError("Cannot move a value into one of its children")
+                doc, value = _remove(doc, from_tokens, copied)
+                doc = _add(doc, tokens, value, copied)
+            elif op == "copy":
+                value = copy.deepcopy(_get(doc, parse_pointer(operation["from"])))
+                doc = _add(doc, tokens, value, copied)
+            elif op == "test":
+                if _get(doc, tokens) != operation["value"]:
+                    raise JsonPatchError(f"Test failed at {operation['path']!r}")
+            else:
+                raise JsonPatchError(f"Unknown operation: {op!r}")
+        except KeyError as e:
+            raise JsonPatchError(f"Operation {i} ({op}) is missing {e}") from None
+        except JsonPatchError as e:
+            raise JsonPatchError(f"Operation {i} ({op}) failed: {e}") from None
+    return doc
@@ -0,0 +1,121 @@
+import asyncio
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+
+# 再接続時に再送できるよう保持しておく行数
+DEFAULT_CAPACITY = 5000
+SUBSCRIBER_QUEUE_SIZE = 100
+
+
+class LogStream:
+    """
+    ログ行と状態遷移を SSE 購読者へ配信する。
+    行には先頭からの通し番号 (offset) を振ってリングバッファに保持し、
+    再接続したクライアントは read_since(offset) で取りこぼした分を取得できる。
+    購読者ごとのキューは上限付きで、溢れた場合は溜まった分を捨てて resync を通知する
+    (クライアント側は最後に受け取った offset から読み直す)。
+    """
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, start_offset: int = 0):
+        self._lock = threading.Lock()
+        self._lines: Deque[Any] = deque(maxlen=capacity)
+        # start_offset より前の行は保持していない扱いになる (read_since は complete=False を返す)
+        self._next_offset = start_offset
+        self._state: Optional[Dict[str, Any]] = None
+        self._subscribers: Set[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]] = set()
+        self.closed = False
+
+    @property
+    def next_offset(self) -> int:
+        with self._lock:
+            return self._next_offset
+
+    @property
+    def state(self) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._state
+
+    def has_subscribers(self) -> bool:
+        with self._lock:
+            return bool(self._subscribers)
+
+    def append(self, lines: List[Any], next_offset: Optional[int] = None) -> None:
+        """
+        行を追加する。next_offset を渡した場合は外部 (デバッグサーバー) の通し番号に合わせる。
+        スレッドから呼び出してよい。
+        """
+        with self._lock:
+            if next_offset is None:
+                next_offset = self._next_offset + len(lines)
+            start = next_offset - len(lines)
+            if start < self._next_offset:
+                # 既に受け取った行は読み飛ばす
+                lines = lines[self._next_offset - start:]
+                start = self._next_offset
+            if start > self._next_offset:
+                # 間が欠けた場合は保持分を捨てて番号を合わせる
+                self._lines.clear()
+            if not lines:
+                return
+            self._lines.extend(lines)
+            self._next_offset = start + len(lines)
+            event = {"type": "log", "offset": start, "lines": list(lines), "next_offset": self._next_offset}
+            subscribers = list(self._subscribers)
+        self._publish(subscribers, event)
+
+    def set_state(self, state: Dict[str, Any]) -> None:
+        """状態が変わったときだけ購読者へ通知する"""
+        with self._lock:
+            if state == self._state:
+                return
+            self._state = state
+            subscribers = list(self._subscribers)
+        self._publish(subscribers, {"type": "state", "state": state})
+
+    def read_since(self, offset: int) -> Tuple[List[Any], int, bool]:
+        """offset 以降の保持中の行を返す。古い行が既に捨てられていれば complete=False"""
+        with self._lock:
+            first = self._next_offset - len(self._lines)
+            if offset >= self._next_offset:
+                return [], self._next_offset, True
+            start = max(offset, first)
+            lines = list(self._lines)[start - first:]
+            return lines, self._next_offset, offset >= first
+
+    def subscribe(self) -> asyncio.Queue:
+        """イベントループ上から呼び出す。返されたキューにイベント (終了時は None) が届く"""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        with self._lock:
+            if self.closed:
+                queue.put_nowait(None)
+            else:
+                self._subscribers.add((asyncio.get_running_loop(), queue))
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        with self._lock:
+            self._subscribers = {item for item in self._subscribers if item[1] is not queue}
+
+    def close(self) -> None:
+        with self._lock:
+            self.closed = True
+            subscribers = list(self._subscribers)
+            self._subscribers.clear()
+        self._publish(subscribers, None)
+
+    def _publish(self, subscribers, event: Optional[Dict[str, Any]]) -> None:
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(_put_or_resync, queue, event)
+            except RuntimeError:
+                pass  # event loop already closed
+
+
+def _put_or_resync(queue: asyncio.Queue, event: Optional[Dict[str, Any]]) -> None:
+    if queue.full():
+        # 読み取りが追いつかないクライアントには、溜まったイベントの代わりに読み直しを促す
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait({"type": "resync"})
+    queue.put_nowait(event)
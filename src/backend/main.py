@@ -1,11 +1,31 @@
 import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse
 
 from .api import router as api_router
+from .config import config_store
+from .debug_server_pool import debug_server_pool
+from .debug_session_service import debug_session_service
+from .execution_service import execution_service
+from .page_object_scanner import page_object_watch
+from .watch_service import watch_service
 
-app = FastAPI(title="Scenario Editor")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 最初のデバッグセッションを待たせないよう、待機用のデバッグサーバーを起動しておく
+    debug_session_service.warm_up()
+    execution_service.prune_history()
+    yield
+    watch_service.stop()
+    page_object_watch.stop()
+    debug_session_service.shutdown()
+    debug_server_pool.drain()
+    # 書き込み待ちの UI 設定を保存する
+    config_store.flush()
+
+app = FastAPI(title="Scenario Editor", lifespan=lifespan)
 
 # Include API Router
 app.include_router(api_router)
@@ -24,4 +44,5 @@ async def read_root():
 if __name__ == "__main__":
     import uvicorn
     # Use existing port rule or default to 8000
-    uvicorn.run(app, host="127.0.0.1", port=8000)
+    # SSE などの接続が残っていても停止を待ち続けないようにする
+    uvicorn.run(app, host="127.0.0.1", port=8000, timeout_graceful_shutdown=3)
@@ -1,14 +1,38 @@
 import os
 import ast
+import hashlib
+import json
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import Any, List, Dict, Optional, Set, Tuple
+
+from .config import AppConfig, config_store
+from .scenario_index import walk_files
+from .storage import atomic_write_text, cache_path
+from .watch_service import WatchService
+
+# scan_file の出力形式を変えたら上げる (古いキャッシュは破棄される)
+SCANNER_VERSION = 2
+CACHE_DIR_NAME = "page_objects"
+# 監視できない環境で未知のモジュールを解決する際、直前の走査からこの秒数が経過していればフォルダを再走査する
+RESCAN_INTERVAL_SECONDS = 2.0
+
+# ページオブジェクトフォルダの .py の変更を索引へ反映する
+page_object_watch = WatchService(extensions=[".py"])
 
 def scan_file(path: Path, root_path: Path) -> List[Dict[str, str]]:
+    targets, _ = scan_file_with_error(path, root_path)
+    return targets
+
+def scan_file_with_error(path: Path, root_path: Path) -> Tuple[List[Dict[str, str]], Optional[str]]:
+    """scan_file と同じだが、パースエラーを出力せずに呼び出し元へ返す"""
     targets = []
     try:
         relative_path = path.relative_to(root_path)
     except ValueError:
-        return []
+        return [], None
 
     # Folder segments
     parts = list(relative_path.parts)
@@ -53,45 +77,377 @@ def scan_file(path: Path, root_path: Path) -> List[Dict[str, str]]:
                             "doc": doc
                         })
     except Exception as e:
-        print(f"Error parsing {path}: {e}")
-        
-    return targets
+        return targets, f"{type(e).__name__}: {e}"
 
-def scan_page_objects(root_dir: str) -> List[Dict[str, str]]:
-    targets = []
+    return targets, None
+
+def module_path_of(rel_path: str) -> str:
+    """'app/notepad_page.py' -> 'app.notepad_page'"""
+    if rel_path.endswith(".py"):
+        rel_path = rel_path[:-3]
+    return rel_path.replace("/", ".")
+
+def _scan_chunk(root_dir: str, paths: List[str]) -> List[Tuple[List[Dict[str, str]], Optional[str]]]:
+    # ProcessPoolExecutor のワーカーで実行される
+    root_path = Path(root_dir)
+    return [scan_file_with_error(Path(path), root_path) for path in paths]
+
+class PageObjectScanCache:
+    """
+    scan_file の結果 ({target, doc} のリスト) をファイルごとに保持するキャッシュ。
+    (相対パス, mtime_ns, size, SCANNER_VERSION) が一致するファイルは再パースしない。
+    ルートフォルダごとにディスクへ保存し、サーバー再起動後はそこから読み込む。
+    あわせてモジュールパス -> ファイル、ターゲット -> ファイルの索引を持ち、
+    ターゲットの解決をファイルシステムを探らずに辞書引きで行う。
+    索引は page_object_watch の変更イベントで更新する。
+    """
+
+    def __init__(self, root_dir: str):
+        self.root_path = Path(root_dir)
+        root_key = hashlib.sha1(os.path.abspath(root_dir).encode("utf-8")).hexdigest()[:16]
+        self._cache_file = cache_path(CACHE_DIR_NAME, f"{root_key}.json")
+        self._files: Dict[str, Dict[str, Any]] = {}
+        self._modules: Dict[str, str] = {}
+        self._target_files: Dict[str, str] = {}
+        self._lock = threading.RLock()
+        # エントリが変わるたびに増える (検索インデックスの再構築判定に使う)
+        self.generation = 0
+        self.scanned = False
+        self._last_walk = 0.0
+        # 見つからなかったターゲット (フォルダの内容が変わるまで再走査しない)
+        self._missing: Set[str] = set()
+        self._scan_options = (0, 32, 64)
+        self._load()
+
+    def scan(
+        self,
+        workers: int = 0,
+        chunk_size: int = 32,
+        parallel_threshold: int = 64,
+    ) -> Dict[str, List[Dict[str, str]]]:
+        """
+        キャッシュにないモジュールだけをパースして、全ターゲットとパースエラーを返す。
+        パース対象が parallel_threshold 件以上ならプロセスプールで並列にパースする。
+        """
+        with self._lock:
+            self._scan_options = (workers, chunk_size, parallel_threshold)
+            files: Dict[str, Tuple[int, int]] = {}
+            misses: List[str] = []
+            for _, entry in walk_files(str(self.root_path)):
+                if not entry.name.endswith(".py"):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+
+                rel = Path(entry.path).relative_to(self.root_path).as_posix()
+                files[rel] = (stat.st_mtime_ns, stat.st_size)
+                cached = self._files.get(rel)
+                if not cached or cached["mtime_ns"] != stat.st_mtime_ns or cached["size"] != stat.st_size:
+                    misses.append(rel)
+
+            dirty = bool(misses)
+            for rel, (targets, error) in zip(misses, self._parse(misses, workers, chunk_size, parallel_threshold)):
+                mtime_ns, size = files[rel]
+                self._set_entry(rel, {"mtime_ns": mtime_ns, "size": size, "targets": targets, "error": error})
+
+            for rel in [rel for rel in self._files if rel not in files]:
+                self._remove_entry(rel)
+                dirty = True
+
+            if dirty:
+                self.generation += 1
+                self._missing.clear()
+                self._save()
+            self.scanned = True
+            self._last_walk = time.monotonic()
+
+            targets = []
+            errors = []
+            for rel in sorted(files):
+                entry = self._files[rel]
+                targets.extend(entry["targets"])
+                if entry.get("error"):
+                    errors.append({"path": rel, "error": entry["error"]})
+
+        # Sort results
+        targets.sort(key=lambda x: x["target"])
+        return {"targets": targets, "errors": errors}
+
+    def all_targets(self) -> List[Dict[str, str]]:
+        """ファイルを走査せずに、現在キャッシュされている全ターゲットを返す"""
+        with self._lock:
+            targets = [target for entry in self._files.values() for target in entry["targets"]]
+        targets.sort(key=lambda x: x["target"])
+        return targets
+
+    def find_file(self, target: str) -> Optional[str]:
+        """ターゲットに対応するファイルの相対パスを、最長一致するモジュールパスから求める"""
+        parts = target.split(".")
+        with self._lock:
+            for i in range(len(parts), 0, -1):
+                rel = self._modules.get(".".join(parts[:i]))
+                if rel is not None:
+                    return rel
+        return None
+
+    def rescan_file(self, rel: str, save: bool = True) -> Optional[Dict[str, Any]]:
+        """
+        1 ファイルだけを stat し、変更されていれば再パースしてキャッシュと索引を更新する。
+        ファイルが消えていれば None を返す。
+        """
+        path = self.root_path / rel
+        with self._lock:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                if rel in self._files:
+                    self._remove_entry(rel)
+                    self.generation += 1
+                    if save:
+                        self._save()
+                return None
+
+            entry = self._files.get(rel)
+            if entry and entry["mtime_ns"] == stat.st_mtime_ns and entry["size"] == stat.st_size:
+                return entry
+
+            targets, error = scan_file_with_error(path, self.root_path)
+            entry = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "targets": targets, "error": error}
+            self._set_entry(rel, entry)
+            self.generation += 1
+            if save:
+                self._save()
+            return entry
+
+    def resolve(self, targets: List[str]) -> List[Dict[str, Any]]:
+        """
+        複数のターゲットをまとめて検証する。
+        フォルダを監視できていれば索引は最新なので、ファイルシステムを探らずに辞書引きだけで答える。
+        監視できない場合は該当ファイルを 1 回ずつ stat し、未知のモジュールがあれば
+        直前の走査から RESCAN_INTERVAL_SECONDS 以上経っている場合に限りフォルダを再走査する。
+        見つからなかったターゲットは、フォルダの内容が変わるまで再走査の対象にしない。
+        """
+        with self._lock:
+            if not self.scanned:
+                self.scan(*self._scan_options)
+
+            watched = page_object_watch.is_watching(str(self.root_path))
+            files = {target: self.find_file(target) for target in targets}
+            unknown = [target for target, rel in files.items() if rel is None and target not in self._missing]
+            if unknown and not watched and time.monotonic() - self._last_walk >= RESCAN_INTERVAL_SECONDS:
+                self.scan(*self._scan_options)
+                files = {target: self.find_file(target) for target in targets}
+            self._missing.update(target for target, rel in files.items() if rel is None)
+
+            if watched:
+                alive = {rel: rel in self._files for rel in set(files.values()) if rel is not None}
+            else:
+                generation = self.generation
+                alive = {
+                    rel: self.rescan_file(rel, save=False) is not None
+                    for rel in set(files.values()) if rel is not None
+                }
+                if self.generation != generation:
+                    self._save()
+
+            results = []
+            for target in targets:
+                rel = files[target]
+                exists = rel is not None and alive[rel]
+                results.append({
+                    "target": target,
+                    "valid": exists and self._target_files.get(target) == rel,
+                    "file": rel if exists else None,
+                })
+            return results
+
+    def apply_events(self, events: List[Dict[str, Any]]) -> None:
+        """page_object_watch の変更イベントを索引へ反映する"""
+        with self._lock:
+            generation = self.generation
+            for event in events:
+                if event["type"] == "rescan":
+                    # ディレクトリの追加・削除など: 次の参照時にフォルダを走査し直す
+                    self.scanned = False
+                    continue
+                for path in (event.get("old_path"), event.get("path")):
+                    if not path:
+                        continue
+                    try:
+                        rel = Path(path).relative_to(self.root_path).as_posix()
+                    except ValueError:
+                        continue
+                    self.rescan_file(rel, save=False)
+            self._missing.clear()
+            if self.generation != generation:
+                self._save()
+
+    def file_targets(self, rel: str) -> List[Dict[str, str]]:
+        with self._lock:
+            entry = self._files.get(rel)
+            return list(entry["targets"]) if entry else []
+
+    def _set_entry(self, rel: str, entry: Dict[str, Any]) -> None:
+        old = self._files.get(rel)
+        if old:
+            for item in old["targets"]:
+                if self._target_files.get(item["target"]) == rel:
+                    del self._target_files[item["target"]]
+        self._files[rel] = entry
+        self._modules[module_path_of(rel)] = rel
+        for item in entry["targets"]:
+            self._target_files[item["target"]] = rel
+
+    def _remove_entry(self, rel: str) -> None:
+        entry = self._files.pop(rel)
+        if self._modules.get(module_path_of(rel)) == rel:
+            del self._modules[module_path_of(rel)]
+        for item in entry["targets"]:
+            if self._target_files.get(item["target"]) == rel:
+                del self._target_files[item["target"]]
+
+    def _parse(
+        self,
+        rel_paths: List[str],
+        workers: int,
+        chunk_size: int,
+        parallel_threshold: int,
+    ) -> List[Tuple[List[Dict[str, str]], Optional[str]]]:
+        paths = [str(self.root_path / rel) for rel in rel_paths]
+        max_workers = workers if workers > 0 else (os.cpu_count() or 1)
+        if max_workers <= 1 or len(paths) < max(parallel_threshold, 1):
+            return _scan_chunk(str(self.root_path), paths)
+
+        chunk_size = max(chunk_size, 1)
+        chunks = [paths[i:i + chunk_size] for i in range(0, len(paths), chunk_size)]
+        results: List[Tuple[List[Dict[str, str]], Optional[str]]] = []
+        try:
+            with ProcessPoolExecutor(max_workers=min(max_workers, len(chunks))) as executor:
+                # map は投入順に結果を返すので、結合結果は逐次実行と同じになる
+                for chunk_result in executor.map(_scan_chunk, [str(self.root_path)] * len(chunks), chunks):
+                    results.extend(chunk_result)
+        except Exception as e:
+            print(f"Parallel page object scan failed, falling back to serial scan: {e}")
+            return _scan_chunk(str(self.root_path), paths)
+        return results
+
+    def _load(self) -> None:
+        if not os.path.exists(self._cache_file):
+            return
+        try:
+            with open(self._cache_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == SCANNER_VERSION:
+                for rel, entry in data.get("files", {}).items():
+                    self._set_entry(rel, entry)
+        except Exception as e:
+            print(f"Error loading page object cache: {e}")
+            self._files = {}
+            self._modules = {}
+            self._target_files = {}
+
+    def _save(self) -> None:
+        content = json.dumps(
+            {"version": SCANNER_VERSION, "root": os.path.abspath(self.root_path), "files": self._files},
+            ensure_ascii=False,
+        )
+        try:
+            atomic_write_text(self._cache_file, content)
+        except Exception as e:
+            print(f"Error saving page object cache: {e}")
+
+
+_scan_caches: Dict[str, PageObjectScanCache] = {}
+_scan_caches_lock = threading.Lock()
+
+
+def get_scan_cache(root_dir: str) -> PageObjectScanCache:
+    key = os.path.abspath(root_dir)
+    with _scan_caches_lock:
+        cache = _scan_caches.get(key)
+        if cache is None:
+            cache = PageObjectScanCache(root_dir)
+            _scan_caches[key] = cache
+            roots = list(_scan_caches)
+        else:
+            return cache
+    page_object_watch.set_roots(roots)
+    return cache
+
+
+def retain_scan_caches(root_dir: Optional[str]) -> None:
+    """root_dir 以外のルートのキャッシュをメモリから外す (ディスク上のキャッシュは残す)"""
+    key = os.path.abspath(root_dir) if root_dir else None
+    with _scan_caches_lock:
+        for other in [other for other in _scan_caches if other != key]:
+            del _scan_caches[other]
+        roots = list(_scan_caches)
+    page_object_watch.set_roots(roots)
+
+
+def _on_page_object_events(events: List[Dict[str, Any]]) -> None:
+    with _scan_caches_lock:
+        caches = list(_scan_caches.items())
+    for root, cache in caches:
+        prefix = root.rstrip(os.sep) + os.sep
+        matched = [
+            event for event in events
+            if event["type"] == "rescan"
+            or any(path and path.startswith(prefix) for path in (event.get("path"), event.get("old_path")))
+        ]
+        if matched:
+            cache.apply_events(matched)
+
+
+page_object_watch.add_listener(_on_page_object_events)
+
+
+def _on_config_changed(old: AppConfig, new: AppConfig) -> None:
+    if new.page_object_folder != old.page_object_folder:
+        retain_scan_caches(new.page_object_folder)
+
+
+config_store.subscribe(_on_config_changed)
+
+
+def scan_page_objects(
+    root_dir: str,
+    workers: int = 0,
+    chunk_size: int = 32,
+    parallel_threshold: int = 64,
+) -> Dict[str, List[Dict[str, str]]]:
+    """
+    root_dir 配下のページオブジェクトを走査する。
+    戻り値は {"targets": [{target, doc}, ...], "errors": [{path, error}, ...]}。
+    """
     root_path = Path(root_dir)
     
     if not root_path.exists():
-        return []
-    
-    for str_path in root_path.rglob("*.py"):
-        path = Path(str_path)
-        targets.extend(scan_file(path, root_path))
-            
-    # Sort results
-    targets.sort(key=lambda x: x["target"])
-    return targets
+        return {"targets": [], "errors": []}
+
+    return get_scan_cache(root_dir).scan(workers, chunk_size, parallel_threshold)
 
 def find_file_by_target(target: str, root_dir: str) -> Optional[Path]:
     """
     Attempts to find the python file corresponding to a target string.
     Target format: module.path.ClassName.method
+    スキャン時に作成したモジュール索引を引くため、ファイルシステムは探らない。
     """
     root_path = Path(root_dir)
     if not root_path.exists():
         return None
-        
-    parts = target.split('.')
-    # Try different split points to find a valid file
-    # We essentially walk backwards from the end of the parts list
-    # expecting that some prefix of the parts + ".py" corresponds to a file
-    
-    for i in range(len(parts), 0, -1):
-        # Try constructing path from parts[:i]
-        possible_rel_path = Path(*parts[:i]).with_suffix('.py')
-        possible_full_path = root_path / possible_rel_path
-        
-        if possible_full_path.exists() and possible_full_path.is_file():
-            return possible_full_path
-            
-    return None
+
+    cache = get_scan_cache(root_dir)
+    rel = cache.find_file(target)
+    if rel is None:
+        # 索引にない (新規ファイルの可能性がある) 場合は resolve の再走査に任せる
+        rel = cache.resolve([target])[0]["file"]
+    return root_path / rel if rel else None
+
+def resolve_targets(root_dir: str, targets: List[str]) -> List[Dict[str, Any]]:
+    """[{target, valid, file}] を targets と同じ順序で返す"""
+    if not Path(root_dir).exists():
+        return [{"target": target, "valid": False, "file": None} for target in targets]
+    return get_scan_cache(root_dir).resolve(targets)
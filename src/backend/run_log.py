@@ -0,0 +1,112 @@
+import json
+import os
+import threading
+from array import array
+from typing import Any, Dict, List, Optional, Tuple
+
+from .log_stream import LogStream
+
+# この行数ごとにファイル内のバイト位置を索引に記録する
+INDEX_STRIDE = 128
+# 1 回の取得で返す行数の上限
+MAX_READ_LINES = 5000
+
+
+class RunLog:
+    """
+    1 回の実行のログ。全行を JSON Lines のファイルに追記し、直近の行だけを LogStream に保持する。
+    ファイルには INDEX_STRIDE 行ごとのバイト位置を索引として持ち、
+    メモリから溢れた古い範囲は索引からシークして読み出す。
+    """
+
+    def __init__(self, path: str, tail_lines: int, start_offset: int = 0):
+        self.path = path
+        self.stream = LogStream(capacity=tail_lines, start_offset=start_offset)
+        self._lock = threading.Lock()
+        self._file = None
+        self._index = array("Q")
+        self._count = 0
+        self.size = 0
+        self.error: Optional[str] = None
+
+    @classmethod
+    def restore(cls, path: str, count: int, size: int, index: bytes) -> "RunLog":
+        """終了済みの実行のログを、保存しておいた索引を使ってファイルから読めるようにする"""
+        log = cls(path, tail_lines=1, start_offset=count)
+        log._count = count
+        log.size = size
+        log._index.frombytes(index)
+        return log
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    def index_bytes(self) -> bytes:
+        with self._lock:
+            return self._index.tobytes()
+
+    def append(self, lines: List[Any]) -> None:
+        encoded = [json.dumps(line, ensure_ascii=False).encode("utf-8") + b"\n" for line in lines]
+        with self._lock:
+            self._write_locked(encoded)
+            # ファイルと同じ順序で通し番号を振るため、ロックの中で追加する
+            self.stream.append(lines)
+
+    def read(self, offset: int, limit: int = MAX_READ_LINES) -> Tuple[List[Any], int]:
+        """offset から最大 limit 行と、次に読む offset を返す"""
+        limit = max(1, min(limit, MAX_READ_LINES))
+        lines, next_offset, complete = self.stream.read_since(offset)
+        if complete or self.error:
+            lines = lines[:limit]
+            return lines, (max(offset, 0) + len(lines) if lines else next_offset)
+
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+            end = min(self._count, offset + limit)
+        start = max(0, offset)
+        with open(self.path, "rb") as f:
+            f.seek(self._index[start // INDEX_STRIDE])
+            for _ in range(start % INDEX_STRIDE):
+                f.readline()
+            lines = [json.loads(f.readline()) for _ in range(end - start)]
+        return lines, end
+
+    def set_state(self, state: Dict[str, Any]) -> None:
+        self.stream.set_state(state)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+        self.stream.close()
+
+    def delete(self) -> None:
+        self.close()
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    def _write_locked(self, encoded: List[bytes]) -> None:
+        if self.error is None and self._file is None:
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                self._file = open(self.path, "ab")
+            except OSError as e:
+                # 書き込めない場合はメモリ上の直近の行だけを保持する
+                self.error = str(e)
+        for data in encoded:
+            if self._count % INDEX_STRIDE == 0:
+                self._index.append(self.size)
+            self._count += 1
+            self.size += len(data)
+        if self._file is not None:
+            try:
+                self._file.write(b"".join(encoded))
+            except OSError as e:
+                self.error = str(e)
+                self._file.close()
+                self._file = None
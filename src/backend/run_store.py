@@ -0,0 +1,243 @@
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from .storage import cache_path
+
+RUN_STORE_PATH = cache_path("runs.sqlite3")
+RUN_LOG_DIR = cache_path("run_logs")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    mode TEXT,
+    scenario_path TEXT,
+    scenario_id TEXT,
+    env TEXT,
+    suite_id TEXT,
+    queued_at TEXT,
+    started_at TEXT,
+    ended_at TEXT NOT NULL,
+    duration_seconds REAL,
+    exit_code INTEGER,
+    error TEXT,
+    log_path TEXT,
+    log_lines INTEGER NOT NULL DEFAULT 0,
+    log_bytes INTEGER NOT NULL DEFAULT 0,
+    log_index BLOB,
+    artifact_dir TEXT,
+    artifacts TEXT,
+    timeline TEXT,
+    state TEXT NOT NULL
+);
+"""
+# 既存のデータベースに後から追加した列
+_ADDED_COLUMNS = {"artifact_dir": "TEXT", "artifacts": "TEXT", "timeline": "TEXT"}
+_INDEXES = """
+CREATE INDEX IF NOT EXISTS runs_ended ON runs (ended_at, run_id);
+CREATE INDEX IF NOT EXISTS runs_scenario ON runs (scenario_path, ended_at);
+CREATE INDEX IF NOT EXISTS runs_suite ON runs (suite_id);
+CREATE INDEX IF NOT EXISTS runs_artifact_dir ON runs (artifact_dir);
+"""
+
+# 一覧で返す列 (state 全体やログの索引は個別の取得時だけ読む)
+_SUMMARY_COLUMNS = (
+    "run_id", "status", "mode", "scenario_path", "scenario_id", "env", "suite_id",
+    "queued_at", "started_at", "ended_at", "duration_seconds", "exit_code", "error",
+    "log_lines", "log_bytes", "artifacts",
+)
+_FILTERS = ("status", "scenario_path", "scenario_id", "env", "suite_id")
+
+
+class RunStore:
+    """
+    終了した実行の要約を SQLite に保存する。
+    ログ本体は RunLog のファイルのまま残し、ここにはパスと行の索引だけを持つ。
+    保持期間・件数・ログの合計サイズを超えた古い実行はログファイルごと削除する。
+    """
+
+    def __init__(self, path: str = RUN_STORE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def save(
+        self,
+        state: Dict[str, Any],
+        log_path: Optional[str],
+        log_lines: int,
+        log_bytes: int,
+        log_index: bytes,
+        timeline: Optional[List[Dict[str, Any]]] = None,
+    ) -> None:
+        row = {column: state.get(column) for column in _SUMMARY_COLUMNS if column in state}
+        row.update(
+            log_path=log_path,
+            log_lines=log_lines,
+            log_bytes=log_bytes,
+            log_index=log_index,
+            artifact_dir=(state.get("artifacts") or {}).get("dir"),
+            artifacts=json.dumps(state.get("artifacts") or {}, ensure_ascii=False),
+            timeline=json.dumps(timeline or [], ensure_ascii=False),
+            state=json.dumps(state, ensure_ascii=False),
+        )
+        columns = ", ".join(row)
+        placeholders = ", ".join(f":{column}" for column in row)
+        with self._lock:
+            conn = self._connect_locked()
+            conn.execute(f"INSERT OR REPLACE INTO runs ({columns}) VALUES ({placeholders})", row)
+            conn.commit()
+
+    def get(self, run_id: str) -> Dict[str, Any]:
+        """state、ステップの timeline と、ログを読むための log_path / log_lines / log_bytes / log_index を返す"""
+        with self._lock:
+            row = self._connect_locked().execute(
+                "SELECT state, log_path, log_lines, log_bytes, log_index, timeline FROM runs WHERE run_id = ?", (run_id,)
+            ).fetchone()
+        if row is None:
+            raise KeyError(run_id)
+        return {
+            "state": json.loads(row["state"]),
+            "log_path": row["log_path"],
+            "log_lines": row["log_lines"],
+            "log_bytes": row["log_bytes"],
+            "log_index": row["log_index"] or b"",
+            "timeline": json.loads(row["timeline"]) if row["timeline"] else [],
+        }
+
+    def find_by_artifact(self, path: str) -> Dict[str, Any]:
+        """成果物ディレクトリ (またはその中のファイル) のパスから、それを出力した実行の要約を返す"""
+        candidate = os.path.abspath(path)
+        with self._lock:
+            conn = self._connect_locked()
+            while True:
+                row = conn.execute(
+                    f"SELECT {', '.join(_SUMMARY_COLUMNS)} FROM runs WHERE artifact_dir = ?", (candidate,)
+                ).fetchone()
+                if row is not None:
+                    return _summary(row)
+                parent = os.path.dirname(candidate)
+                if parent == candidate:
+                    raise KeyError(path)
+                candidate = parent
+
+    def query(
+        self,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        has_artifacts: bool = False,
+        **filters: Optional[str],
+    ) -> Dict[str, Any]:
+        """
+        終了日時の新しい順に最大 limit 件の要約を返す。
+        続きは戻り値の next_cursor を cursor に渡して取得する。
+        """
+        limit = max(1, min(limit, 500))
+        clauses: List[str] = []
+        params: List[Any] = []
+        if has_artifacts:
+            clauses.append("artifact_dir IS NOT NULL")
+        for name in _FILTERS:
+            value = filters.get(name)
+            if value:
+                clauses.append(f"{name} = ?")
+                params.append(value)
+        if cursor:
+            ended_at, _, run_id = cursor.partition("|")
+            clauses.append("(ended_at, run_id) < (?, ?)")
+            params.extend([ended_at, run_id])
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        sql = (
+            f"SELECT {', '.join(_SUMMARY_COLUMNS)} FROM runs {where} "
+            "ORDER BY ended_at DESC, run_id DESC LIMIT ?"
+        )
+        with self._lock:
+            rows = self._connect_locked().execute(sql, [*params, limit + 1]).fetchall()
+        runs = [_summary(row) for row in rows[:limit]]
+        next_cursor = f"{runs[-1]['ended_at']}|{runs[-1]['run_id']}" if len(rows) > limit else None
+        return {"runs": runs, "next_cursor": next_cursor}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            row = self._connect_locked().execute(
+                "SELECT COUNT(*) AS runs, COALESCE(SUM(log_bytes), 0) AS log_bytes, MIN(ended_at) AS oldest FROM runs"
+            ).fetchone()
+        return dict(row)
+
+    def apply_retention(self, max_runs: int, max_age_days: int, max_log_mb: int) -> int:
+        """上限を超えた古い実行を削除し、削除した件数を返す (各上限は 0 で無制限)"""
+        removed: List[Tuple[str, Optional[str]]] = []
+        with self._lock:
+            conn = self._connect_locked()
+            if max_age_days > 0:
+                cutoff = (datetime.now(timezone.utc) - timedelta(days=max_age_days)).isoformat()
+                removed += conn.execute("SELECT run_id, log_path FROM runs WHERE ended_at < ?", (cutoff,)).fetchall()
+            if max_runs > 0:
+                removed += conn.execute(
+                    "SELECT run_id, log_path FROM runs ORDER BY ended_at DESC, run_id DESC LIMIT -1 OFFSET ?",
+                    (max_runs,),
+                ).fetchall()
+            if max_log_mb > 0:
+                limit = max_log_mb * 1024 * 1024
+                total = conn.execute("SELECT COALESCE(SUM(log_bytes), 0) FROM runs").fetchone()[0]
+                if total > limit:
+                    rows = conn.execute("SELECT run_id, log_path, log_bytes FROM runs ORDER BY ended_at, run_id")
+                    for run_id, log_path, log_bytes in rows:
+                        if total <= limit:
+                            break
+                        removed.append((run_id, log_path))
+                        total -= log_bytes
+            removed = list({run_id: (run_id, log_path) for run_id, log_path in removed}.values())
+            if removed:
+                conn.executemany("DELETE FROM runs WHERE run_id = ?", [(run_id,) for run_id, _ in removed])
+                conn.commit()
+        for _, log_path in removed:
+            _remove(log_path)
+        return len(removed)
+
+    def remove_orphan_logs(self, keep: List[str]) -> None:
+        """記録のないログファイル (保存前にアプリが終了した実行など) を削除する"""
+        if not os.path.isdir(RUN_LOG_DIR):
+            return
+        with self._lock:
+            known = {row[0] for row in self._connect_locked().execute("SELECT log_path FROM runs")}
+        known.update(keep)
+        for entry in os.scandir(RUN_LOG_DIR):
+            if entry.is_file() and entry.path not in known:
+                _remove(entry.path)
+
+    def _connect_locked(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.executescript(_SCHEMA)
+            existing = {row["name"] for row in conn.execute("PRAGMA table_info(runs)")}
+            for column, column_type in _ADDED_COLUMNS.items():
+                if column not in existing:
+                    conn.execute(f"ALTER TABLE runs ADD COLUMN {column} {column_type}")
+            conn.executescript(_INDEXES)
+            self._conn = conn
+        return self._conn
+
+
+def _summary(row: sqlite3.Row) -> Dict[str, Any]:
+    summary = dict(row)
+    summary["artifacts"] = json.loads(summary["artifacts"]) if summary.get("artifacts") else {}
+    return summary
+
+
+def _remove(path: Optional[str]) -> None:
+    if not path:
+        return
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+run_store = RunStore()
@@ -0,0 +1,92 @@
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, NamedTuple
+
+# 保持するシナリオ数とファイルサイズ合計の上限 (どちらかを超えたら古いものから捨てる)
+MAX_ENTRIES = 128
+MAX_BYTES = 32 * 1024 * 1024
+
+
+class _Entry(NamedTuple):
+    mtime_ns: int
+    size: int
+    data: Any
+
+
+class ScenarioCache:
+    """
+    パース済みシナリオの LRU キャッシュ。
+    アクセスのたびに stat で (mtime_ns, size) を確認し、変わっていれば読み直す。
+    返すオブジェクトは全呼び出し元で共有されるので、変更する場合はコピーしてから行うこと
+    (パッチ適用は apply_patch(..., in_place=False) を使う)。
+    """
+
+    def __init__(self, max_entries: int = MAX_ENTRIES, max_bytes: int = MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, path: str) -> Any:
+        key = os.path.abspath(path)
+        stat = os.stat(key)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (entry.mtime_ns, entry.size) == (stat.st_mtime_ns, stat.st_size):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry.data
+            self.misses += 1
+
+        # パースはロックの外で行う (stat より後に読むので、途中で書き換えられても次回の stat で検出できる)
+        with open(key, "r", encoding="utf-8") as f:
+            data = json.load(f, object_pairs_hook=OrderedDict)
+
+        with self._lock:
+            self._discard(key)
+            if stat.st_size <= self.max_bytes:
+                self._entries[key] = _Entry(stat.st_mtime_ns, stat.st_size, data)
+                self._bytes += stat.st_size
+                self._evict()
+        return data
+
+    def invalidate(self, path: str) -> None:
+        with self._lock:
+            self._discard(os.path.abspath(path))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def _discard(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.size
+
+    def _evict(self) -> None:
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            _, entry = self._entries.popitem(last=False)
+            self._bytes -= entry.size
+            self.evictions += 1
+
+
+scenario_cache = ScenarioCache()
@@ -0,0 +1,135 @@
+import json
+from typing import Any, Dict, TextIO
+
+# 一覧表示用に読み取るトップレベルキー
+HEADER_KEYS = ("id", "name", "tags", "description")
+# ヘッダーの後に続く本体のキー。エディタは HEADER_KEYS + BODY_KEYS の順に並べて保存する
+BODY_KEYS = ("setup", "steps", "teardown")
+SAVED_KEY_ORDER = HEADER_KEYS + BODY_KEYS
+# エディタで作成したシナリオに必ずあるキー
+REQUIRED_HEADER_KEYS = ("id", "name")
+CHUNK_SIZE = 4096
+WHITESPACE = " \t\n\r"
+
+_decoder = json.JSONDecoder()
+
+
+class _FallbackToFullParse(Exception):
+    pass
+
+
+class _ChunkReader:
+    """ファイルを必要な分だけ読み進めるバッファ"""
+
+    def __init__(self, f: TextIO):
+        self._file = f
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def more(self) -> bool:
+        if self.eof:
+            return False
+        # 長い値でも再パース回数が増えすぎないよう読み込み量を倍々にする
+        chunk = self._file.read(max(CHUNK_SIZE, len(self.buf)))
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf += chunk
+        return True
+
+    def peek(self) -> str:
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.more():
+                raise _FallbackToFullParse()
+
+    def parse_value(self) -> Any:
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self.more():
+                    continue
+                raise _FallbackToFullParse()
+            # 数値などはバッファ末尾で切れている可能性があるので続きを読んで確認する
+            if end >= len(self.buf) and self.more():
+                continue
+            self.pos = end
+            return value
+
+
+def read_scenario_header(path: str) -> Dict[str, Any]:
+    """
+    シナリオファイル先頭のトップレベルキー (id / name / tags / description) を
+    ストリーミングで読み取る。キーが揃った時点か、エディタの保存順 (id / name を含む) で
+    setup / steps / teardown に到達した時点で読み込みを打ち切るため、
+    ステップ数が多いファイルでも読み込み量は一定になる。
+    保存順と異なる並びや未知のキーがある場合 (対象キーが後ろにある可能性がある)、
+    および配列形式のファイルは全体をパースする。
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        try:
+            return _scan_header(_ChunkReader(f))
+        except _FallbackToFullParse:
+            pass
+    return _read_full_header(path)
+
+
+def _scan_header(reader: _ChunkReader) -> Dict[str, Any]:
+    if reader.peek() != "{":
+        # 配列形式 (複数シナリオ) や不正な内容
+        raise _FallbackToFullParse()
+    reader.pos += 1
+
+    found: Dict[str, Any] = {}
+    while True:
+        c = reader.peek()
+        if c == "}":
+            return found
+        if c == ",":
+            reader.pos += 1
+            continue
+        if c != '"':
+            raise _FallbackToFullParse()
+
+        key = _parse_key(reader)
+        if key in BODY_KEYS and _in_saved_order(found):
+            # エディタで保存したファイルでは、ヘッダーのキーは本体より前にしかない
+            return found
+        if key not in HEADER_KEYS:
+            # 手書きのファイルでは対象キーが setup / steps より後ろにあることもある
+            raise _FallbackToFullParse()
+
+        found[key] = reader.parse_value()
+        if len(found) == len(HEADER_KEYS):
+            return found
+
+
+def _in_saved_order(found: Dict[str, Any]) -> bool:
+    if not all(key in found for key in REQUIRED_HEADER_KEYS):
+        return False
+    ranks = [SAVED_KEY_ORDER.index(key) for key in found]
+    return ranks == sorted(ranks)
+
+
+def _parse_key(reader: _ChunkReader) -> str:
+    key = reader.parse_value()
+    if reader.peek() != ":":
+        raise _FallbackToFullParse()
+    reader.pos += 1
+    return key
+
+
+def _read_full_header(path: str) -> Dict[str, Any]:
+    # 一覧のために共有の scenario_cache を通すと、編集中のシナリオが追い出されるので直接読む
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    # 一覧では従来どおり辞書形式のシナリオのみメタデータを表示する
+    if not isinstance(data, dict):
+        return {}
+    return {key: data[key] for key in HEADER_KEYS if key in data}
@@ -0,0 +1,202 @@
+import json
+import os
+import threading
+from typing import Any, Dict, Iterator, List, Set, Tuple
+
+from .config import AppConfig, config_store, scenario_roots
+from .scenario_header import read_scenario_header
+from .storage import atomic_write_text, cache_path
+
+INDEX_VERSION = 2
+INDEX_FILE_NAME = "scenario_index.json"
+
+
+def walk_files(directory: str) -> Iterator[Tuple[str, os.DirEntry]]:
+    """
+    os.walk と同じ順序 (トップダウン) でファイルを列挙する。
+    os.scandir の DirEntry を返すので、呼び出し側は追加の stat 呼び出しなしで
+    mtime / size を参照できる。
+    """
+    stack = [directory]
+    while stack:
+        root = stack.pop()
+        try:
+            with os.scandir(root) as it:
+                entries = list(it)
+        except OSError:
+            continue
+
+        subdirs = []
+        for entry in entries:
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                is_dir = False
+            if is_dir:
+                # os.walk(followlinks=False) と同じくシンボリックリンク先には降りない
+                if not entry.is_symlink():
+                    subdirs.append(entry.path)
+            else:
+                yield root, entry
+        # stack は LIFO なので逆順に積んで元の順序で降りる
+        stack.extend(reversed(subdirs))
+
+
+def _as_text(value: Any) -> str:
+    return "" if value is None else str(value)
+
+
+def _as_text_list(value: Any) -> List[str]:
+    if not isinstance(value, list):
+        return []
+    return [str(item) for item in value if item is not None]
+
+
+class ScenarioIndex:
+    """
+    シナリオファイルのメタデータを (path, mtime_ns, size) をキーに保持するインデックス。
+    メモリ上に保持しつつディスクにも永続化し、変更・追加されたファイルだけを再読み込みする。
+    削除されたファイルは一覧取得時にエントリから外す。
+    """
+
+    def __init__(self, index_path: str):
+        self._index_path = index_path
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._dirty = False
+        self._stats = {"hits": 0, "misses": 0, "removed": 0}
+        self._last_stats = {"hits": 0, "misses": 0, "removed": 0}
+
+    def list_files(self, directory: str, extensions: List[str]) -> List[Dict[str, Any]]:
+        self._ensure_loaded()
+
+        file_list = []
+        seen: Set[str] = set()
+        hits = 0
+        misses = 0
+
+        for root, entry in walk_files(directory):
+            if not any(entry.name.endswith(ext) for ext in extensions):
+                continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+
+            full_path = entry.path
+            seen.add(full_path)
+            with self._lock:
+                cached = self._entries.get(full_path)
+
+            if cached and cached["mtime_ns"] == stat.st_mtime_ns and cached["size"] == stat.st_size:
+                hits += 1
+                meta = cached["meta"]
+            else:
+                misses += 1
+                meta = self._read_meta(full_path)
+                with self._lock:
+                    self._entries[full_path] = {
+                        "mtime_ns": stat.st_mtime_ns,
+                        "size": stat.st_size,
+                        "meta": meta,
+                    }
+                    self._dirty = True
+
+            rel_path = os.path.relpath(full_path, directory)
+            file_list.append({
+                "name": entry.name,
+                "path": full_path,
+                "relativePath": rel_path.replace(os.path.sep, '/'),
+                "parent": os.path.basename(root),
+                "scenarioName": meta.get("name", ""),
+                "scenarioId": _as_text(meta.get("id")),
+                "tags": _as_text_list(meta.get("tags")),
+            })
+
+        removed = self._prune(directory, seen)
+
+        with self._lock:
+            self._last_stats = {"hits": hits, "misses": misses, "removed": removed}
+            self._stats["hits"] += hits
+            self._stats["misses"] += misses
+            self._stats["removed"] += removed
+        self._save_if_dirty()
+        return file_list
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                **self._stats,
+                "last": dict(self._last_stats),
+            }
+
+    def retain_roots(self, roots: List[str]) -> int:
+        """roots のいずれの配下にもないエントリを削除する (設定からディレクトリが外された場合)"""
+        self._ensure_loaded()
+        prefixes = tuple(os.path.join(root, "") for root in roots)
+        with self._lock:
+            stale = [path for path in self._entries if not path.startswith(prefixes)]
+            for path in stale:
+                del self._entries[path]
+            if stale:
+                self._dirty = True
+                self._stats["removed"] += len(stale)
+        self._save_if_dirty()
+        return len(stale)
+
+    def _read_meta(self, path: str) -> Dict[str, Any]:
+        try:
+            return read_scenario_header(path)
+        except Exception:
+            return {}  # Ignore errors if file is not valid JSON or can't be read
+
+    def _prune(self, directory: str, seen: Set[str]) -> int:
+        prefix = os.path.join(directory, "")
+        with self._lock:
+            stale = [path for path in self._entries if path.startswith(prefix) and path not in seen]
+            for path in stale:
+                del self._entries[path]
+            if stale:
+                self._dirty = True
+        return len(stale)
+
+    def _ensure_loaded(self) -> None:
+        with self._lock:
+            if self._loaded:
+                return
+            self._loaded = True
+            if not os.path.exists(self._index_path):
+                return
+            try:
+                with open(self._index_path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                if data.get("version") == INDEX_VERSION:
+                    self._entries = data.get("entries", {})
+            except Exception as e:
+                print(f"Error loading scenario index: {e}")
+                self._entries = {}
+
+    def _save_if_dirty(self) -> None:
+        with self._lock:
+            if not self._dirty:
+                return
+            content = json.dumps({"version": INDEX_VERSION, "entries": self._entries}, ensure_ascii=False)
+            self._dirty = False
+        try:
+            atomic_write_text(self._index_path, content)
+        except Exception as e:
+            print(f"Error saving scenario index: {e}")
+
+
+scenario_index = ScenarioIndex(cache_path(INDEX_FILE_NAME))
+
+
+def _on_config_changed(old: AppConfig, new: AppConfig) -> None:
+    roots = scenario_roots(new)
+    if roots != scenario_roots(old):
+        scenario_index.retain_roots(roots)
+
+
+config_store.subscribe(_on_config_changed)
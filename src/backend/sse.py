@@ -0,0 +1,35 @@
+import json
+from typing import Any, AsyncIterator, Optional
+
+from fastapi.responses import StreamingResponse
+
+# EventSource が切断時に再接続するまでの待ち時間 (ms)
+RETRY_MS = 2000
+KEEP_ALIVE_SECONDS = 15
+
+
+def sse_event(data: Any, event: Optional[str] = None, event_id: Optional[Any] = None) -> str:
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    if event:
+        lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, ensure_ascii=False)}")
+    return "\n".join(lines) + "\n\n"
+
+
+def sse_comment(text: str = "keep-alive") -> str:
+    return f": {text}\n\n"
+
+
+def sse_response(stream: AsyncIterator[str]) -> StreamingResponse:
+    async def with_retry() -> AsyncIterator[str]:
+        yield f"retry: {RETRY_MS}\n\n"
+        async for chunk in stream:
+            yield chunk
+
+    return StreamingResponse(
+        with_retry(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
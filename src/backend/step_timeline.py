@@ -0,0 +1,113 @@
+import json
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+SECTIONS = ("setup", "steps", "teardown")
+START_EVENTS = {"step_start", "start"}
+# 要約に含める遅いステップの数
+SLOWEST_COUNT = 5
+
+
+class StepTimeline:
+    """
+    ステップごとの開始・終了時刻、所要時間、結果をまとめる。
+    ランナー出力の JSON 行 ({"event": "step_start" | "step_end", "section", "index", ...})、
+    meta.json、デバッグサーバーの last_result.steps のいずれからも取り込める。
+    同じステップ (section, index) が再実行された場合は新しい結果で置き換える。
+    """
+
+    def __init__(self, steps: Iterable[Dict[str, Any]] = ()):
+        self._lock = threading.Lock()
+        self._steps: "OrderedDict[Tuple[str, int], Dict[str, Any]]" = OrderedDict()
+        self.merge(steps)
+
+    def feed_line(self, text: str) -> bool:
+        """ランナー出力の 1 行を解析する。ステップのイベントでなければ何もしない"""
+        start = text.find("{")
+        # 大半の行は JSON を解析せずに読み飛ばす
+        if start < 0 or '"section"' not in text:
+            return False
+        try:
+            event = json.loads(text[start:])
+        except ValueError:
+            return False
+        return isinstance(event, dict) and self.add(event)
+
+    def add(self, event: Dict[str, Any]) -> bool:
+        return self._add(event) is not None
+
+    def _add(self, event: Dict[str, Any]) -> Optional[Tuple[Dict[str, Any], bool]]:
+        """取り込んだ結果と、それによってステップが終了した (結果が変わった) かどうかを返す"""
+        section = event.get("section")
+        index = event.get("index", event.get("step_index"))
+        if section not in SECTIONS or not isinstance(index, int):
+            return None
+        key = (section, index)
+        with self._lock:
+            previous = self._steps.get(key)
+            if event.get("event") in START_EVENTS:
+                entry = {"section": section, "index": index, "status": "running", "ended_at": None, "duration_ms": None, "error": None}
+                self._steps.pop(key, None)
+            else:
+                entry = dict(previous or {"section": section, "index": index})
+            for field in ("name", "status", "started_at", "ended_at", "duration_ms", "error"):
+                if event.get(field) is not None:
+                    entry[field] = event[field]
+            if event.get("event") not in START_EVENTS and entry.get("status") == "running":
+                entry["status"] = "passed" if not entry.get("error") else "failed"
+            if entry.get("duration_ms") is None:
+                entry["duration_ms"] = duration_between(entry.get("started_at"), entry.get("ended_at"))
+            self._steps[key] = entry
+            finished = entry != previous and entry.get("status") != "running" and entry.get("duration_ms") is not None
+            return dict(entry), finished
+
+    def merge(self, steps: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """ステップ結果をまとめて取り込み、新たに終了したステップを返す (同じ結果の再取り込みは含めない)"""
+        finished = []
+        for step in steps or ():
+            if isinstance(step, dict):
+                added = self._add(step)
+                if added and added[1]:
+                    finished.append(added[0])
+        return finished
+
+    def to_list(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [dict(entry) for entry in self._steps.values()]
+
+    def summary(self) -> Dict[str, Any]:
+        steps = self.to_list()
+        timed = [step for step in steps if isinstance(step.get("duration_ms"), (int, float))]
+        return {
+            "steps": steps,
+            "total_ms": sum(step["duration_ms"] for step in timed),
+            "slowest": sorted(timed, key=lambda step: step["duration_ms"], reverse=True)[:SLOWEST_COUNT],
+        }
+
+
+def step_results(payload: Any) -> List[Dict[str, Any]]:
+    """デバッグサーバーの状態・実行結果、または meta.json からステップ結果の一覧を取り出す"""
+    if not isinstance(payload, dict):
+        return []
+    for key in ("last_result", "result"):
+        nested = payload.get(key)
+        if isinstance(nested, dict) and isinstance(nested.get("steps"), list):
+            return nested["steps"]
+    for key in ("step_results", "steps", "results"):
+        value = payload.get(key)
+        if isinstance(value, list) and any(isinstance(item, dict) and "section" in item for item in value):
+            return value
+    session = payload.get("session")
+    return step_results(session) if isinstance(session, dict) else []
+
+
+def duration_between(started_at: Optional[str], ended_at: Optional[str]) -> Optional[int]:
+    if not started_at or not ended_at:
+        return None
+    try:
+        delta = datetime.fromisoformat(ended_at) - datetime.fromisoformat(started_at)
+    except (TypeError, ValueError):
+        return None
+    return int(delta.total_seconds() * 1000)
@@ -0,0 +1,55 @@
+import os
+import stat
+import tempfile
+
+CACHE_DIR_NAME = ".editor_cache"
+# config.json と同じくプロジェクトルートに保存
+CACHE_DIR = os.path.join(os.getcwd(), CACHE_DIR_NAME)
+
+
+def cache_path(*names: str) -> str:
+    """キャッシュディレクトリ配下のパスを返す（ディレクトリは書き込み時に作成される）"""
+    return os.path.join(CACHE_DIR, *names)
+
+
+def atomic_write_text(path: str, content: str) -> None:
+    """
+    一時ファイルに書き込んでから rename する。
+    書き込み途中でプロセスが落ちても既存ファイルが途中までの内容で壊れることはない。
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp_", dir=directory)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        # mkstemp は 0600 で作成するので、通常の open() と同じパーミッションに揃える
+        os.chmod(tmp_path, _target_mode(path))
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def _read_umask() -> int:
+    # umask は読むだけでも一度書き換える必要があり、プロセス全体に影響するため
+    # スレッドが動き出す前の import 時に一度だけ読む
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+
+# 新規ファイルのパーミッション (通常の open() で作成した場合と同じ)
+_NEW_FILE_MODE = 0o666 & ~_read_umask()
+
+
+def _target_mode(path: str) -> int:
+    try:
+        return stat.S_IMODE(os.stat(path).st_mode)
+    except OSError:
+        return _NEW_FILE_MODE
@@ -0,0 +1,243 @@
+import fnmatch
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel
+
+from .config import AppConfig, load_config, scenario_roots
+from .execution_service import FINISHED_STATUSES, ExecutionRequest, ExecutionState, execution_service
+from .scenario_index import scenario_index
+
+# メモリに残しておくスイートの数
+MAX_SUITES = 50
+
+
+class SuiteRequest(BaseModel):
+    # 省略時は設定済みのすべてのシナリオディレクトリ
+    root: Optional[str] = None
+    # root からの相対パス (区切りは '/') に対する glob。例: "login/*.json"
+    pattern: Optional[str] = None
+    tags: List[str] = []
+    # "any": いずれかのタグを持つ / "all": すべてのタグを持つ
+    tags_mode: str = "any"
+    env: Optional[str] = None
+    # このスイートで同時に動かす数の上限 (全体の max_concurrent_runs とあわせて効く)
+    workers: Optional[int] = None
+
+
+class SuiteService:
+    """
+    ディレクトリ・glob・タグで選んだシナリオを 1 件ずつの実行に展開し、
+    ExecutionService のキューに積んで結果 (成否・所要時間) をまとめる。
+    各実行は個別の pytest プロセス (プロセスグループ) と成果物を持つ。
+    """
+
+    def __init__(self):
+        self._suites: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._run_suites: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def select(self, request: SuiteRequest) -> List[Dict[str, Any]]:
+        """条件に一致するシナリオファイルを一覧の順で返す"""
+        config = load_config()
+        if request.tags_mode not in {"any", "all"}:
+            raise ValueError("tags_mode must be 'any' or 'all'")
+        wanted = {tag.lower() for tag in request.tags}
+
+        selected = []
+        seen = set()
+        for root in self._resolve_roots(config, request.root):
+            for info in scenario_index.list_files(root, [".json"]):
+                if info["path"] in seen:
+                    continue
+                if request.pattern and not fnmatch.fnmatch(info["relativePath"], request.pattern):
+                    continue
+                if wanted:
+                    tags = {tag.lower() for tag in info["tags"]}
+                    matched = wanted <= tags if request.tags_mode == "all" else bool(wanted & tags)
+                    if not matched:
+                        continue
+                seen.add(info["path"])
+                selected.append(info)
+        return selected
+
+    def start(self, request: SuiteRequest) -> Dict[str, Any]:
+        if request.workers is not None and request.workers < 1:
+            raise ValueError("workers must be 1 or greater")
+        selected = self.select(request)
+        if not selected:
+            raise ValueError("No scenarios matched the selection")
+
+        suite_id = f"suite_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+        suite = {
+            "suite_id": suite_id,
+            "request": request.model_dump(),
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "ended_at": None,
+            "started": time.monotonic(),
+            "duration_seconds": None,
+            "cancelled": False,
+            "runs": OrderedDict(),
+        }
+        with self._lock:
+            self._suites[suite_id] = suite
+            while len(self._suites) > MAX_SUITES:
+                _, old = self._suites.popitem(last=False)
+                for run_id in old["runs"]:
+                    self._run_suites.pop(run_id, None)
+
+        for info in selected:
+            execution = ExecutionRequest(scenario_path=info["path"], env=request.env)
+            try:
+                state = execution_service.start(execution, suite_id=suite_id, suite_workers=request.workers)
+            except ValueError as e:
+                # 1 件の検証エラーでスイート全体は止めない
+                state = None
+                record = {"run_id": None, "scenario_path": info["path"], "status": "failed_to_start", "error": str(e)}
+            else:
+                record = {"run_id": state.run_id, "scenario_path": info["path"], "status": state.status, "error": None}
+            record.update(scenario_id=info["scenarioId"], exit_code=None, duration_seconds=None)
+            with self._lock:
+                key = state.run_id if state else f"invalid_{len(suite['runs'])}"
+                suite["runs"][key] = record
+                if state:
+                    self._run_suites[state.run_id] = suite_id
+        # 登録前に終わった実行があっても get() が現在の状態で揃える
+        return self.get(suite_id)
+
+    def list(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            suite_ids = list(reversed(self._suites))
+        return [self.get(suite_id, include_runs=False) for suite_id in suite_ids]
+
+    def get(self, suite_id: str, include_runs: bool = True) -> Dict[str, Any]:
+        self._refresh(suite_id)
+        with self._lock:
+            suite = self._suites.get(suite_id)
+            if suite is None:
+                raise KeyError(suite_id)
+            records = [dict(record) for record in suite["runs"].values()]
+            result = {
+                "suite_id": suite_id,
+                "request": suite["request"],
+                "created_at": suite["created_at"],
+                "ended_at": suite["ended_at"],
+                "duration_seconds": suite["duration_seconds"],
+            }
+            cancelled = suite["cancelled"]
+            elapsed = time.monotonic() - suite["started"]
+
+        counts: Dict[str, int] = {}
+        for record in records:
+            counts[record["status"]] = counts.get(record["status"], 0) + 1
+        finished = sum(counts.get(status, 0) for status in FINISHED_STATUSES)
+        passed = counts.get("succeeded", 0)
+        if finished < len(records):
+            status = "running"
+        elif cancelled:
+            status = "cancelled"
+        else:
+            status = "passed" if passed == len(records) else "failed"
+
+        result.update(
+            status=status,
+            total=len(records),
+            counts=counts,
+            passed=passed,
+            # 失敗・起動失敗・キャンセルをまとめて数える
+            failed=finished - passed,
+            pending=len(records) - finished,
+            # 各実行の所要時間の合計 (duration_seconds は並列実行を含めた経過時間)
+            run_seconds=round(sum(record["duration_seconds"] or 0 for record in records), 3),
+        )
+        if result["duration_seconds"] is None:
+            result["elapsed_seconds"] = round(elapsed, 3)
+        if include_runs:
+            result["runs"] = records
+        return result
+
+    def cancel(self, suite_id: str) -> Dict[str, Any]:
+        with self._lock:
+            suite = self._suites.get(suite_id)
+            if suite is None:
+                raise KeyError(suite_id)
+            suite["cancelled"] = True
+            pending = [run_id for run_id, record in suite["runs"].items() if record["status"] not in FINISHED_STATUSES]
+        # 待機中のものから取り消して、空いた枠で後続が起動しないようにする
+        # (起動処理中の実行も cancelling になり、プロセスを起動せずに終わる)
+        for run_id in reversed(pending):
+            try:
+                state = execution_service.cancel(run_id)
+            except KeyError:
+                continue
+            if state.status in FINISHED_STATUSES:
+                self.on_execution_finished(state)
+            else:
+                with self._lock:
+                    record = suite["runs"][run_id]
+                    # 取り消し中に完了通知が先に届いていれば上書きしない
+                    if record["status"] not in FINISHED_STATUSES:
+                        record["status"] = state.status
+        return self.get(suite_id)
+
+    def on_execution_finished(self, state: ExecutionState) -> None:
+        with self._lock:
+            suite_id = self._run_suites.get(state.run_id)
+            suite = self._suites.get(suite_id) if suite_id else None
+            if suite is None or state.run_id not in suite["runs"]:
+                return
+            suite["runs"][state.run_id].update(
+                status=state.status,
+                exit_code=state.exit_code,
+                duration_seconds=state.duration_seconds,
+                error=state.error,
+            )
+            self._run_suites.pop(state.run_id, None)
+            self._finish_if_done_locked(suite)
+
+    def _refresh(self, suite_id: str) -> None:
+        with self._lock:
+            suite = self._suites.get(suite_id)
+            if suite is None:
+                return
+            # 全件が起動前に失敗した場合など、完了通知が来ないスイートもここで閉じる
+            self._finish_if_done_locked(suite)
+            pending = [run_id for run_id, record in suite["runs"].items() if record["status"] not in FINISHED_STATUSES]
+        for run_id in pending:
+            try:
+                state = execution_service.get(run_id)
+            except KeyError:
+                continue
+            if state.status in FINISHED_STATUSES:
+                self.on_execution_finished(state)
+            else:
+                with self._lock:
+                    suite["runs"][run_id]["status"] = state.status
+
+    def _finish_if_done_locked(self, suite: Dict[str, Any]) -> None:
+        if suite["ended_at"] is not None:
+            return
+        if all(record["status"] in FINISHED_STATUSES for record in suite["runs"].values()):
+            suite["ended_at"] = datetime.now(timezone.utc).isoformat()
+            suite["duration_seconds"] = round(time.monotonic() - suite["started"], 3)
+
+    def _resolve_roots(self, config: AppConfig, root: Optional[str]) -> List[str]:
+        roots = scenario_roots(config)
+        if not root:
+            return [r for r in roots if os.path.isdir(r)]
+        path = os.path.abspath(os.path.expanduser(root))
+        if not os.path.isdir(path):
+            raise ValueError("Suite root is not a directory")
+        allowed = [os.path.abspath(r) for r in roots]
+        if not any(path == r or path.startswith(r.rstrip(os.sep) + os.sep) for r in allowed):
+            raise ValueError("Suite root is outside configured scenario directories")
+        return [path]
+
+
+suite_service = SuiteService()
+execution_service.subscribe(suite_service.on_execution_finished)
@@ -0,0 +1,229 @@
+import bisect
+import os
+import re
+import threading
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from .config import AppConfig, config_store
+from .page_object_scanner import get_scan_cache
+
+SEARCH_MODES = ("auto", "prefix", "segment", "substring")
+
+# 一致の種類ごとの基本スコア (exact > prefix > segment > substring > fuzzy)
+SCORE_EXACT = 1000
+SCORE_PREFIX = 800
+SCORE_SEGMENT_EXACT = 600
+SCORE_SEGMENT_PREFIX = 500
+SCORE_SUBSTRING = 300
+SCORE_FUZZY = 100
+FUZZY_BONUS_MAX = 150
+# 部分一致の候補を絞る n-gram 索引の文字数
+NGRAM = 3
+
+_TOKEN_SPLIT_RE = re.compile(r"[._\s]+")
+_CAMEL_RE = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+")
+
+
+def _tokenize(target: str) -> List[str]:
+    """'pages.LoginPage.click_submit' -> pages, loginpage, login, page, click_submit, click, submit"""
+    tokens = []
+    for segment in target.split("."):
+        if not segment:
+            continue
+        tokens.append(segment.lower())
+        for part in _TOKEN_SPLIT_RE.split(segment):
+            if not part:
+                continue
+            tokens.append(part.lower())
+            tokens.extend(word.lower() for word in _CAMEL_RE.findall(part))
+    return list(dict.fromkeys(tokens))
+
+
+def _fuzzy_score(term: str, text: str) -> Optional[int]:
+    """term が text の部分列なら連続一致・区切り直後の一致を加点したスコアを返す"""
+    score = 0
+    pos = -1
+    prev = -2
+    for ch in term:
+        pos = text.find(ch, pos + 1)
+        if pos < 0:
+            return None
+        if pos == prev + 1:
+            score += 5
+        if pos == 0 or text[pos - 1] in "._":
+            score += 3
+        prev = pos
+    return max(0, min(FUZZY_BONUS_MAX, score - len(text) // 20))
+
+
+class TargetSearchIndex:
+    """
+    ページオブジェクトのターゲット一覧に対する検索インデックス。
+    先頭一致はソート済み配列の二分探索、セグメント一致はトークン索引で引き、
+    substring モードでは部分一致、auto モードではさらに部分列 (あいまい) 一致を加える。
+    部分一致は文字・3-gram の索引で候補を絞ってから確認し、全件は走査しない。
+    あいまい一致は上位の一致が 1 ページ分に満たない場合だけ、語の文字をすべて含む候補に対して行う。
+    スペース区切りの複数語はすべてに一致するものだけを返す (AND)。
+    """
+
+    def __init__(self, targets: List[Dict[str, str]], generation: int = 0):
+        self.generation = generation
+        self._targets = [item["target"] for item in targets]
+        self._docs = {item["target"]: item.get("doc", "") for item in targets}
+        self._lower = [target.lower() for target in self._targets]
+        self._by_lower: List[Tuple[str, int]] = sorted((low, i) for i, low in enumerate(self._lower))
+        self._sorted_lower = [low for low, _ in self._by_lower]
+
+        token_map: Dict[str, List[int]] = {}
+        for i, target in enumerate(self._targets):
+            for token in _tokenize(target):
+                token_map.setdefault(token, []).append(i)
+        self._tokens = token_map
+        self._sorted_tokens = sorted(token_map)
+        # 文字 / 3-gram -> それを含むターゲット (昇順)。部分一致の検索で初めて必要になった時に作る
+        self._ngrams: Optional[Tuple[Dict[str, List[int]], Dict[str, List[int]]]] = None
+
+    def __len__(self) -> int:
+        return len(self._targets)
+
+    def get_doc(self, target: str) -> Optional[str]:
+        return self._docs.get(target)
+
+    def search(
+        self,
+        query: str,
+        mode: str = "auto",
+        limit: int = 50,
+        offset: int = 0,
+        include_doc: bool = False,
+    ) -> Dict[str, Any]:
+        terms = query.lower().split()
+        if not terms:
+            ranked = list(range(len(self._targets)))
+        else:
+            scores: Optional[Dict[int, int]] = None
+            for term in terms:
+                term_scores = self._match_term(term, mode, offset + limit)
+                if scores is None:
+                    scores = term_scores
+                else:
+                    scores = {i: s + term_scores[i] for i, s in scores.items() if i in term_scores}
+                if not scores:
+                    break
+            scores = scores or {}
+            ranked = sorted(scores, key=lambda i: (-scores[i], len(self._targets[i]), self._targets[i]))
+
+        page = ranked[offset:offset + limit]
+        items = []
+        for i in page:
+            target = self._targets[i]
+            item = {"target": target}
+            if include_doc:
+                item["doc"] = self._docs.get(target, "")
+            items.append(item)
+        return {"total": len(ranked), "offset": offset, "limit": limit, "items": items}
+
+    def _match_term(self, term: str, mode: str, wanted: int) -> Dict[int, int]:
+        scores: Dict[int, int] = {}
+
+        def add(i: int, score: int) -> None:
+            if score > scores.get(i, -1):
+                scores[i] = score
+
+        # 先頭一致
+        start = bisect.bisect_left(self._sorted_lower, term)
+        for pos in range(start, len(self._by_lower)):
+            low, i = self._by_lower[pos]
+            if not low.startswith(term):
+                break
+            add(i, SCORE_EXACT if low == term else SCORE_PREFIX)
+        if mode == "prefix":
+            return scores
+
+        # セグメント (ドット区切り・単語単位) の先頭一致
+        start = bisect.bisect_left(self._sorted_tokens, term)
+        for pos in range(start, len(self._sorted_tokens)):
+            token = self._sorted_tokens[pos]
+            if not token.startswith(term):
+                break
+            score = SCORE_SEGMENT_EXACT if token == term else SCORE_SEGMENT_PREFIX
+            for i in self._tokens[token]:
+                add(i, score)
+        if mode == "segment":
+            return scores
+
+        for i in self._substring_candidates(term):
+            if i not in scores and term in self._lower[i]:
+                scores[i] = SCORE_SUBSTRING
+        # あいまい一致は全体の候補を広く見る必要があるので、上位の一致で足りる場合は行わない
+        if mode == "substring" or len(scores) >= wanted:
+            return scores
+
+        chars, _ = self._ngram_index()
+        for i in _rarest(chars, set(term)):
+            if i in scores:
+                continue
+            fuzzy = _fuzzy_score(term, self._lower[i])
+            if fuzzy is not None:
+                scores[i] = SCORE_FUZZY + fuzzy
+        return scores
+
+    def _substring_candidates(self, term: str) -> List[int]:
+        """term を部分文字列として含みうるターゲット (term の文字 / 3-gram のうち最も少ないものを含むもの)"""
+        chars, trigrams = self._ngram_index()
+        if len(term) < NGRAM:
+            return _rarest(chars, set(term))
+        return _rarest(trigrams, {term[j:j + NGRAM] for j in range(len(term) - NGRAM + 1)})
+
+    def _ngram_index(self) -> Tuple[Dict[str, List[int]], Dict[str, List[int]]]:
+        if self._ngrams is None:
+            chars: Dict[str, List[int]] = {}
+            trigrams: Dict[str, List[int]] = {}
+            for i, low in enumerate(self._lower):
+                for char in set(low):
+                    chars.setdefault(char, []).append(i)
+                for gram in set(map("".join, zip(low, low[1:], low[2:]))):
+                    trigrams.setdefault(gram, []).append(i)
+            # 同時に作られても同じ内容になるので、ロックなしで差し替える
+            self._ngrams = (chars, trigrams)
+        return self._ngrams
+
+
+def _rarest(index: Dict[str, List[int]], grams: Set[str]) -> List[int]:
+    """grams のいずれかを含まないターゲットは除けるので、最も件数の少ない grams の一覧を返す"""
+    postings = [index.get(gram) for gram in grams]
+    if not postings or not all(postings):
+        return []
+    return min(postings, key=len)
+
+
+_indexes: Dict[str, TargetSearchIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_target_index(root_dir: str) -> TargetSearchIndex:
+    """スキャンキャッシュの内容から検索インデックスを返す。キャッシュが更新されていれば作り直す"""
+    key = os.path.abspath(root_dir)
+    cache = get_scan_cache(root_dir)
+    generation = cache.generation
+    with _indexes_lock:
+        index = _indexes.get(key)
+    if index is not None and index.generation == generation:
+        return index
+
+    index = TargetSearchIndex(cache.all_targets(), generation)
+    with _indexes_lock:
+        _indexes[key] = index
+    return index
+
+
+def _on_config_changed(old: AppConfig, new: AppConfig) -> None:
+    if new.page_object_folder == old.page_object_folder:
+        return
+    key = os.path.abspath(new.page_object_folder) if new.page_object_folder else None
+    with _indexes_lock:
+        for other in [other for other in _indexes if other != key]:
+            del _indexes[other]
+
+
+config_store.subscribe(_on_config_changed)
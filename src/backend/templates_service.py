@@ -1,13 +1,21 @@
 
+import bisect
 import json
 import os
+import threading
 import time
 import uuid
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from pydantic import BaseModel
 
+from .storage import atomic_write_text
+
 TEMPLATES_FILE_NAME = "user_templates.json"
 TEMPLATES_PATH = os.path.join(os.getcwd(), TEMPLATES_FILE_NAME)
+# スナップショット (user_templates.json) 以降の変更を 1 行 1 操作で追記するジャーナル
+TEMPLATES_JOURNAL_PATH = os.path.join(os.getcwd(), "user_templates.journal")
+# ジャーナルの操作数がこれを超えたらスナップショットに畳み込む
+COMPACT_THRESHOLD = 200
 
 class TemplateItem(BaseModel):
     id: str
@@ -17,49 +25,175 @@ class TemplateItem(BaseModel):
     isFavorite: bool = False
     favoritedAt: Optional[float] = None
 
-class TemplatesService:
-    @staticmethod
-    def _load_templates() -> List[Dict[str, Any]]:
-        if not os.path.exists(TEMPLATES_PATH):
+def _order_key(template: Dict[str, Any]) -> Tuple[int, float, str]:
+    # 1. Favorites (recently favorited first)
+    # 2. Non-favorites (recently created/saved first)
+    # If favoritedAt is missing (legacy), treat as 0 (oldest)
+    if template.get("isFavorite"):
+        return (0, -(template.get("favoritedAt") or 0), template["id"])
+    return (1, -(template.get("createdAt") or 0), template["id"])
+
+class TemplateStore:
+    """
+    テンプレートを id で引ける辞書と、表示順 (お気に入り → 新しい順) に並んだキーの
+    ソート済みリストでメモリに保持する。
+    変更はジャーナルに追記し、操作数が COMPACT_THRESHOLD を超えたら
+    スナップショットを書き直してジャーナルを空にする。
+    """
+
+    def __init__(self, snapshot_path: str, journal_path: str):
+        self._snapshot_path = snapshot_path
+        self._journal_path = journal_path
+        self._lock = threading.RLock()
+        self._templates: Dict[str, Dict[str, Any]] = {}
+        self._order: List[Tuple[int, float, str]] = []
+        self._journal_ops = 0
+        self._signature: Optional[Tuple[int, int]] = None
+        self._loaded = False
+
+    def list(self, query: str = "", offset: int = 0, limit: Optional[int] = None) -> Tuple[List[Dict[str, Any]], int]:
+        """表示順に並んだテンプレートと、(名前検索で絞り込んだ後の) 総件数を返す"""
+        with self._lock:
+            self._ensure_loaded()
+            templates = (self._templates[key[2]] for key in self._order)
+            query = query.strip().lower()
+            if query:
+                matched = [t for t in templates if query in t.get("name", "").lower()]
+            else:
+                matched = list(templates)
+        end = None if limit is None else offset + limit
+        return matched[offset:end], len(matched)
+
+    def get(self, template_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            self._ensure_loaded()
+            return self._templates.get(template_id)
+
+    def put(self, template: Dict[str, Any]) -> Dict[str, Any]:
+        with self._lock:
+            self._ensure_loaded()
+            # ジャーナルへの書き込みに成功してからメモリに反映する
+            self._append({"op": "put", "template": template})
+            self._apply_put(template)
+            self._maybe_compact()
+            return template
+
+    def delete(self, template_id: str) -> bool:
+        with self._lock:
+            self._ensure_loaded()
+            if template_id not in self._templates:
+                return False
+            self._append({"op": "delete", "id": template_id})
+            self._apply_delete(template_id)
+            self._maybe_compact()
+            return True
+
+    def compact(self) -> None:
+        with self._lock:
+            self._ensure_loaded()
+            templates = [self._templates[key[2]] for key in self._order]
+            atomic_write_text(self._snapshot_path, json.dumps(templates, indent=2, ensure_ascii=False))
+            # スナップショットの書き込み後にジャーナルを空にする (間で落ちても再適用は冪等)
+            with open(self._journal_path, "w", encoding="utf-8"):
+                pass
+            self._journal_ops = 0
+            self._signature = self._stat_snapshot()
+
+    def _apply_put(self, template: Dict[str, Any]) -> None:
+        if template["id"] in self._templates:
+            self._remove_order(self._templates[template["id"]])
+        self._templates[template["id"]] = template
+        bisect.insort(self._order, _order_key(template))
+
+    def _apply_delete(self, template_id: str) -> None:
+        template = self._templates.pop(template_id, None)
+        if template is not None:
+            self._remove_order(template)
+
+    def _remove_order(self, template: Dict[str, Any]) -> None:
+        key = _order_key(template)
+        index = bisect.bisect_left(self._order, key)
+        if index < len(self._order) and self._order[index] == key:
+            del self._order[index]
+
+    def _append(self, record: Dict[str, Any]) -> None:
+        try:
+            with open(self._journal_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self._journal_ops += 1
+        except Exception as e:
+            print(f"Error saving templates: {e}")
+            raise e
+
+    def _maybe_compact(self) -> None:
+        if self._journal_ops >= COMPACT_THRESHOLD:
+            try:
+                self.compact()
+            except Exception as e:
+                # 変更自体はジャーナルに残っているので、次の機会に再度畳み込む
+                print(f"Error compacting templates: {e}")
+
+    def _ensure_loaded(self) -> None:
+        # user_templates.json が外部で置き換えられた場合は読み直す
+        if self._loaded and self._stat_snapshot() == self._signature:
+            return
+        self._loaded = True
+        self._templates = {}
+        self._order = []
+        self._journal_ops = 0
+        self._signature = self._stat_snapshot()
+
+        for template in self._read_snapshot():
+            if isinstance(template, dict) and "id" in template:
+                self._apply_put(template)
+
+        if not os.path.exists(self._journal_path):
+            return
+        try:
+            with open(self._journal_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # 書き込み途中で落ちた末尾行は捨てる
+                        continue
+                    if record.get("op") == "put":
+                        self._apply_put(record["template"])
+                    elif record.get("op") == "delete":
+                        self._apply_delete(record["id"])
+                    self._journal_ops += 1
+        except Exception as e:
+            print(f"Error loading template journal: {e}")
+
+    def _read_snapshot(self) -> List[Dict[str, Any]]:
+        if not os.path.exists(self._snapshot_path):
             return []
         try:
-            with open(TEMPLATES_PATH, "r", encoding="utf-8") as f:
+            with open(self._snapshot_path, "r", encoding="utf-8") as f:
                 return json.load(f)
         except Exception as e:
             print(f"Error loading templates: {e}")
             return []
 
-    @staticmethod
-    def _save_templates(templates: List[Dict[str, Any]]):
+    def _stat_snapshot(self) -> Optional[Tuple[int, int]]:
         try:
-            with open(TEMPLATES_PATH, "w", encoding="utf-8") as f:
-                json.dump(templates, f, indent=2, ensure_ascii=False)
-        except Exception as e:
-            print(f"Error saving templates: {e}")
-            raise e
+            stat = os.stat(self._snapshot_path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
 
-    @classmethod
-    def get_templates(cls) -> List[Dict[str, Any]]:
-        # Sort by:
-        # 1. Favorites (recently favorited first)
-        # 2. Non-favorites (recently created/saved first)
-        templates = cls._load_templates()
-        
-        def sort_key(x):
-            if x.get("isFavorite"):
-                # Group 0 (Favorites), sort by favoritedAt desc (newer timestamp = smaller negative number)
-                # If favoritedAt is missing (legacy), treat as 0 (oldest)
-                return (0, -x.get("favoritedAt", 0))
-            else:
-                # Group 1 (Non-favorites), sort by createdAt desc
-                return (1, -x.get("createdAt", 0))
+template_store = TemplateStore(TEMPLATES_PATH, TEMPLATES_JOURNAL_PATH)
 
-        templates.sort(key=sort_key)
-        return templates
+class TemplatesService:
+    @classmethod
+    def get_templates(cls, query: str = "", offset: int = 0, limit: Optional[int] = None) -> Tuple[List[Dict[str, Any]], int]:
+        # Sorted by favorites (recently favorited first), then non-favorites (recently created/saved first)
+        return template_store.list(query, offset, limit)
 
     @classmethod
     def save_template(cls, name: str, steps: List[Dict[str, Any]]) -> Dict[str, Any]:
-        templates = cls._load_templates()
         new_template = {
             "id": str(uuid.uuid4()),
             "name": name,
@@ -67,63 +201,36 @@ class TemplatesService:
             "createdAt": time.time(),
             "isFavorite": False
         }
-        templates.insert(0, new_template)
-        cls._save_templates(templates)
-        return new_template
+        return template_store.put(new_template)
 
     @classmethod
     def delete_template(cls, template_id: str):
-        templates = cls._load_templates()
-        templates = [t for t in templates if t["id"] != template_id]
-        cls._save_templates(templates)
+        template_store.delete(template_id)
 
     @classmethod
     def toggle_favorite(cls, template_id: str) -> Optional[Dict[str, Any]]:
-        templates = cls._load_templates()
-        target = None
-        for t in templates:
-            if t["id"] == template_id:
-                new_state = not t.get("isFavorite", False)
-                t["isFavorite"] = new_state
-                if new_state:
-                    t["favoritedAt"] = time.time()
-                else:
-                    # Optional: Remove favoritedAt or keep it?
-                    # Cleaner to remove or ignore it.
-                    if "favoritedAt" in t:
-                        del t["favoritedAt"]
-                target = t
-                break
-        
-        if target:
-            cls._save_templates(templates)
-            
-        return target
+        current = template_store.get(template_id)
+        if not current:
+            return None
+
+        # 並び順のキーが変わるので、保持中の辞書は書き換えずに新しい辞書で置き換える
+        target = dict(current)
+        new_state = not target.get("isFavorite", False)
+        target["isFavorite"] = new_state
+        if new_state:
+            target["favoritedAt"] = time.time()
+        else:
+            target.pop("favoritedAt", None)
+        return template_store.put(target)
 
     @classmethod
     def update_template(cls, template_id: str, name: str, steps: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
-        templates = cls._load_templates()
-        target = None
-        for t in templates:
-            if t["id"] == template_id:
-                t["name"] = name
-                t["steps"] = steps
-                # Update createdAt to reflect modification? The requirement says "recently saved".
-                # Current implementation uses createdAt which is confusingly named but seems to define the order.
-                # If "recently saved order" implies recently MODIFIED, I should update createdAt or add updatedAt.
-                # The prompt says "recently saved order" for non-favorites.
-                # Currently save_template sets createdAt. update_template didn't list it.
-                # The user says "conventional recently saved order".
-                # If the convention was just createdAt (creation time), then I keep it.
-                # But typically "recently saved" means modification time.
-                # Let's check if the user previously edited this file or if I should assume createdAt is fine.
-                # The user's prompt: "Templates that are not in favorites should remain in the conventional recently saved order."
-                # "Conventional" implies "keep doing what you were doing".
-                # Previous code in update_template didn't update createdAt. So I will leave it alone to be safe.
-                target = t
-                break
-        
-        if target:
-            cls._save_templates(templates)
-            
-        return target
+        current = template_store.get(template_id)
+        if not current:
+            return None
+
+        # createdAt is kept as is: the non-favorite order stays the conventional one.
+        target = dict(current)
+        target["name"] = name
+        target["steps"] = steps
+        return template_store.put(target)
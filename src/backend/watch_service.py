@@ -0,0 +1,409 @@
+import asyncio
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from .config import AppConfig, config_store, scenario_roots
+from .scenario_index import walk_files
+
+# イベントをまとめて送るまでの待ち時間 (秒)
+COALESCE_SECONDS = 0.15
+POLL_INTERVAL_SECONDS = 1.0
+SUBSCRIBER_QUEUE_SIZE = 100
+
+EmitFn = Callable[[str, Optional[str], Optional[str]], None]
+ListenerFn = Callable[[List[Dict[str, Any]]], None]
+
+
+class _EventCoalescer:
+    """
+    同一パスに対する連続したイベントを 1 つにまとめる。
+    例: created → modified は created、created → deleted は打ち消し、deleted → created は modified。
+    """
+
+    def __init__(self):
+        self._pending: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._rescan = False
+
+    def add(self, kind: str, path: Optional[str], old_path: Optional[str] = None) -> None:
+        if kind == "rescan" or path is None:
+            self._rescan = True
+            return
+        if kind == "renamed":
+            self._add_rename(path, old_path)
+            return
+
+        prev = self._pending.get(path)
+        if prev is None:
+            self._pending[path] = {"type": kind, "path": path}
+            return
+
+        prev_kind = prev["type"]
+        if prev_kind == "created":
+            if kind == "deleted":
+                del self._pending[path]
+        elif prev_kind == "deleted":
+            if kind in ("created", "modified"):
+                prev["type"] = "modified"
+        elif prev_kind == "renamed":
+            if kind == "deleted":
+                del self._pending[path]
+                self._pending[prev["old_path"]] = {"type": "deleted", "path": prev["old_path"]}
+        elif kind == "deleted":
+            prev["type"] = "deleted"
+
+    def _add_rename(self, path: str, old_path: Optional[str]) -> None:
+        prev = self._pending.pop(old_path, None) if old_path else None
+        if prev and prev["type"] == "created":
+            self._pending[path] = {"type": "created", "path": path}
+            return
+        if prev and prev["type"] == "renamed":
+            old_path = prev["old_path"]
+        self._pending[path] = {"type": "renamed", "path": path, "old_path": old_path}
+
+    def drain(self) -> List[Dict[str, Any]]:
+        events = list(self._pending.values())
+        if self._rescan:
+            events.append({"type": "rescan"})
+        self._pending = OrderedDict()
+        self._rescan = False
+        return events
+
+
+class _PollingWatcher:
+    """(mtime_ns, size, inode) のスナップショット比較による監視。inotify が使えない環境用"""
+
+    def __init__(self, roots: List[str], emit: EmitFn, is_target: Callable[[str], bool]):
+        self._roots = roots
+        self._emit = emit
+        self._is_target = is_target
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _snapshot(self) -> Dict[str, Tuple[int, int, int]]:
+        snapshot = {}
+        for root in self._roots:
+            for _, entry in walk_files(root):
+                if not self._is_target(entry.name):
+                    continue
+                try:
+                    stat = entry.stat()
+                    snapshot[entry.path] = (stat.st_mtime_ns, stat.st_size, entry.inode())
+                except OSError:
+                    continue
+        return snapshot
+
+    def _run(self) -> None:
+        previous = self._snapshot()
+        while not self._stop.wait(POLL_INTERVAL_SECONDS):
+            current = self._snapshot()
+            created = [path for path in current if path not in previous]
+            deleted = {previous[path][2]: path for path in previous if path not in current}
+
+            for path in created:
+                inode = current[path][2]
+                old_path = deleted.pop(inode, None) if inode else None
+                if old_path:
+                    self._emit("renamed", path, old_path)
+                else:
+                    self._emit("created", path, None)
+            for path in deleted.values():
+                self._emit("deleted", path, None)
+            for path, signature in current.items():
+                if path in previous and previous[path][:2] != signature[:2]:
+                    self._emit("modified", path, None)
+            previous = current
+
+
+class _InotifyWatcher:
+    """Linux の inotify をディレクトリ単位で再帰的に登録して監視する"""
+
+    IN_MODIFY = 0x00000002
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_Q_OVERFLOW = 0x00004000
+    IN_IGNORED = 0x00008000
+    IN_ISDIR = 0x40000000
+    IN_NONBLOCK = 0x00000800
+    IN_CLOEXEC = 0x00080000
+    WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+    _HEADER = struct.Struct("iIII")
+
+    def __init__(self, roots: List[str], emit: EmitFn, is_target: Callable[[str], bool]):
+        self._emit = emit
+        self._is_target = is_target
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._fd = self._libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._watches: Dict[int, str] = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        try:
+            for root in roots:
+                self._add_tree(root)
+        except OSError:
+            os.close(self._fd)
+            raise
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _add_tree(self, directory: str) -> None:
+        for dirpath, _, _ in os.walk(directory):
+            wd = self._libc.inotify_add_watch(self._fd, os.fsencode(dirpath), self.WATCH_MASK)
+            if wd < 0:
+                # ENOSPC (max_user_watches 超過) などはポーリングへ切り替えるため呼び出し元へ伝える
+                raise OSError(ctypes.get_errno(), f"inotify_add_watch failed: {dirpath}")
+            self._watches[wd] = dirpath
+
+    def _run(self) -> None:
+        try:
+            while not self._stop.is_set():
+                readable, _, _ = select.select([self._fd], [], [], 0.5)
+                if not readable:
+                    continue
+                try:
+                    data = os.read(self._fd, 64 * 1024)
+                except BlockingIOError:
+                    continue
+                self._handle(data)
+        finally:
+            os.close(self._fd)
+
+    def _handle(self, data: bytes) -> None:
+        moved_from: Dict[int, str] = {}
+        offset = 0
+        while offset < len(data):
+            wd, mask, cookie, length = self._HEADER.unpack_from(data, offset)
+            name = data[offset + self._HEADER.size: offset + self._HEADER.size + length].rstrip(b"\0")
+            offset += self._HEADER.size + length
+
+            if mask & self.IN_Q_OVERFLOW:
+                self._emit("rescan", None, None)
+                continue
+            directory = self._watches.get(wd)
+            if directory is None:
+                continue
+            if mask & self.IN_IGNORED:
+                del self._watches[wd]
+                continue
+            path = os.path.join(directory, os.fsdecode(name)) if name else directory
+
+            if mask & self.IN_ISDIR:
+                if mask & (self.IN_CREATE | self.IN_MOVED_TO):
+                    try:
+                        self._add_tree(path)
+                    except OSError:
+                        pass
+                if mask & (self.IN_CREATE | self.IN_MOVED_TO | self.IN_DELETE | self.IN_MOVED_FROM):
+                    self._emit("rescan", path, None)
+                continue
+
+            if mask & self.IN_MOVED_FROM:
+                if self._is_target(path):
+                    moved_from[cookie] = path
+                continue
+            if mask & self.IN_MOVED_TO:
+                old_path = moved_from.pop(cookie, None)
+                if self._is_target(path):
+                    if old_path:
+                        self._emit("renamed", path, old_path)
+                    else:
+                        # 一時ファイルからの置き換え保存などは作成として扱う
+                        self._emit("created", path, None)
+                elif old_path:
+                    self._emit("deleted", old_path, None)
+                continue
+
+            if not self._is_target(path):
+                continue
+            if mask & self.IN_CREATE:
+                self._emit("created", path, None)
+            elif mask & self.IN_DELETE:
+                self._emit("deleted", path, None)
+            elif mask & (self.IN_MODIFY | self.IN_CLOSE_WRITE):
+                self._emit("modified", path, None)
+
+        # 監視対象外へ移動されたファイルは削除として扱う
+        for path in moved_from.values():
+            self._emit("deleted", path, None)
+
+
+class WatchService:
+    """
+    シナリオディレクトリを監視し、まとめた変更イベントを購読者 (SSE 接続) へ配信する。
+    購読者 (またはリスナー) がいる間だけ監視スレッドを動かす。
+    """
+
+    def __init__(self, extensions: Optional[List[str]] = None):
+        self._extensions = extensions or [".json"]
+        self._lock = threading.Lock()
+        self._roots: Tuple[str, ...] = ()
+        self._watcher = None
+        self._backend: Optional[str] = None
+        self._subscribers: Set[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]] = set()
+        # 監視スレッドから直接呼び出すコールバック (索引の更新など)
+        self._listeners: List[ListenerFn] = []
+        self._coalescer = _EventCoalescer()
+        self._flush_timer: Optional[threading.Timer] = None
+
+    def subscribe(self, roots: List[str]) -> asyncio.Queue:
+        """イベントループ上から呼び出す。返されたキューにイベントのリストが届く"""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        with self._lock:
+            self._subscribers.add((asyncio.get_running_loop(), queue))
+        self.set_roots(roots)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        with self._lock:
+            self._subscribers = {item for item in self._subscribers if item[1] is not queue}
+            if not self._subscribers and not self._listeners:
+                self._stop_watcher_locked()
+
+    def add_listener(self, listener: ListenerFn) -> None:
+        """まとめたイベントのリストを監視スレッド上で listener に渡す。登録している間は監視を続ける"""
+        with self._lock:
+            self._listeners.append(listener)
+            if self._watcher is None:
+                self._start_watcher_locked()
+
+    def remove_listener(self, listener: ListenerFn) -> None:
+        with self._lock:
+            self._listeners = [item for item in self._listeners if item is not listener]
+            if not self._subscribers and not self._listeners:
+                self._stop_watcher_locked()
+
+    def is_watching(self, path: str) -> bool:
+        """path が監視中のルート配下にあり、変更がイベントとして届くかどうか"""
+        path = os.path.abspath(path)
+        with self._lock:
+            return self._watcher is not None and any(
+                path == root or path.startswith(root.rstrip(os.sep) + os.sep) for root in self._roots
+            )
+
+    def set_roots(self, roots: List[str]) -> None:
+        normalized = tuple(sorted({os.path.abspath(root) for root in roots if root and os.path.isdir(root)}))
+        with self._lock:
+            if not self._subscribers and not self._listeners:
+                self._roots = normalized
+                return
+            if normalized == self._roots and self._watcher is not None:
+                return
+            self._stop_watcher_locked()
+            self._roots = normalized
+            self._start_watcher_locked()
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "backend": self._backend,
+                "roots": list(self._roots),
+                "subscribers": len(self._subscribers),
+            }
+
+    def stop(self) -> None:
+        with self._lock:
+            self._stop_watcher_locked()
+            subscribers = list(self._subscribers)
+            self._subscribers.clear()
+        # SSE ストリームを終了させる
+        for loop, queue in subscribers:
+            loop.call_soon_threadsafe(_put_latest, queue, None)
+
+    def _start_watcher_locked(self) -> None:
+        roots = list(self._roots)
+        if not roots:
+            return
+        watcher = None
+        if sys.platform.startswith("linux"):
+            try:
+                watcher = _InotifyWatcher(roots, self._on_event, self._is_target)
+                self._backend = "inotify"
+            except OSError as e:
+                print(f"inotify unavailable, falling back to polling: {e}")
+        if watcher is None:
+            watcher = _PollingWatcher(roots, self._on_event, self._is_target)
+            self._backend = "polling"
+        watcher.start()
+        self._watcher = watcher
+
+    def _stop_watcher_locked(self) -> None:
+        if self._watcher is not None:
+            self._watcher.stop()
+            self._watcher = None
+            self._backend = None
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+        self._coalescer.drain()
+
+    def _is_target(self, path: str) -> bool:
+        return any(path.endswith(ext) for ext in self._extensions)
+
+    def _on_event(self, kind: str, path: Optional[str], old_path: Optional[str]) -> None:
+        with self._lock:
+            self._coalescer.add(kind, path, old_path)
+            if self._flush_timer is None:
+                self._flush_timer = threading.Timer(COALESCE_SECONDS, self._flush)
+                self._flush_timer.daemon = True
+                self._flush_timer.start()
+
+    def _flush(self) -> None:
+        with self._lock:
+            self._flush_timer = None
+            events = self._coalescer.drain()
+            subscribers = list(self._subscribers)
+            listeners = list(self._listeners)
+        if not events:
+            return
+        for listener in listeners:
+            try:
+                listener(events)
+            except Exception as e:
+                print(f"Watch listener failed: {e}")
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(_put_latest, queue, events)
+            except RuntimeError:
+                pass  # event loop already closed
+
+
+def _put_latest(queue: asyncio.Queue, events: Optional[List[Dict[str, Any]]]) -> None:
+    if queue.full():
+        # 読み取りが追いつかないクライアントには、溜まったイベントの代わりに再取得を促す
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait([{"type": "rescan"}])
+    queue.put_nowait(events)
+
+
+watch_service = WatchService()
+
+
+def _on_config_changed(old: AppConfig, new: AppConfig) -> None:
+    roots = scenario_roots(new)
+    if roots != scenario_roots(old):
+        watch_service.set_roots(roots)
+
+
+config_store.subscribe(_on_config_changed)
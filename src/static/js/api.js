@@ -40,6 +40,36 @@ export const API = {
         return res.json();
     },
 
+    async searchPageObjects({ q = '', limit = 50, offset = 0, includeDoc = false, refresh = false } = {}) {
+        const params = new URLSearchParams({
+            q,
+            limit: String(limit),
+            offset: String(offset),
+            include_doc: String(includeDoc),
+            refresh: String(refresh),
+        });
+        const res = await fetch(`${API_BASE}/page-objects/search?${params.toString()}`);
+        if (!res.ok) throw new Error('Failed to search page objects');
+        return res.json();
+    },
+
+    async getPageObjectDoc(target) {
+        const params = new URLSearchParams({ target });
+        const res = await fetch(`${API_BASE}/page-objects/doc?${params.toString()}`);
+        if (!res.ok) throw new Error('Failed to fetch page object doc');
+        return res.json();
+    },
+
+    async resolvePageObjects(targets) {
+        const res = await fetch(`${API_BASE}/page-objects/resolve`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ targets })
+        });
+        if (!res.ok) throw new Error('Failed to resolve page objects');
+        return res.json();
+    },
+
     async scanPageObject(targetName) {
         const params = new URLSearchParams({ target: targetName });
         const res = await fetch(`${API_BASE}/page-objects/scan?${params.toString()}`);
@@ -52,11 +82,23 @@ export const API = {
         return res.json();
     },
 
-    async loadScenario(path) {
+    openFileEventStream() {
+        return new EventSource(`${API_BASE}/events`);
+    },
+
+    async loadScenario(path, etag = null) {
+        // etag (前回読み込んだ内容のハッシュ) を渡すと、変更がなければ { notModified: true } を返す
         const params = new URLSearchParams({ path });
-        const res = await fetch(`${API_BASE}/scenarios/load?${params.toString()}`);
+        const headers = etag ? { 'If-None-Match': `"${etag}"` } : {};
+        const res = await fetch(`${API_BASE}/scenarios/load?${params.toString()}`, { cache: 'no-store', headers });
+        if (res.status === 304) {
+            return { notModified: true, last_modified: parseFloat(res.headers.get('X-Last-Modified')) || null };
+        }
         if (!res.ok) throw new Error('Failed to load scenario');
-        return res.json();
+        const result = await res.json();
+        // 差分保存の基準にするため、エディタが変更する前のディスク上の内容を残しておく
+        result.snapshot = structuredClone(result.data);
+        return result;
     },
 
     async checkFileStatus(path) {
@@ -66,11 +108,21 @@ export const API = {
         return res.json();
     },
 
-    async saveScenario(path, data, lastModified = null, force = false) {
+    async checkFilesStatus(paths, includeHash = false) {
+        const res = await fetch(`${API_BASE}/scenarios/status/batch`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ paths, include_hash: includeHash })
+        });
+        if (!res.ok) throw new Error('Failed to check file status');
+        return res.json();
+    },
+
+    async saveScenario(path, data, lastModified = null, force = false, baseHash = null) {
         const res = await fetch(`${API_BASE}/scenarios/save`, {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ path, data, last_modified: lastModified, force })
+            body: JSON.stringify({ path, data, last_modified: lastModified, base_hash: baseHash, force })
         });
         if (!res.ok) {
             if (res.status === 409) {
@@ -83,6 +135,20 @@ export const API = {
         return res.json();
     },
 
+    async patchScenario(path, operations, lastModified = null, force = false, baseHash = null) {
+        const res = await fetch(`${API_BASE}/scenarios/patch`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ path, operations, last_modified: lastModified, base_hash: baseHash, force })
+        });
+        if (!res.ok) {
+            const error = new Error(res.status === 409 ? 'Conflict' : 'Failed to patch scenario');
+            error.status = res.status;
+            throw error;
+        }
+        return res.json();
+    },
+
     async renameScenario(oldPath, newName) {
         const res = await fetch(`${API_BASE}/scenarios/rename`, {
             method: 'POST',
@@ -109,10 +175,14 @@ export const API = {
     },
 
     // Templates
-    async getTemplates() {
-        const res = await fetch(`${API_BASE}/templates`);
+    async getTemplates({ q = '', offset = 0, limit = null } = {}) {
+        const params = new URLSearchParams({ q, offset: String(offset) });
+        if (limit !== null) params.set('limit', String(limit));
+        const res = await fetch(`${API_BASE}/templates?${params.toString()}`);
         if (!res.ok) throw new Error('Failed to fetch templates');
-        return res.json();
+        const items = await res.json();
+        const total = parseInt(res.headers.get('X-Total-Count') || String(items.length), 10);
+        return { items, total };
     },
 
     async createTemplate(name, steps) {
@@ -189,6 +259,48 @@ export const API = {
         return res.json();
     },
 
+    openDebugSessionStream(sessionId, offset = 0) {
+        // 再接続時は EventSource が Last-Event-ID を送るので、サーバー側でそこから再開する
+        const params = new URLSearchParams({ offset: String(offset) });
+        return new EventSource(`${API_BASE}/debug-sessions/${sessionId}/stream?${params.toString()}`);
+    },
+
+    async createExecution(payload) {
+        const res = await fetch(`${API_BASE}/executions`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify(payload)
+        });
+        if (!res.ok) {
+            const error = await res.json().catch(() => ({}));
+            throw new Error(error.detail || 'Failed to queue execution');
+        }
+        return res.json();
+    },
+
+    async listExecutions() {
+        const res = await fetch(`${API_BASE}/executions`);
+        if (!res.ok) throw new Error('Failed to fetch executions');
+        return res.json();
+    },
+
+    async cancelExecution(runId) {
+        const res = await fetch(`${API_BASE}/executions/${runId}/cancel`, { method: 'POST' });
+        if (!res.ok) throw new Error('Failed to cancel execution');
+        return res.json();
+    },
+
+    async getExecutionTimeline(runId) {
+        const res = await fetch(`${API_BASE}/executions/${runId}/timeline`);
+        if (!res.ok) throw new Error('Failed to fetch execution timeline');
+        return res.json();
+    },
+
+    openExecutionStream(runId, offset = 0) {
+        const params = new URLSearchParams({ offset: String(offset) });
+        return new EventSource(`${API_BASE}/executions/${runId}/stream?${params.toString()}`);
+    },
+
     async runDebugSession(sessionId, payload) {
         const res = await fetch(`${API_BASE}/debug-sessions/${sessionId}/run`, {
             method: 'POST',
@@ -199,6 +311,19 @@ export const API = {
             const error = await res.json().catch(() => ({}));
             throw new Error(error.detail || 'Failed to run debug session');
         }
+        // 実行はジョブとして開始され、すぐに { job_id, status } が返る
+        return res.json();
+    },
+
+    async getDebugTimeline(sessionId) {
+        const res = await fetch(`${API_BASE}/debug-sessions/${sessionId}/timeline`);
+        if (!res.ok) throw new Error('Failed to fetch debug timeline');
+        return res.json();
+    },
+
+    async getDebugJob(sessionId, jobId) {
+        const res = await fetch(`${API_BASE}/debug-sessions/${sessionId}/jobs/${jobId}`);
+        if (!res.ok) throw new Error('Failed to fetch debug job');
         return res.json();
     },
 
@@ -9,6 +9,7 @@ import { PropertiesPanel } from './ui/properties_panel.js';
 import { ExecutionPanel } from './ui/execution_panel.js';
 import { resizer } from './ui/resizer.js';
 import { showToast } from './ui/toast.js';
+import { createPatch } from './json_patch.js';
 
 class App {
     constructor() {
@@ -30,12 +31,17 @@ class App {
         this.executionPanel = new ExecutionPanel();
         this.currentDebugSessionId = null;
         this.debugPollTimer = null;
+        this.debugEventSource = null;
+        this.executionEventSource = null;
         this.debugLogOffset = 0;
         this.debugLogs = [];
         this.debugRequestActive = false;
         this.currentDebugStatus = null;
         this.currentDebugState = null;
         this.debugSessionStale = false;
+        this.fileEventSource = null;
+        this.fileEventsConnected = false;
+        this.fileListReloadTimer = null;
 
         // Explorer Event Handlers
         this.fileBrowser.onRename = (file) => this.renameModal.open(file.path, file.name);
@@ -90,7 +96,7 @@ class App {
         document.getElementById('btn-save').onclick = () => this.saveCurrentTab();
         document.getElementById('btn-reload').onclick = () => this.reloadCurrentTab();
         document.addEventListener('click', (e) => {
-            const button = e.target.closest('#btn-debug-start, #btn-run-all, #btn-run-until, #btn-run-selected, #btn-stop-execution, #btn-debug-force-kill');
+            const button = e.target.closest('#btn-debug-start, #btn-run-all, #btn-run-until, #btn-run-selected, #btn-stop-execution, #btn-debug-force-kill, #btn-queue-run');
             if (!button || button.disabled) return;
 
             if (button.id === 'btn-debug-start') {
@@ -105,6 +111,8 @@ class App {
                 this.cancelDebugSession();
             } else if (button.id === 'btn-debug-force-kill') {
                 this.forceKillDebugSession();
+            } else if (button.id === 'btn-queue-run') {
+                this.queueExecution();
             }
         });
 
@@ -222,11 +230,17 @@ class App {
 
             this.updateActionButtons();
 
+            // File change notifications (server push)
+            this.startFileEventStream();
+
             // Window Focus / Tab Switch Events for File Sync
-            window.addEventListener('focus', () => this.checkActiveTabForUpdates());
+            // 変更通知ストリームが切断されている間だけ問い合わせる
+            window.addEventListener('focus', () => {
+                if (!this.fileEventsConnected) this.checkOpenTabsForUpdates();
+            });
             document.addEventListener('visibilitychange', () => {
-                if (document.visibilityState === 'visible') {
-                    this.checkActiveTabForUpdates();
+                if (document.visibilityState === 'visible' && !this.fileEventsConnected) {
+                    this.checkOpenTabsForUpdates();
                 }
             });
 
@@ -238,34 +252,141 @@ class App {
     async checkActiveTabForUpdates() {
         const tab = this.tabManager.getActiveTab();
         if (!tab || !tab.file.path) return;
+        tab.pendingDiskCheck = false;
 
         try {
             const status = await API.checkFileStatus(tab.file.path);
-            const diskModified = status.last_modified;
+            await this.applyDiskStatus(tab, status.last_modified, status.hash);
+        } catch (e) {
+            // File might have been deleted or network error
+            console.warn("Check status failed:", e);
+        }
+    }
 
-            if (!tab.lastModified) {
-                tab.lastModified = diskModified;
-                return;
-            }
+    async checkOpenTabsForUpdates() {
+        // 開いている全タブの状態を 1 リクエストで確認する
+        const tabs = this.tabManager.tabs.filter(t => t.file && t.file.path);
+        if (tabs.length === 0) return;
 
-            // Check if newer (allow small epsilon)
-            if (diskModified > tab.lastModified + 0.001) {
-                if (!tab.isDirty) {
-                    console.log("File changed on disk, auto-reloading...");
-                    await this.reloadCurrentTab(true); // silent=true
-                    showToast("ファイルを再読み込みしました: " + tab.file.name);
-                } else {
-                    // Alert user but don't force reload to avoid data loss
-                    showToast("警告: このファイルは外部で変更されています", "warning");
-                    this.tabManager.setExternalChanges(tab.id, true);
+        try {
+            const result = await API.checkFilesStatus(tabs.map(t => t.file.path), true);
+            for (let i = 0; i < tabs.length; i++) {
+                const status = result.files[i];
+                if (!status || !status.exists) {
+                    if (status && status.error) console.warn(`Check status failed: ${status.path}: ${status.error}`);
+                    continue;
                 }
+                await this.applyDiskStatus(tabs[i], status.last_modified, status.hash);
             }
         } catch (e) {
-            // File might have been deleted or network error
             console.warn("Check status failed:", e);
         }
     }
 
+    async applyDiskStatus(tab, diskModified, diskHash = null) {
+        if (!tab.lastModified) {
+            tab.lastModified = diskModified;
+            return;
+        }
+
+        // mtime だけが変わり内容が同じ (touch や同内容での上書き) なら再読み込みしない
+        if (diskHash && tab.contentHash && diskHash === tab.contentHash) {
+            tab.lastModified = diskModified;
+            return;
+        }
+
+        // Check if newer (allow small epsilon)
+        if (diskModified > tab.lastModified + 0.001) {
+            if (tab !== this.tabManager.getActiveTab()) {
+                // 非アクティブなタブはアクティブになったときに再読み込み/警告する
+                tab.pendingDiskCheck = true;
+                if (tab.isDirty) this.tabManager.setExternalChanges(tab.id, true);
+                return;
+            }
+            tab.pendingDiskCheck = false;
+            if (!tab.isDirty) {
+                console.log("File changed on disk, auto-reloading...");
+                await this.reloadCurrentTab(true); // silent=true
+                showToast("ファイルを再読み込みしました: " + tab.file.name);
+            } else {
+                // Alert user but don't force reload to avoid data loss
+                showToast("警告: このファイルは外部で変更されています", "warning");
+                this.tabManager.setExternalChanges(tab.id, true);
+            }
+        }
+    }
+
+    startFileEventStream() {
+        if (!window.EventSource) return;
+
+        let hasConnected = false;
+        this.fileEventSource = API.openFileEventStream();
+        this.fileEventSource.onopen = () => {
+            this.fileEventsConnected = true;
+            // 再接続時は切断中の変更を取りこぼしている可能性があるので再取得する
+            if (hasConnected) {
+                this.scheduleFileListReload();
+                this.checkOpenTabsForUpdates();
+            }
+            hasConnected = true;
+        };
+        this.fileEventSource.onerror = () => {
+            // EventSource は自動で再接続する
+            this.fileEventsConnected = false;
+        };
+        this.fileEventSource.addEventListener('fs', (e) => {
+            try {
+                const payload = JSON.parse(e.data);
+                this.onFileEvents(payload.events || []);
+            } catch (err) {
+                console.warn("Invalid file event:", err);
+            }
+        });
+    }
+
+    onFileEvents(events) {
+        const normalize = (path) => path ? path.replace(/\\/g, '/').toLowerCase() : '';
+        const findTab = (path) => this.tabManager.tabs.find(t => t.file && t.file.path && normalize(t.file.path) === normalize(path));
+        const activeTab = this.tabManager.getActiveTab();
+        let checkActive = false;
+
+        for (const event of events) {
+            if (event.type === 'renamed') {
+                const tab = findTab(event.old_path);
+                if (tab) {
+                    tab.file.path = event.path;
+                    tab.file.name = event.path.split(/[/\\]/).pop();
+                    tab.pendingDiskCheck = true;
+                    this.tabManager.renderTabBar();
+                    this.saveTabsState();
+                }
+            }
+
+            const tab = event.path ? findTab(event.path) : null;
+            if (!tab || tab.isSaving) continue;
+
+            if (event.type === 'deleted') {
+                showToast("警告: このファイルは外部で削除されています: " + tab.file.name, "warning");
+                this.tabManager.setExternalChanges(tab.id, true);
+            } else {
+                tab.pendingDiskCheck = true;
+                if (tab === activeTab) checkActive = true;
+            }
+        }
+
+        if (checkActive) this.checkActiveTabForUpdates();
+        this.scheduleFileListReload();
+    }
+
+    scheduleFileListReload() {
+        if (this.fileListReloadTimer) clearTimeout(this.fileListReloadTimer);
+        this.fileListReloadTimer = setTimeout(() => {
+            this.fileListReloadTimer = null;
+            this.fileBrowser.load(true);
+            this.propertiesPanel.loadAvailableSharedScenarios();
+        }, 300);
+    }
+
     async saveTabsState() {
         const tabsToSave = this.tabManager.tabs
             .filter(t => t.file && t.file.path && !t.isPreview)
@@ -315,6 +436,8 @@ class App {
                 const tab = this.tabManager.openTab(fileObj, response.data, false);
                 tab.lastModified = response.last_modified;
                 tab.hasOrgEditorMeta = !!response.data._editor;
+                tab.savedSnapshot = { path: tabInfo.path, data: response.snapshot };
+                tab.contentHash = response.hash;
 
             } catch (e) {
                 console.warn(`Failed to restore tab: ${tabInfo.path}`, e);
@@ -560,10 +683,22 @@ class App {
             if (!silent) icon.setAttribute('name', 'hourglass-outline');
 
             try {
-                const response = await API.loadScenario(tab.file.path);
+                // 保存済みの内容が手元にあれば、ディスク上の内容が同じ場合は本文を受け取らない
+                const snapshot = tab.savedSnapshot && tab.savedSnapshot.path === tab.file.path ? tab.savedSnapshot : null;
+                let response = await API.loadScenario(tab.file.path, snapshot ? tab.contentHash : null);
+                if (response.notModified) {
+                    response = {
+                        data: structuredClone(snapshot.data),
+                        snapshot: snapshot.data,
+                        hash: tab.contentHash,
+                        last_modified: response.last_modified || tab.lastModified
+                    };
+                }
                 tab.data = response.data;
                 tab.lastModified = response.last_modified;
                 tab.hasOrgEditorMeta = !!response.data._editor;
+                tab.savedSnapshot = { path: tab.file.path, data: response.snapshot };
+                tab.contentHash = response.hash;
 
                 this.tabManager.markDirty(tab.id, false);
                 this.tabManager.setExternalChanges(tab.id, false);
@@ -692,6 +827,8 @@ class App {
 
         const tab = this.tabManager.tabs.find(t => t.id === tabId);
         const lastModified = tab ? tab.lastModified : null;
+        // 内容ハッシュがあれば mtime より厳密な競合検出に使う (別パスへの保存では使わない)
+        const baseHash = tab && tab.file && tab.file.path === path ? tab.contentHash : null;
 
         // Check if grouping is used. If not, remove metadata.
         let dataToSave = data;
@@ -738,7 +875,8 @@ class App {
         }
 
         try {
-            const response = await API.saveScenario(path, dataToSave, lastModified, force);
+            if (tab) tab.isSaving = true;
+            const response = await this.saveScenarioData(tab, path, dataToSave, lastModified, force, baseHash);
 
             this.tabManager.markDirty(tabId, false);
             this.tabManager.setExternalChanges(tabId, false);
@@ -749,6 +887,8 @@ class App {
             }
             if (tab) {
                 tab.hasOrgEditorMeta = !!dataToSave._editor;
+                tab.savedSnapshot = { path, data: structuredClone(dataToSave) };
+                tab.contentHash = response.hash;
             }
 
             // Refresh file list to reflect any name changes
@@ -792,9 +932,29 @@ class App {
                 icon.style.color = '';
             }, 2000);
             throw e;
+        } finally {
+            if (tab) tab.isSaving = false;
         }
     }
 
+    async saveScenarioData(tab, path, dataToSave, lastModified, force, baseHash = null) {
+        // 前回読み込み/保存した内容との差分だけを送る。差分の方が大きい場合や、
+        // サーバー側で適用できなかった場合は全体を保存する
+        const snapshot = tab && tab.savedSnapshot;
+        if (snapshot && snapshot.path === path && lastModified) {
+            const operations = createPatch(snapshot.data, dataToSave);
+            if (JSON.stringify(operations).length < JSON.stringify(dataToSave).length) {
+                try {
+                    return await API.patchScenario(path, operations, lastModified, force, baseHash);
+                } catch (e) {
+                    if (e.status !== 422 && e.status !== 404) throw e;
+                    console.warn('Patch save failed, falling back to full save:', e);
+                }
+            }
+        }
+        return API.saveScenario(path, dataToSave, lastModified, force, baseHash);
+    }
+
     async ensureRunnableTabSaved(tab) {
         if (!tab.file.path) {
             showToast("新規ファイルは保存してから実行してください", "error");
@@ -838,7 +998,7 @@ class App {
             this.debugLogs = [];
             this.renderDebugState(state);
             this.updateActionButtons();
-            this.pollDebugSession();
+            this.watchDebugSession();
             return state.session_id;
         } catch (e) {
             showToast(e.message, "error");
@@ -856,6 +1016,56 @@ class App {
         return this.startDebugSession();
     }
 
+    async queueExecution() {
+        const tab = this.tabManager.getActiveTab();
+        if (!tab || !tab.file.path) return;
+        if (!this.config.framework_path) {
+            showToast("Framework Path を設定してください", "error");
+            this.settingsModal.open(this.config);
+            return;
+        }
+
+        try {
+            const saved = await this.ensureRunnableTabSaved(tab);
+            if (!saved) return;
+            const state = await API.createExecution({
+                scenario_path: tab.file.path,
+                scenario_id: tab.data.id || null,
+                env: this.config.execution_settings?.default_env || 'DEFAULT'
+            });
+            showToast(state.queue_position
+                ? `実行キューに追加しました (${state.queue_position} 番目)`
+                : "実行を開始しました");
+            // デバッグセッション中はパネルをデバッグ側に残す
+            if (!this.currentDebugSessionId) this.watchExecution(state);
+        } catch (e) {
+            showToast(e.message, "error");
+        }
+    }
+
+    watchExecution(initialState) {
+        if (this.executionEventSource) this.executionEventSource.close();
+        this.executionPanel.renderState(initialState);
+        if (!window.EventSource) return;
+
+        const logs = [];
+        const source = API.openExecutionStream(initialState.run_id);
+        this.executionEventSource = source;
+        source.addEventListener('log', (e) => {
+            const payload = JSON.parse(e.data);
+            logs.push(...(payload.lines || []));
+            if (!this.currentDebugSessionId) this.executionPanel.renderLogs(logs);
+        });
+        source.addEventListener('state', (e) => {
+            if (!this.currentDebugSessionId) this.executionPanel.renderState(JSON.parse(e.data));
+        });
+        source.addEventListener('end', () => {
+            source.close();
+            if (this.executionEventSource === source) this.executionEventSource = null;
+            this.refreshStepTimeline(() => API.getExecutionTimeline(initialState.run_id));
+        });
+    }
+
     async restoreDebugSession() {
         try {
             const active = await API.getActiveDebugSession();
@@ -867,19 +1077,8 @@ class App {
             this.debugLogOffset = 0;
             this.debugLogs = [];
             this.renderDebugState(state);
-
-            try {
-                const logs = await API.getDebugSessionLogs(state.session_id, this.debugLogOffset);
-                this.debugLogOffset = logs.next_offset ?? this.debugLogOffset;
-                this.debugLogs.push(...(logs.logs || []));
-                this.executionPanel.renderLogs(this.debugLogs);
-            } catch (e) {
-                console.warn("Failed to restore debug logs:", e);
-            }
-
-            if (['running', 'starting', 'cancelling'].includes(state.status)) {
-                this.pollDebugSession();
-            }
+            // ストリーム (またはポーリング) が先頭からのログを取得する
+            this.watchDebugSession();
             showToast("既存のデバッグセッションを復元しました");
         } catch (e) {
             console.warn("Failed to restore active debug session:", e);
@@ -934,7 +1133,8 @@ class App {
             this.scheduleDebugPoll(0);
             let state = null;
             for (const payload of payloads) {
-                state = await API.runDebugSession(sessionId, payload);
+                const job = await API.runDebugSession(sessionId, payload);
+                state = await this.waitForDebugJob(sessionId, job);
                 this.renderDebugState(state);
                 state = await this.waitForDebugRunSettled(sessionId, state);
                 this.renderDebugState(state);
@@ -944,6 +1144,7 @@ class App {
             }
             this.updateActionButtons();
             this.scheduleDebugPoll(0);
+            this.refreshStepTimeline(() => API.getDebugTimeline(sessionId));
         } catch (e) {
             showToast(e.message, "error");
         } finally {
@@ -952,6 +1153,18 @@ class App {
         }
     }
 
+    async waitForDebugJob(sessionId, initialJob) {
+        let job = initialJob;
+        while (job.status === 'running') {
+            await new Promise(resolve => setTimeout(resolve, 300));
+            job = await API.getDebugJob(sessionId, job.job_id);
+        }
+        if (job.status === 'failed') {
+            throw new Error(job.error || 'Failed to run debug session');
+        }
+        return job.result;
+    }
+
     async waitForDebugRunSettled(sessionId, initialState) {
         let state = initialState;
         const deadline = Date.now() + 10 * 60 * 1000;
@@ -1014,21 +1227,79 @@ class App {
                 this.updateActionButtons();
             }
         } catch (e) {
-            showToast(e.message, "error");
-            this.currentDebugSessionId = null;
-            this.currentDebugStatus = null;
-            this.currentDebugState = null;
             this.debugPollTimer = null;
-            this.applyDebugStepHighlight(null);
-            this.updateActionButtons();
+            this.onDebugSessionLost(e);
         }
     }
 
     scheduleDebugPoll(delay = 1000) {
-        if (!this.currentDebugSessionId || this.debugPollTimer) return;
+        // ストリーム接続中はサーバーから状態が届くのでポーリングしない
+        if (!this.currentDebugSessionId || this.debugPollTimer || this.debugEventSource) return;
         this.debugPollTimer = setTimeout(() => this.pollDebugSession(), delay);
     }
 
+    watchDebugSession() {
+        this.stopDebugWatch();
+        if (!this.currentDebugSessionId) return;
+        if (!window.EventSource) {
+            this.pollDebugSession();
+            return;
+        }
+
+        const sessionId = this.currentDebugSessionId;
+        const source = API.openDebugSessionStream(sessionId, this.debugLogOffset);
+        this.debugEventSource = source;
+        source.addEventListener('log', (e) => {
+            const payload = JSON.parse(e.data);
+            this.debugLogOffset = payload.next_offset ?? this.debugLogOffset;
+            this.debugLogs.push(...(payload.lines || []));
+            this.executionPanel.renderLogs(this.debugLogs);
+        });
+        source.addEventListener('state', (e) => {
+            this.renderDebugState(JSON.parse(e.data));
+            this.updateActionButtons();
+        });
+        source.addEventListener('end', () => {
+            if (this.debugEventSource === source) this.stopDebugWatch();
+        });
+        source.onerror = async () => {
+            // 一時的な切断は EventSource が Last-Event-ID 付きで再接続する
+            if (source.readyState !== EventSource.CLOSED || this.debugEventSource !== source) return;
+            this.stopDebugWatch();
+            try {
+                await API.getDebugSession(sessionId);
+                if (this.currentDebugSessionId === sessionId) {
+                    setTimeout(() => {
+                        if (this.currentDebugSessionId === sessionId && !this.debugEventSource) this.watchDebugSession();
+                    }, 2000);
+                }
+            } catch (err) {
+                if (this.currentDebugSessionId === sessionId) this.onDebugSessionLost(err);
+            }
+        };
+    }
+
+    stopDebugWatch() {
+        if (this.debugEventSource) {
+            this.debugEventSource.close();
+            this.debugEventSource = null;
+        }
+        if (this.debugPollTimer) {
+            clearTimeout(this.debugPollTimer);
+            this.debugPollTimer = null;
+        }
+    }
+
+    onDebugSessionLost(e) {
+        showToast(e.message, "error");
+        this.stopDebugWatch();
+        this.currentDebugSessionId = null;
+        this.currentDebugStatus = null;
+        this.currentDebugState = null;
+        this.applyDebugStepHighlight(null);
+        this.updateActionButtons();
+    }
+
     async cancelDebugSession() {
         if (!this.currentDebugSessionId) return;
         try {
@@ -1044,6 +1315,7 @@ class App {
         if (!this.currentDebugSessionId) return;
         try {
             const state = await API.closeDebugSession(this.currentDebugSessionId, {});
+            this.stopDebugWatch();
             this.renderDebugState(state);
             this.currentDebugSessionId = null;
             this.currentDebugStatus = null;
@@ -1062,6 +1334,7 @@ class App {
         if (!this.currentDebugSessionId) return;
         try {
             const state = await API.forceKillDebugSession(this.currentDebugSessionId);
+            this.stopDebugWatch();
             this.renderDebugState(state);
             this.currentDebugSessionId = null;
             this.currentDebugStatus = null;
@@ -1082,6 +1355,7 @@ class App {
             this.debugRequestActive = true;
             this.updateActionButtons();
             await API.closeDebugSession(this.currentDebugSessionId, { run_teardown: false, close_resources: false });
+            this.stopDebugWatch();
             this.currentDebugSessionId = null;
             this.currentDebugStatus = null;
             this.currentDebugState = null;
@@ -1101,7 +1375,7 @@ class App {
             this.currentDebugSessionId = state.session_id;
             this.renderDebugState(state);
             this.updateActionButtons();
-            this.pollDebugSession();
+            this.watchDebugSession();
             showToast("変更を反映するためデバッグセッションを再作成しました");
             return state.session_id;
         } catch (e) {
@@ -1153,6 +1427,8 @@ class App {
             tab.data = response.data;
             tab.lastModified = response.last_modified;
             tab.hasOrgEditorMeta = !!response.data._editor;
+            tab.savedSnapshot = { path: file.path, data: response.snapshot };
+            tab.contentHash = response.hash;
 
             // We don't need to force markDirty(false) here because openTab initializes as clean
             // and we rely on that. But keeping it explicitly doesn't hurt for new tabs.
@@ -1223,8 +1499,13 @@ class App {
             // Synchronize explorer highlight
             this.fileBrowser.selectFileByPath(tab.file ? tab.file.path : null);
 
+            this.revalidateTabTargets(tab);
+
             // Check for updates when switching to this tab
-            this.checkActiveTabForUpdates();
+            // (変更通知を受信済みのタブ、または通知ストリームが切断中の場合のみ)
+            if (!this.fileEventsConnected || tab.pendingDiskCheck) {
+                this.checkActiveTabForUpdates();
+            }
         } else {
             // No tab open, clear properties panel
             this.propertiesPanel.render(null);
@@ -1234,6 +1515,23 @@ class App {
         this.saveTabsState();
     }
 
+    async revalidateTabTargets(tab) {
+        // 一覧取得後に追加されたメソッドなど、無効表示になっているターゲットを一括で再確認する
+        if (!tab || !tab.data) return;
+        const targets = [];
+        ['setup', 'steps', 'teardown'].forEach(section => {
+            (tab.data[section] || []).forEach(step => {
+                if (step && step.params && step.params.target !== undefined) {
+                    targets.push(step.params.target);
+                }
+            });
+        });
+        const changed = await this.propertiesPanel.verifyTargets(targets);
+        if (changed && this.tabManager.getActiveTab() === tab) {
+            this.editor.rerender();
+        }
+    }
+
     updateActionButtons() {
         const tab = this.tabManager.getActiveTab();
         const btnSave = document.getElementById('btn-save');
@@ -1247,7 +1545,8 @@ class App {
         const btnForceKill = document.getElementById('btn-debug-force-kill');
         const hasFramework = !!(this.config && this.config.framework_path);
         const hasSession = !!this.currentDebugSessionId;
-        const isRunning = !!this.debugPollTimer || this.debugRequestActive;
+        const isStreamingRun = !!this.debugEventSource && ['running', 'starting', 'cancelling'].includes(this.currentDebugStatus);
+        const isRunning = !!this.debugPollTimer || isStreamingRun || this.debugRequestActive;
         const isDebugExecutionRunning = hasSession && this.currentDebugStatus === 'running';
         const range = this.editor ? this.editor.getSelectedStepRange() : null;
 
@@ -1275,6 +1574,8 @@ class App {
         }
         if (btnStop) btnStop.disabled = !isDebugExecutionRunning;
         if (btnForceKill) btnForceKill.disabled = !hasSession;
+        const btnQueueRun = document.getElementById('btn-queue-run');
+        if (btnQueueRun) btnQueueRun.disabled = !tab || !hasFramework || !tab.file.path;
     }
 
     renderDebugState(state) {
@@ -1310,6 +1611,21 @@ class App {
         };
     }
 
+    // 実行結果のステップごとの所要時間を、同じシナリオを開いているタブのステップに表示する
+    async refreshStepTimeline(fetchTimeline) {
+        try {
+            const timeline = await fetchTimeline();
+            const tab = this.tabManager.getActiveTab();
+            if (!tab || !tab.file || !tab.file.path || !timeline.steps.length) return;
+
+            const normalize = (path) => path ? String(path).replace(/\\/g, '/').toLowerCase() : '';
+            if (normalize(timeline.scenario_path) !== normalize(tab.file.path)) return;
+            this.editor.setStepTimeline(timeline.steps);
+        } catch (e) {
+            console.warn("Failed to load step timeline:", e);
+        }
+    }
+
     renderDebugToggleButton(button, hasSession) {
         if (!button) return;
         const icon = button.querySelector('ion-icon');
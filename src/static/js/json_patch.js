@@ -0,0 +1,85 @@
+// RFC 6902 (JSON Patch) 形式の差分を作成する。
+// 配列は共通の先頭・末尾を除いた範囲だけを比較するので、
+// 長いステップ列の途中への挿入・削除・1 パラメータの変更は少数の操作になる。
+
+const escapeToken = (token) => String(token).replace(/~/g, '~0').replace(/\//g, '~1');
+
+const isObject = (value) => value !== null && typeof value === 'object' && !Array.isArray(value);
+
+export function deepEqual(a, b) {
+    if (a === b) return true;
+    if (Array.isArray(a)) {
+        if (!Array.isArray(b) || a.length !== b.length) return false;
+        for (let i = 0; i < a.length; i++) {
+            if (!deepEqual(a[i], b[i])) return false;
+        }
+        return true;
+    }
+    if (isObject(a)) {
+        if (!isObject(b)) return false;
+        const keysA = Object.keys(a);
+        if (keysA.length !== Object.keys(b).length) return false;
+        return keysA.every(key => Object.prototype.hasOwnProperty.call(b, key) && deepEqual(a[key], b[key]));
+    }
+    return false;
+}
+
+export function createPatch(before, after) {
+    const ops = [];
+    diffValue(before, after, '', ops);
+    return ops;
+}
+
+function diffValue(before, after, path, ops) {
+    if (deepEqual(before, after)) return;
+    if (Array.isArray(before) && Array.isArray(after)) {
+        diffArray(before, after, path, ops);
+    } else if (isObject(before) && isObject(after)) {
+        diffObject(before, after, path, ops);
+    } else {
+        ops.push({ op: 'replace', path, value: after });
+    }
+}
+
+function diffObject(before, after, path, ops) {
+    for (const key of Object.keys(before)) {
+        if (!Object.prototype.hasOwnProperty.call(after, key)) {
+            ops.push({ op: 'remove', path: `${path}/${escapeToken(key)}` });
+        }
+    }
+    for (const key of Object.keys(after)) {
+        const childPath = `${path}/${escapeToken(key)}`;
+        if (!Object.prototype.hasOwnProperty.call(before, key)) {
+            ops.push({ op: 'add', path: childPath, value: after[key] });
+        } else {
+            diffValue(before[key], after[key], childPath, ops);
+        }
+    }
+}
+
+function diffArray(before, after, path, ops) {
+    let start = 0;
+    while (start < before.length && start < after.length && deepEqual(before[start], after[start])) {
+        start++;
+    }
+    let endBefore = before.length;
+    let endAfter = after.length;
+    while (endBefore > start && endAfter > start && deepEqual(before[endBefore - 1], after[endAfter - 1])) {
+        endBefore--;
+        endAfter--;
+    }
+
+    const removed = endBefore - start;
+    const added = endAfter - start;
+    const common = Math.min(removed, added);
+    for (let i = 0; i < common; i++) {
+        diffValue(before[start + i], after[start + i], `${path}/${start + i}`, ops);
+    }
+    // 削除は同じ位置から繰り返す (後続要素が前に詰まるため)
+    for (let i = common; i < removed; i++) {
+        ops.push({ op: 'remove', path: `${path}/${start + common}` });
+    }
+    for (let i = common; i < added; i++) {
+        ops.push({ op: 'add', path: `${path}/${start + i}`, value: after[start + i] });
+    }
+}
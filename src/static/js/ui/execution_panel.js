@@ -31,7 +31,7 @@ export class ExecutionPanel {
     renderState(state) {
         if (!state) return;
         this.toggle(true);
-        this.statusEl.textContent = state.status;
+        this.statusEl.textContent = state.queue_position ? `${state.status} #${state.queue_position}` : state.status;
         this.statusEl.className = `execution-status ${state.status}`;
         const current = state.current_index === null || state.current_index === undefined
             ? ''
@@ -39,7 +39,7 @@ export class ExecutionPanel {
         const resources = state.resources
             ? ` app:${state.resources.app_active ? 'on' : 'off'} browser:${state.resources.browser_active ? 'on' : 'off'}`
             : '';
-        this.targetEl.textContent = `${state.session_id || 'debug'}: ${state.scenario_id || state.scenario_path || ''}${current}${resources}`;
+        this.targetEl.textContent = `${state.session_id || state.run_id || 'debug'}: ${state.scenario_id || state.scenario_path || ''}${current}${resources}`;
 
         const artifactsPath = this.resolveArtifactsPath(state);
         this.artifactsPath = artifactsPath;
@@ -61,11 +61,16 @@ export class FileBrowser {
         this.renderFiltered();
     }
 
-    async load() {
-        this.container.innerHTML = '<div class="loading">Loading...</div>';
+    async load(silent = false) {
+        // silent: 変更通知による再読み込み。表示を Loading に差し替えず、スクロール位置も維持する
+        const scrollTop = this.container.scrollTop;
+        if (!silent) {
+            this.container.innerHTML = '<div class="loading">Loading...</div>';
+        }
         try {
             this.data = await API.listFiles();
             this.renderFiltered();
+            if (silent) this.container.scrollTop = scrollTop;
         } catch (e) {
             this.container.innerHTML = `<div class="error">Error: ${e.message}</div>`;
         }
@@ -83,7 +88,9 @@ export class FileBrowser {
                     files: dir.files.map(file => ({ ...file, dirIndex })).filter(file =>
                         file.name.toLowerCase().includes(this.searchQuery) ||
                         (file.parent && file.parent.toLowerCase().includes(this.searchQuery)) ||
-                        (file.scenarioName && file.scenarioName.toLowerCase().includes(this.searchQuery))
+                        (file.scenarioName && file.scenarioName.toLowerCase().includes(this.searchQuery)) ||
+                        (file.scenarioId && file.scenarioId.toLowerCase().includes(this.searchQuery)) ||
+                        (file.tags && file.tags.some(tag => tag.toLowerCase().includes(this.searchQuery)))
                     )
                 };
             }).filter(dir => dir.files.length > 0)
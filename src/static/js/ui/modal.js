@@ -1,6 +1,9 @@
 
 import { API } from '../api.js';
 
+const TEMPLATE_PAGE_SIZE = 50;
+const TEMPLATE_SEARCH_DEBOUNCE_MS = 200;
+
 export class BaseModal {
     constructor(modalId) {
         this.modal = document.getElementById(modalId);
@@ -313,7 +316,11 @@ export class TemplateEditorModal extends BaseModal {
         this.templatesContainer = document.getElementById('template-editor-list');
         this.searchInput = document.getElementById('template-editor-search');
         this.jsonEditor = new TemplateJsonEditorModal(() => this.loadTemplates());
-        this.allTemplates = [];
+        this.templates = [];
+        this.total = 0;
+        this.requestSeq = 0;
+        this.isLoadingMore = false;
+        this.searchTimer = null;
 
         const btnClose = this.modal.querySelector('.close-modal');
         if (btnClose) btnClose.onclick = () => this.close();
@@ -323,7 +330,19 @@ export class TemplateEditorModal extends BaseModal {
         if (btnCloseFooter) btnCloseFooter.onclick = () => this.close();
 
         if (this.searchInput) {
-            this.searchInput.oninput = () => this.filterTemplates();
+            this.searchInput.oninput = () => {
+                clearTimeout(this.searchTimer);
+                this.searchTimer = setTimeout(() => this.loadTemplates(), TEMPLATE_SEARCH_DEBOUNCE_MS);
+            };
+        }
+
+        // 一覧の末尾までスクロールしたら次のページを読み込む
+        const scrollContainer = this.templatesContainer ? this.templatesContainer.parentElement : null;
+        if (scrollContainer) {
+            scrollContainer.onscroll = () => {
+                const { scrollTop, scrollHeight, clientHeight } = scrollContainer;
+                if (scrollTop + clientHeight >= scrollHeight - 50) this.loadMoreTemplates();
+            };
         }
     }
 
@@ -333,10 +352,19 @@ export class TemplateEditorModal extends BaseModal {
         super.open();
     }
 
+    getQuery() {
+        return this.searchInput ? this.searchInput.value.trim() : '';
+    }
+
     async loadTemplates() {
+        const requestId = ++this.requestSeq;
+        clearTimeout(this.searchTimer);
         try {
-            this.allTemplates = await API.getTemplates();
-            this.filterTemplates();
+            const { items, total } = await API.getTemplates({ q: this.getQuery(), limit: TEMPLATE_PAGE_SIZE });
+            if (requestId !== this.requestSeq) return;
+            this.templates = items;
+            this.total = total;
+            this.renderTemplates(items);
         } catch (e) {
             console.error('Failed to load templates:', e);
             if (this.templatesContainer)
@@ -344,17 +372,33 @@ export class TemplateEditorModal extends BaseModal {
         }
     }
 
-    filterTemplates() {
-        const query = this.searchInput ? this.searchInput.value.toLowerCase().trim() : '';
-        const filtered = this.allTemplates.filter(t => t.name.toLowerCase().includes(query));
-        this.renderTemplates(filtered);
+    async loadMoreTemplates() {
+        if (this.isLoadingMore || this.templates.length >= this.total) return;
+        this.isLoadingMore = true;
+        const requestId = this.requestSeq;
+        try {
+            const { items, total } = await API.getTemplates({
+                q: this.getQuery(),
+                offset: this.templates.length,
+                limit: TEMPLATE_PAGE_SIZE
+            });
+            if (requestId !== this.requestSeq) return;
+            this.templates = this.templates.concat(items);
+            this.total = total;
+            this.renderTemplates(items, true);
+        } catch (e) {
+            console.error('Failed to load templates:', e);
+        } finally {
+            this.isLoadingMore = false;
+        }
     }
 
-    renderTemplates(templates) {
+    renderTemplates(templates, append = false) {
         if (!this.templatesContainer) return;
-        this.templatesContainer.innerHTML = '';
+        if (!append) this.templatesContainer.innerHTML = '';
         if (templates.length === 0) {
-            if (this.allTemplates.length === 0) {
+            if (append) return;
+            if (!this.getQuery()) {
                 this.templatesContainer.innerHTML = '<div style="padding:20px; text-align:center; color:#999;">No templates saved.</div>';
             } else {
                 this.templatesContainer.innerHTML = '<div style="padding:20px; text-align:center; color:#999;">一致するテンプレートはありません</div>';
@@ -840,7 +884,11 @@ export class SelectTemplateModal extends BaseModal {
         this.list = document.getElementById('select-template-list');
         this.emptyState = document.getElementById('template-empty-state');
         this.searchInput = document.getElementById('select-template-search');
-        this.allTemplates = [];
+        this.templates = [];
+        this.total = 0;
+        this.requestSeq = 0;
+        this.isLoadingMore = false;
+        this.searchTimer = null;
 
         const btnClose = this.modal.querySelector('.close-modal');
         if (btnClose) btnClose.onclick = () => this.cancel();
@@ -849,7 +897,19 @@ export class SelectTemplateModal extends BaseModal {
         if (btnCancel) btnCancel.onclick = () => this.cancel();
 
         if (this.searchInput) {
-            this.searchInput.oninput = () => this.filterTemplates();
+            this.searchInput.oninput = () => {
+                clearTimeout(this.searchTimer);
+                this.searchTimer = setTimeout(() => this.loadTemplates(), TEMPLATE_SEARCH_DEBOUNCE_MS);
+            };
+        }
+
+        // 一覧の末尾までスクロールしたら次のページを読み込む
+        const scrollContainer = this.list ? this.list.parentElement : null;
+        if (scrollContainer) {
+            scrollContainer.onscroll = () => {
+                const { scrollTop, scrollHeight, clientHeight } = scrollContainer;
+                if (scrollTop + clientHeight >= scrollHeight - 50) this.loadMoreTemplates();
+            };
         }
     }
 
@@ -863,25 +923,54 @@ export class SelectTemplateModal extends BaseModal {
             this.searchInput.value = '';
         }
 
+        await this.loadTemplates();
+    }
+
+    getQuery() {
+        return this.searchInput ? this.searchInput.value.trim() : '';
+    }
+
+    async loadTemplates() {
+        const requestId = ++this.requestSeq;
+        clearTimeout(this.searchTimer);
         try {
-            this.allTemplates = await API.getTemplates();
-            this.filterTemplates();
+            const { items, total } = await API.getTemplates({ q: this.getQuery(), limit: TEMPLATE_PAGE_SIZE });
+            if (requestId !== this.requestSeq) return;
+            this.templates = items;
+            this.total = total;
+            this.renderTemplates(items);
         } catch (e) {
             console.error(e);
             this.list.innerHTML = 'Failed to load templates.';
         }
     }
 
-    filterTemplates() {
-        const query = this.searchInput ? this.searchInput.value.toLowerCase().trim() : '';
-        const filtered = this.allTemplates.filter(t => t.name.toLowerCase().includes(query));
-        this.renderTemplates(filtered);
+    async loadMoreTemplates() {
+        if (this.isLoadingMore || this.templates.length >= this.total) return;
+        this.isLoadingMore = true;
+        const requestId = this.requestSeq;
+        try {
+            const { items, total } = await API.getTemplates({
+                q: this.getQuery(),
+                offset: this.templates.length,
+                limit: TEMPLATE_PAGE_SIZE
+            });
+            if (requestId !== this.requestSeq) return;
+            this.templates = this.templates.concat(items);
+            this.total = total;
+            this.renderTemplates(items, true);
+        } catch (e) {
+            console.error(e);
+        } finally {
+            this.isLoadingMore = false;
+        }
     }
 
-    renderTemplates(templates) {
-        this.list.innerHTML = '';
+    renderTemplates(templates, append = false) {
+        if (!append) this.list.innerHTML = '';
         if (templates.length === 0) {
-            if (this.allTemplates.length === 0) {
+            if (append) return;
+            if (!this.getQuery()) {
                 this.emptyState.style.display = 'flex';
                 const p = this.emptyState.querySelector('p');
                 if (p) p.textContent = '保存されたテンプレートはありません。';
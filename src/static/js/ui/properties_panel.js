@@ -29,8 +29,11 @@ export class PropertiesPanel {
 
     async loadAvailableTargets() {
         try {
-            const targets = await API.getPageObjects();
-            this.availableTargets = targets.map(t => t.target);
+            const result = await API.getPageObjects();
+            this.availableTargets = result.targets.map(t => t.target);
+            if (result.errors && result.errors.length > 0) {
+                console.warn('Failed to parse some page object files:', result.errors);
+            }
         } catch (e) {
             console.error('Failed to load available targets:', e);
             this.availableTargets = [];
@@ -143,6 +146,30 @@ export class PropertiesPanel {
         }
     }
 
+    async verifyTargets(targetValues) {
+        // 無効と判定されているターゲットをまとめてサーバーに問い合わせ、結果を反映する
+        // 反映によって判定が変わった場合は true を返す
+        const currentSet = new Set(this.availableTargets);
+        const values = [...new Set(targetValues
+            .filter(v => typeof v === 'string' && v.trim() !== '')
+            .map(v => v.trim()))]
+            .filter(v => !currentSet.has(v));
+        if (values.length === 0) return false;
+
+        try {
+            const { results } = await API.resolvePageObjects(values);
+            const resolved = results.filter(r => r.valid).map(r => r.target);
+            if (resolved.length === 0) return false;
+            resolved.forEach(t => currentSet.add(t));
+            this.availableTargets = Array.from(currentSet);
+            this.refreshValidationState();
+            return true;
+        } catch (e) {
+            console.error('Target resolve failed:', e);
+            return false;
+        }
+    }
+
     refreshValidationState() {
         const inputs = this.panel.querySelectorAll('.param-value');
         inputs.forEach(input => {
@@ -41,6 +41,7 @@ export class ScenarioEditor {
         this.activeItemId = null;       // ID of the active item for properties
         this.lastCheckedStepId = null;  // For shift-click range selection
         this.executingStepId = null;    // Step currently running in a debug session
+        this.stepTimings = new Map();   // Map<stepId, timing> from the latest run of this tab
 
         // Internal clipboard for paste operations (avoids browser permission dialogs)
         this.internalClipboard = null;
@@ -70,6 +71,7 @@ export class ScenarioEditor {
             this.selectedSteps.clear();
             this.activeItemId = null;
             this.selectedStep = null;
+            this.stepTimings = new Map();
             if (this.onStepSelect) this.onStepSelect(null);
             return;
         }
@@ -85,8 +87,10 @@ export class ScenarioEditor {
                 selectedStep: null
             };
         }
+        if (!tab.uiState.stepTimings) tab.uiState.stepTimings = new Map();
         this.selectedSteps = tab.uiState.selectedSteps;
         this.activeItemId = tab.uiState.activeItemId;
+        this.stepTimings = tab.uiState.stepTimings;
         this.selectedStep = null; // Re-find from current data
 
         if (this.activeItemId) {
@@ -166,6 +170,10 @@ export class ScenarioEditor {
                         <ion-icon name="radio-button-on-outline"></ion-icon>
                         <span>選択のみ</span>
                     </button>
+                    <button id="btn-queue-run" class="execution-action-btn execution-action-run" title="pytest で実行 (キューに追加)">
+                        <ion-icon name="list-outline"></ion-icon>
+                        <span>キュー実行</span>
+                    </button>
                     <button id="btn-stop-execution" class="execution-action-btn execution-action-stop" title="Stop execution" disabled>
                         <ion-icon name="stop-outline"></ion-icon>
                         <span>停止</span>
@@ -328,6 +336,7 @@ export class ScenarioEditor {
                     <div class="step-name">${name}</div>
                     <div class="step-desc">${op}</div>
                 </div>
+                ${this.renderStepTiming(step._stepId)}
                 <div class="step-actions">
                     <button class="step-action-btn" data-action="rename-step-modal" title="ステップ名を編集">
                         <ion-icon name="create-outline"></ion-icon>
@@ -362,6 +371,42 @@ export class ScenarioEditor {
         }
     }
 
+    renderStepTiming(stepId) {
+        const timing = this.stepTimings.get(stepId);
+        if (!timing) return '';
+        const status = timing.status || 'unknown';
+        const duration = Number.isFinite(timing.duration_ms) ? ScenarioEditor.formatDuration(timing.duration_ms) : status;
+        const title = (timing.error ? `${status}: ${timing.error}` : status).replace(/"/g, '&quot;').replace(/</g, '&lt;');
+        return `<span class="step-duration status-${status}" title="${title}">${duration}</span>`;
+    }
+
+    static formatDuration(ms) {
+        if (ms < 1000) return `${Math.round(ms)}ms`;
+        if (ms < 60000) return `${(ms / 1000).toFixed(1)}s`;
+        return `${Math.floor(ms / 60000)}m${Math.round((ms % 60000) / 1000)}s`;
+    }
+
+    // Attach per-step durations/results ({ section, index, status, duration_ms, error }) to the current tab
+    setStepTimeline(entries) {
+        if (!this.currentData) return;
+        this.stepTimings.clear();
+        for (const entry of entries || []) {
+            const step = (this.currentData[entry.section] || [])[entry.index];
+            if (step) this.stepTimings.set(step._stepId, entry);
+        }
+        this.applyStepTimings();
+    }
+
+    applyStepTimings() {
+        if (!this.container) return;
+        this.container.querySelectorAll('.step-item[data-type="step"]').forEach(el => {
+            const existing = el.querySelector('.step-duration');
+            if (existing) existing.remove();
+            const html = this.renderStepTiming(el.dataset.id);
+            if (html) el.querySelector('.step-actions').insertAdjacentHTML('beforebegin', html);
+        });
+    }
+
     static ICON_MAPPING = null;
 
     setIcons(icons) {
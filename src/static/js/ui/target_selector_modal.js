@@ -1,6 +1,9 @@
 import { BaseModal } from './modal.js';
 import { API } from '../api.js';
 
+const PAGE_SIZE = 100;
+const SEARCH_DEBOUNCE_MS = 150;
+
 export class TargetSelectorModal extends BaseModal {
     constructor(onSelect) {
         // We need to create the modal structure dynamically first if it doesn't exist
@@ -33,16 +36,30 @@ export class TargetSelectorModal extends BaseModal {
 
         super(modalId);
         this.onSelect = onSelect;
-        this.targets = [];
+        this.items = [];
+        this.total = 0;
+        this.requestSeq = 0;
+        this.isLoadingMore = false;
+        this.searchTimer = null;
 
         // Events
         const closeBtns = this.modal.querySelectorAll('.close-target-selector-modal');
         closeBtns.forEach(btn => btn.onclick = () => this.cancel());
 
         this.searchInput = document.getElementById('target-search');
-        this.searchInput.oninput = () => this.renderList();
+        this.searchInput.oninput = () => {
+            // 入力のたびに問い合わせないよう少し待ってから検索する
+            clearTimeout(this.searchTimer);
+            this.searchTimer = setTimeout(() => this.search(false), SEARCH_DEBOUNCE_MS);
+        };
 
         this.listContainer = document.getElementById('target-list');
+        this.listContainer.onscroll = () => {
+            const { scrollTop, scrollHeight, clientHeight } = this.listContainer;
+            if (scrollTop + clientHeight >= scrollHeight - 50) {
+                this.loadMore();
+            }
+        };
     }
 
     async open(currentValue, onSelectCallback) {
@@ -53,28 +70,69 @@ export class TargetSelectorModal extends BaseModal {
         // Show loading state
         this.listContainer.innerHTML = '<div style="padding:10px;">Loading...</div>';
         super.open();
+        this.searchInput.focus();
+
+        // 開いたときだけページオブジェクトの変更を確認する
+        await this.search(true);
+    }
 
+    async search(refresh) {
+        const requestId = ++this.requestSeq;
+        clearTimeout(this.searchTimer);
         try {
-            this.targets = await API.getPageObjects();
+            const result = await API.searchPageObjects({
+                q: this.searchInput.value,
+                limit: PAGE_SIZE,
+                includeDoc: true,
+                refresh,
+            });
+            // 入力が進んでいれば古い結果は捨てる
+            if (requestId !== this.requestSeq) return;
+            this.items = result.items;
+            this.total = result.total;
+            this.listContainer.scrollTop = 0;
             this.renderList();
-            this.searchInput.focus();
         } catch (e) {
+            if (requestId !== this.requestSeq) return;
             this.listContainer.innerHTML = `<div style="padding:10px; color:red;">Error loading targets: ${e.message}</div>`;
         }
     }
 
-    renderList() {
-        const query = this.searchInput.value.toLowerCase();
-        const filtered = this.targets.filter(t => t.target.toLowerCase().includes(query));
+    async loadMore() {
+        if (this.isLoadingMore || this.items.length >= this.total) return;
+        this.isLoadingMore = true;
+        const requestId = this.requestSeq;
+        try {
+            const result = await API.searchPageObjects({
+                q: this.searchInput.value,
+                limit: PAGE_SIZE,
+                offset: this.items.length,
+                includeDoc: true,
+            });
+            if (requestId !== this.requestSeq) return;
+            this.items = this.items.concat(result.items);
+            this.total = result.total;
+            this.renderItems(result.items);
+        } catch (e) {
+            console.warn('Failed to load more targets:', e);
+        } finally {
+            this.isLoadingMore = false;
+        }
+    }
 
+    renderList() {
         this.listContainer.innerHTML = '';
 
-        if (filtered.length === 0) {
+        if (this.items.length === 0) {
             this.listContainer.innerHTML = '<div style="padding:10px; color:#888;">No targets found.</div>';
             return;
         }
 
-        filtered.forEach(item => {
+        this.renderItems(this.items);
+    }
+
+    renderItems(items) {
+        items.forEach(item => {
             const div = document.createElement('div');
             div.className = 'target-item';
             div.style.padding = '8px 12px';
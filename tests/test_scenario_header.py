@@ -0,0 +1,41 @@
+import json
+
+from src.backend import scenario_header
+from src.backend.scenario_header import read_scenario_header
+
+
+def _write(tmp_path, name, data):
+    path = tmp_path / name
+    path.write_text(json.dumps(data), encoding="utf-8")
+    return str(path)
+
+
+def test_header_keys_after_steps_are_read(tmp_path):
+    path = _write(tmp_path, "late.json", {"id": "a", "steps": [{"type": "ui"}], "name": "late"})
+    assert read_scenario_header(path) == {"id": "a", "name": "late"}
+
+
+def test_header_keys_after_empty_steps_are_read(tmp_path):
+    path = _write(tmp_path, "first.json", {"steps": [], "id": "x", "name": "n"})
+    assert read_scenario_header(path) == {"id": "x", "name": "n"}
+
+
+def test_complete_header_in_saved_order(tmp_path):
+    header = {"id": "s", "name": "n", "tags": ["t"], "description": "d"}
+    path = _write(tmp_path, "saved.json", {**header, "setup": [], "steps": [{}] * 1000, "teardown": []})
+    assert read_scenario_header(path) == header
+
+
+def test_partial_header_in_saved_order_skips_full_parse(tmp_path, monkeypatch):
+    def full_parse(path):
+        raise AssertionError("full parse")
+
+    monkeypatch.setattr(scenario_header, "_read_full_header", full_parse)
+    header = {"id": "s", "name": "n", "tags": ["t"]}
+    path = _write(tmp_path, "partial.json", {**header, "setup": [], "steps": [{"type": "ui"}] * 5000, "teardown": []})
+    assert read_scenario_header(path) == header
+
+
+def test_header_out_of_saved_order_is_fully_parsed(tmp_path):
+    path = _write(tmp_path, "manual.json", {"name": "n", "id": "m", "steps": [], "tags": ["late"]})
+    assert read_scenario_header(path) == {"id": "m", "name": "n", "tags": ["late"]}